@@ -1,115 +1,557 @@
 import random
+import time
 
-def minimaxNaive(state, limit, round):
+from evaluation import isBatchWorthwhile
+from transposition import TranspositionTable
+from transposition import boundType
+from transposition import isUsable
+
+# half the width of the first window of an aspiration search, in units of the evaluation
+ASPIRATION_WINDOW = 2
+# the moves from this position in the search order on are searched one ply shallower by late move reductions
+LATE_MOVE_NUMBER = 3
+# late move reductions only apply to nodes with at least this depth left
+REDUCTION_DEPTH = 3
+
+def minimaxNaive(state, limit, round, minimaxInfo=None):
     """
     Naive Minmax algorithm
     :param state: current state of game, class GameState
     :param limit: an integer that indicates limit
     :param round: the number of round
+    :param minimaxInfo: the minimax meta information of the search, updated in place, a new one if None
     :return: cbv, best move, minimax meta information
     """
-    minimaxInfo = MinimaxInfo()
+    if minimaxInfo is None:
+        minimaxInfo = MinimaxInfo()
 
     if limit == 0:
-        state.bestValue = state.evaluate()
+        state.bestValue = minimaxInfo.evaluate(state.evaluate) if minimaxInfo.detailed else state.evaluate()
         minimaxInfo.numberEvaluation += 1
         return state.bestValue, state.move, minimaxInfo
 
-    listOfSuccessor = []
-    if round == 1:
-        listOfSuccessor = state.getFirstMove()
-    elif round == 2:
-        listOfSuccessor = state.getSecondMove()
+    if minimaxInfo.detailed:
+        listOfMoves = minimaxInfo.generateMoves(state, round, limit)
     else:
-        listOfSuccessor = state.getSuccessors()
+        listOfMoves = state.getMoves(round)
     minimaxInfo.numberBranchingFactors += 1
-    minimaxInfo.totalBranchingFactors += len(listOfSuccessor)
+    minimaxInfo.totalBranchingFactors += len(listOfMoves)
 
     if state.minMax == 'max':
         cbv = float("-inf")
         bestMove = None
-        for successor in listOfSuccessor:
-            bv, move, successorMinimaxInfo = minimaxNaive(successor, limit-1, round+1)
-            minimaxInfo += successorMinimaxInfo
+        for successor in state.generateSuccessors(round, listOfMoves):
+            bv, move, minimaxInfo = minimaxNaive(successor, limit-1, round+1, minimaxInfo)
             if bv > cbv:
                 cbv = bv
                 bestMove = successor.move
-        if listOfSuccessor and bestMove == None:
-            bestMove = random.choice(listOfSuccessor).move
-        return cbv, bestMove, minimaxInfo
     else:
         cbv = float("inf")
         bestMove = None
-        for successor in listOfSuccessor:
-            bv, move, successorMinimaxInfo = minimaxNaive(successor, limit-1, round+1)
-            minimaxInfo += successorMinimaxInfo
+        for successor in state.generateSuccessors(round, listOfMoves):
+            bv, move, minimaxInfo = minimaxNaive(successor, limit-1, round+1, minimaxInfo)
             if bv < cbv:
                 cbv = bv
                 bestMove = successor.move
-        if listOfSuccessor and bestMove == None:
-            bestMove = random.choice(listOfSuccessor).move
-        return cbv, bestMove, minimaxInfo
+    if listOfMoves and bestMove == None:
+        bestMove = state.describeMove(random.choice(listOfMoves))
+    return cbv, bestMove, minimaxInfo
 
 
-def minimaxAlphaBeta(state, limit, round, alpha, beta):
+def minimaxAlphaBeta(state, limit, round, alpha, beta, table=None, deadline=None, ordering=None, \
+        batch=False, tablebase=None, minimaxInfo=None):
     """
-    Minmax algorithm with Alpha-Beta pruning.
+    Minmax algorithm with Alpha-Beta pruning. Successors are generated lazily, so the ones after
+    a cutoff are never built.
     :param state: current state of game, class GameState
     :param limit: an integer that indicates limit
     :param round: the number of round
     :param alpha: the min value of the max level
     :param beta: the max value of the min level
+    :param table: a TranspositionTable consulted before generating successors, None to disable it
+    :param deadline: the time.time() after which SearchTimeout is raised, None for no time limit
+    :param ordering: a MoveOrdering which sorts the successors, None to search them in board order
+    :param batch: a boolean represents whether the successors one ply above the leaves are evaluated together
+        when there are enough of them
+    :param tablebase: a Tablebase or a RegionSolver which gives the exact value of the positions it solves, None to disable it
+    :param minimaxInfo: the minimax meta information of the search, updated in place, a new one if None
     :return: cbv, best move, minimax meta information
     """
-    minimaxInfo = MinimaxInfo()
+    if deadline is not None and time.time() > deadline:
+        raise SearchTimeout()
+    if minimaxInfo is None:
+        minimaxInfo = MinimaxInfo()
+
+    if tablebase is not None:
+        value = tablebase.evaluate(state, round)
+        if value is not None:
+            minimaxInfo.numberTablebaseHits += 1
+            return value, state.move, minimaxInfo
 
     if limit == 0:
-        state.bestValue = state.evaluate()
+        state.bestValue = minimaxInfo.evaluate(state.evaluate) if minimaxInfo.detailed else state.evaluate()
         minimaxInfo.numberEvaluation += 1
         return state.bestValue, state.move, minimaxInfo
 
-    listOfSuccessor = []
-    if round == 1:
-        listOfSuccessor = state.getFirstMove()
-    elif round == 2:
-        listOfSuccessor = state.getSecondMove()
+    tableMove = None
+    if table is not None:
+        key, transform = state.getTableKey()
+        alphaOriginal, betaOriginal = alpha, beta
+        entry = table.probe(key)
+        minimaxInfo.numberProbes += 1
+        if entry is not None:
+            minimaxInfo.numberHits += 1
+            tableMove = state.fromTableMove(entry[3], transform)
+            if isUsable(entry, limit, alpha, beta):
+                minimaxInfo.numberTableCutoffs += 1
+                return entry[2], state.describeMove(tableMove), minimaxInfo
+
+    if minimaxInfo.detailed:
+        listOfMoves = minimaxInfo.generateMoves(state, round, limit)
     else:
-        listOfSuccessor = state.getSuccessors()
+        listOfMoves = state.getMoves(round)
     minimaxInfo.numberBranchingFactors += 1
-    minimaxInfo.totalBranchingFactors += len(listOfSuccessor)
+    minimaxInfo.totalBranchingFactors += len(listOfMoves)
 
-    if state.minMax == 'max':
+    if ordering is not None:
+        ordering.recordNode(limit)
+        listOfMoves = ordering.order(listOfMoves, state, round, tableMove)
+    elif tableMove is not None:
+        # search the best move of the previous search first
+        listOfMoves.sort(key=lambda move: move != tableMove)
+
+    if batch and limit == 1 and isBatchWorthwhile(len(listOfMoves)):
+        cbv, bestMove = searchFrontier(state, listOfMoves, round, alpha, beta, ordering, minimaxInfo)
+    elif state.minMax == 'max':
         cbv = float("-inf")
         bestMove = None
-        for successor in listOfSuccessor:
-            bv, move, successorMinimaxInfo = minimaxAlphaBeta(successor, limit-1, round+1, alpha, beta)
-            minimaxInfo += successorMinimaxInfo
+        for moveNumber, successor in enumerate(state.generateSuccessors(round, listOfMoves)):
+            bv, move, minimaxInfo = minimaxAlphaBeta(successor, limit-1, round+1, alpha, beta, \
+                table, deadline, ordering, batch, tablebase, minimaxInfo)
             if bv > cbv:
                 cbv = bv
-                bestMove = successor.move
+                bestMove = successor.lastMove
                 alpha = bv
             if beta <= alpha:
                 minimaxInfo.numberCutoffs += 1
+                if minimaxInfo.detailed:
+                    minimaxInfo.recordCutoff(limit)
+                if ordering is not None:
+                    ordering.recordCutoff(successor.lastMove, round, limit, moveNumber)
                 break
-        if listOfSuccessor and bestMove == None:
-            bestMove = random.choice(listOfSuccessor).move
-        return cbv, bestMove, minimaxInfo
     else:
         cbv = float("inf")
         bestMove = None
-        for successor in listOfSuccessor:
-            bv, move, successorMinimaxInfo = minimaxAlphaBeta(successor, limit-1, round+1, alpha, beta)
-            minimaxInfo += successorMinimaxInfo
+        for moveNumber, successor in enumerate(state.generateSuccessors(round, listOfMoves)):
+            bv, move, minimaxInfo = minimaxAlphaBeta(successor, limit-1, round+1, alpha, beta, \
+                table, deadline, ordering, batch, tablebase, minimaxInfo)
             if bv < cbv:
                 cbv = bv
-                bestMove = successor.move
+                bestMove = successor.lastMove
+                beta = bv
+            if beta <= alpha:
+                minimaxInfo.numberCutoffs += 1
+                if minimaxInfo.detailed:
+                    minimaxInfo.recordCutoff(limit)
+                if ordering is not None:
+                    ordering.recordCutoff(successor.lastMove, round, limit, moveNumber)
+                break
+    if listOfMoves and bestMove == None:
+        bestMove = random.choice(listOfMoves)
+    if bestMove == None:
+        return cbv, None, minimaxInfo
+    if table is not None:
+        table.store(key, limit, boundType(cbv, alphaOriginal, betaOriginal), cbv, \
+            state.toTableMove(bestMove, transform))
+    return cbv, state.describeMove(bestMove), minimaxInfo
+
+def searchFrontier(state, listOfMoves, round, alpha, beta, ordering, minimaxInfo):
+    """
+    Choose among the moves of a node one ply above the leaves. All successors are evaluated together
+    by GameState.evaluateMoves, then compared with the same max, min and cutoff rules as the search.
+    :param state: current state of game, class GameState
+    :param listOfMoves: the moves of the state in search order
+    :param round: the number of round
+    :param alpha: the min value of the max level
+    :param beta: the max value of the min level
+    :param ordering: a MoveOrdering told about the cutoff, None if there is none
+    :param minimaxInfo: the minimax meta information of the node, updated in place
+    :return: cbv, best move as generated by getMoves
+    """
+    if minimaxInfo.detailed:
+        values = minimaxInfo.evaluate(state.evaluateMoves, listOfMoves)
+    else:
+        values = state.evaluateMoves(listOfMoves)
+    minimaxInfo.numberEvaluation += len(values)
+
+    maximizing = state.minMax == 'max'
+    cbv = float("-inf") if maximizing else float("inf")
+    bestMove = None
+    for moveNumber, bv in enumerate(values):
+        if maximizing and bv > cbv:
+            cbv = bv
+            bestMove = listOfMoves[moveNumber]
+            alpha = bv
+        elif not maximizing and bv < cbv:
+            cbv = bv
+            bestMove = listOfMoves[moveNumber]
+            beta = bv
+        if beta <= alpha:
+            minimaxInfo.numberCutoffs += 1
+            if minimaxInfo.detailed:
+                minimaxInfo.recordCutoff(1)
+            if ordering is not None:
+                ordering.recordCutoff(listOfMoves[moveNumber], round, 1, moveNumber)
+            break
+    return cbv, bestMove
+
+def minimaxNaiveInPlace(state, limit, round, minimaxInfo=None):
+    """
+    Naive Minmax algorithm which makes and undoes moves on the board of a single state
+    instead of creating a state for every successor.
+    :param state: current state of game, class GameState, restored before returning
+    :param limit: an integer that indicates limit
+    :param round: the number of round
+    :param minimaxInfo: the minimax meta information of the search, updated in place, a new one if None
+    :return: cbv, best move, minimax meta information
+    """
+    if minimaxInfo is None:
+        minimaxInfo = MinimaxInfo()
+
+    if limit == 0:
+        minimaxInfo.numberEvaluation += 1
+        value = minimaxInfo.evaluate(state.evaluate) if minimaxInfo.detailed else state.evaluate()
+        return value, None, minimaxInfo
+
+    if minimaxInfo.detailed:
+        listOfMoves = minimaxInfo.generateMoves(state, round, limit)
+    else:
+        listOfMoves = state.getMoves(round)
+    minimaxInfo.numberBranchingFactors += 1
+    minimaxInfo.totalBranchingFactors += len(listOfMoves)
+
+    maximizing = state.minMax == 'max'
+    cbv = float("-inf") if maximizing else float("inf")
+    bestMove = None
+    for move in listOfMoves:
+        state.makeMove(move)
+        bv, _, minimaxInfo = minimaxNaiveInPlace(state, limit-1, round+1, minimaxInfo)
+        state.undoMove(move)
+        if (maximizing and bv > cbv) or (not maximizing and bv < cbv):
+            cbv = bv
+            bestMove = move
+    if listOfMoves and bestMove == None:
+        bestMove = random.choice(listOfMoves)
+    if bestMove != None:
+        bestMove = state.describeMove(bestMove)
+    return cbv, bestMove, minimaxInfo
+
+
+def minimaxAlphaBetaInPlace(state, limit, round, alpha, beta, table=None, deadline=None, ordering=None, \
+        batch=False, tablebase=None, minimaxInfo=None):
+    """
+    Minmax algorithm with Alpha-Beta pruning which makes and undoes moves on the board of a
+    single state instead of creating a state for every successor.
+    :param state: current state of game, class GameState, restored before returning
+    :param limit: an integer that indicates limit
+    :param round: the number of round
+    :param alpha: the min value of the max level
+    :param beta: the max value of the min level
+    :param table: a TranspositionTable consulted before generating moves, None to disable it
+    :param deadline: the time.time() after which SearchTimeout is raised, None for no time limit
+    :param ordering: a MoveOrdering which sorts the moves, None to search them in board order
+    :param batch: a boolean represents whether the successors one ply above the leaves are evaluated together
+        when there are enough of them
+    :param tablebase: a Tablebase or a RegionSolver which gives the exact value of the positions it solves, None to disable it
+    :param minimaxInfo: the minimax meta information of the search, updated in place, a new one if None
+    :return: cbv, best move, minimax meta information
+    """
+    if deadline is not None and time.time() > deadline:
+        raise SearchTimeout()
+    if minimaxInfo is None:
+        minimaxInfo = MinimaxInfo()
+
+    if tablebase is not None:
+        value = tablebase.evaluate(state, round)
+        if value is not None:
+            minimaxInfo.numberTablebaseHits += 1
+            return value, None, minimaxInfo
+
+    if limit == 0:
+        minimaxInfo.numberEvaluation += 1
+        value = minimaxInfo.evaluate(state.evaluate) if minimaxInfo.detailed else state.evaluate()
+        return value, None, minimaxInfo
+
+    tableMove = None
+    if table is not None:
+        key, transform = state.getTableKey()
+        alphaOriginal, betaOriginal = alpha, beta
+        entry = table.probe(key)
+        minimaxInfo.numberProbes += 1
+        if entry is not None:
+            minimaxInfo.numberHits += 1
+            tableMove = state.fromTableMove(entry[3], transform)
+            if isUsable(entry, limit, alpha, beta):
+                minimaxInfo.numberTableCutoffs += 1
+                return entry[2], state.describeMove(tableMove), minimaxInfo
+
+    if minimaxInfo.detailed:
+        listOfMoves = minimaxInfo.generateMoves(state, round, limit)
+    else:
+        listOfMoves = state.getMoves(round)
+    minimaxInfo.numberBranchingFactors += 1
+    minimaxInfo.totalBranchingFactors += len(listOfMoves)
+
+    if ordering is not None:
+        ordering.recordNode(limit)
+        listOfMoves = ordering.order(listOfMoves, state, round, tableMove)
+    elif tableMove is not None:
+        # search the best move of the previous search first
+        listOfMoves.sort(key=lambda move: move != tableMove)
+
+    maximizing = state.minMax == 'max'
+    cbv = float("-inf") if maximizing else float("inf")
+    bestMove = None
+    if batch and limit == 1 and isBatchWorthwhile(len(listOfMoves)):
+        cbv, bestMove = searchFrontier(state, listOfMoves, round, alpha, beta, ordering, minimaxInfo)
+    else:
+        for moveNumber, move in enumerate(listOfMoves):
+            state.makeMove(move)
+            bv, _, minimaxInfo = minimaxAlphaBetaInPlace(state, limit-1, round+1, alpha, beta, \
+                table, deadline, ordering, batch, tablebase, minimaxInfo)
+            state.undoMove(move)
+            if maximizing and bv > cbv:
+                cbv = bv
+                bestMove = move
+                alpha = bv
+            elif not maximizing and bv < cbv:
+                cbv = bv
+                bestMove = move
                 beta = bv
             if beta <= alpha:
                 minimaxInfo.numberCutoffs += 1
+                if minimaxInfo.detailed:
+                    minimaxInfo.recordCutoff(limit)
+                if ordering is not None:
+                    ordering.recordCutoff(move, round, limit, moveNumber)
                 break
-        if listOfSuccessor and bestMove == None:
-            bestMove = random.choice(listOfSuccessor).move
-        return cbv, bestMove, minimaxInfo
+    if listOfMoves and bestMove == None:
+        bestMove = random.choice(listOfMoves)
+    if bestMove == None:
+        return cbv, None, minimaxInfo
+    if table is not None:
+        table.store(key, limit, boundType(cbv, alphaOriginal, betaOriginal), cbv, \
+            state.toTableMove(bestMove, transform))
+    return cbv, state.describeMove(bestMove), minimaxInfo
+
+def iterativeDeepening(state, round, timeLimit, maxDepth=None, table=None, ifInPlace=True, ordering=None, \
+        batch=False, tablebase=None, ifPVS=False, reductions=False, minimaxInfo=None):
+    """
+    Search with Alpha-Beta pruning to depth 1, 2, 3... until the time budget runs out. Every iteration
+    stores its principal variation in the transposition table, so the next iteration searches it first.
+    The first iteration always completes, so there is always a move to return.
+    :param state: current state of game, class GameState
+    :param round: the number of round
+    :param timeLimit: the time budget of the search in seconds
+    :param maxDepth: the deepest iteration, no more than the number of pieces left if None
+    :param table: a TranspositionTable shared by the iterations, a new one if None
+    :param ifInPlace: a boolean represents whether to search with minimaxAlphaBetaInPlace
+    :param ordering: a MoveOrdering shared by the iterations, None to search the moves in board order
+    :param batch: a boolean represents whether the successors one ply above the leaves are evaluated together
+    :param tablebase: a Tablebase or a RegionSolver which gives the exact value of the positions it solves, None to disable it
+    :param ifPVS: a boolean represents whether to search with principalVariationSearch, whose aspiration window
+        is centred on the value of the previous iteration
+    :param reductions: a boolean represents whether the principal variation search reduces late moves
+    :param minimaxInfo: the minimax meta information of the search, updated in place, a new one if None
+    :return: cbv of the last completed iteration, its best move, minimax meta information of all iterations,
+        including the work of an iteration cut short by the time limit
+    """
+    search = minimaxAlphaBetaInPlace if ifInPlace else minimaxAlphaBeta
+    if table is None:
+        table = TranspositionTable()
+    if maxDepth is None:
+        # every move takes at least one piece off the board
+        maxDepth = state.getPieceCount(0) + state.getPieceCount(1)
+    if ordering is not None:
+        ordering.newSearch(round)
+
+    start = time.time()
+    deadline = start + timeLimit
+    if minimaxInfo is None:
+        minimaxInfo = MinimaxInfo()
+    cbv, bestMove = None, None
+    for depth in range(1, maxDepth + 1):
+        try:
+            if ifPVS:
+                bv, move, minimaxInfo = principalVariationSearch(state.copy(), depth, round, table, ordering, \
+                    cbv, reductions, tablebase, deadline if depth > 1 else None, minimaxInfo)
+            else:
+                bv, move, minimaxInfo = search(state.copy(), depth, round, float('-inf'), float('inf'), \
+                    table, deadline if depth > 1 else None, ordering, batch, tablebase, minimaxInfo)
+        except SearchTimeout:
+            break
+        cbv, bestMove = bv, move
+        minimaxInfo.numberIterations += 1
+        # the player to move has no jump, so the position is lost at every depth; an infinite value with a
+        # move may only come from a leaf where the opponent cannot move, which a deeper search can change
+        if bestMove is None:
+            break
+        # the next iteration takes longer than all the previous ones together
+        if time.time() - start > timeLimit / 2.0:
+            break
+    return cbv, bestMove, minimaxInfo
+
+def negamax(state, limit, round, alpha, beta, table=None, deadline=None, ordering=None, reductions=False, \
+        tablebase=None, minimaxInfo=None):
+    """
+    Principal variation search in negamax form, which makes and undoes moves on the board of a single
+    state. Values are for the player to move, so a single branch serves both players. The first move is
+    searched with the full window; the others are first probed with a null window, which only proves
+    that they are no better, and are searched again with the full window when the probe fails high.
+    :param state: current state of game, class GameState, restored before returning
+    :param limit: an integer that indicates limit
+    :param round: the number of round
+    :param alpha: the value the player to move is already sure of
+    :param beta: the value the opponent is already sure of, from the point of view of the player to move
+    :param table: a TranspositionTable consulted before generating moves, with values for the player to move,
+        None to disable it
+    :param deadline: the time.time() after which SearchTimeout is raised, None for no time limit
+    :param ordering: a MoveOrdering which sorts the moves, None to search them in board order
+    :param reductions: a boolean represents whether late moves are probed one ply shallower
+    :param tablebase: a Tablebase or a RegionSolver which gives the exact value of the positions it solves, None to disable it
+    :param minimaxInfo: the minimax meta information of the search, updated in place, a new one if None
+    :return: value for the player to move, best move, minimax meta information
+    """
+    if deadline is not None and time.time() > deadline:
+        raise SearchTimeout()
+    if minimaxInfo is None:
+        minimaxInfo = MinimaxInfo()
+    sign = 1 if state.player == 'computer' else -1
+
+    if tablebase is not None:
+        value = tablebase.evaluate(state, round)
+        if value is not None:
+            minimaxInfo.numberTablebaseHits += 1
+            return sign * value, None, minimaxInfo
+
+    if limit == 0:
+        minimaxInfo.numberEvaluation += 1
+        value = minimaxInfo.evaluate(state.evaluate) if minimaxInfo.detailed else state.evaluate()
+        return sign * value, None, minimaxInfo
+
+    tableMove = None
+    if table is not None:
+        key, transform = state.getTableKey()
+        alphaOriginal = alpha
+        entry = table.probe(key)
+        minimaxInfo.numberProbes += 1
+        if entry is not None:
+            minimaxInfo.numberHits += 1
+            tableMove = state.fromTableMove(entry[3], transform)
+            if isUsable(entry, limit, alpha, beta):
+                minimaxInfo.numberTableCutoffs += 1
+                return entry[2], state.describeMove(tableMove), minimaxInfo
+
+    if minimaxInfo.detailed:
+        listOfMoves = minimaxInfo.generateMoves(state, round, limit)
+    else:
+        listOfMoves = state.getMoves(round)
+    minimaxInfo.numberBranchingFactors += 1
+    minimaxInfo.totalBranchingFactors += len(listOfMoves)
+
+    if ordering is not None:
+        ordering.recordNode(limit)
+        listOfMoves = ordering.order(listOfMoves, state, round, tableMove)
+    elif tableMove is not None:
+        # search the best move of the previous search first
+        listOfMoves.sort(key=lambda move: move != tableMove)
+
+    bestValue = float("-inf")
+    bestMove = None
+    for moveNumber, move in enumerate(listOfMoves):
+        state.makeMove(move)
+        if moveNumber == 0 or alpha == float("-inf"):
+            # a null window needs a finite alpha
+            bv, _, minimaxInfo = negamax(state, limit-1, round+1, -beta, -alpha, table, deadline, \
+                ordering, reductions, tablebase, minimaxInfo)
+            value = -bv
+        else:
+            depth = limit - 1
+            if reductions and moveNumber >= LATE_MOVE_NUMBER and limit >= REDUCTION_DEPTH:
+                depth -= 1
+            bv, _, minimaxInfo = negamax(state, depth, round+1, -alpha-1, -alpha, table, deadline, \
+                ordering, reductions, tablebase, minimaxInfo)
+            value = -bv
+            if value > alpha and depth < limit - 1:
+                # a reduced move which looks better is probed again at the full depth
+                bv, _, minimaxInfo = negamax(state, limit-1, round+1, -alpha-1, -alpha, table, \
+                    deadline, ordering, reductions, tablebase, minimaxInfo)
+                value = -bv
+            if alpha < value < beta:
+                bv, _, minimaxInfo = negamax(state, limit-1, round+1, -beta, -alpha, table, deadline, \
+                    ordering, reductions, tablebase, minimaxInfo)
+                value = -bv
+        state.undoMove(move)
+        if value > bestValue or bestMove is None:
+            bestValue = value
+            bestMove = move
+        if value > alpha:
+            alpha = value
+        if alpha >= beta:
+            minimaxInfo.numberCutoffs += 1
+            if minimaxInfo.detailed:
+                minimaxInfo.recordCutoff(limit)
+            if ordering is not None:
+                ordering.recordCutoff(move, round, limit, moveNumber)
+            break
+    if bestMove is None:
+        return bestValue, None, minimaxInfo
+    if table is not None:
+        table.store(key, limit, boundType(bestValue, alphaOriginal, beta), bestValue, \
+            state.toTableMove(bestMove, transform))
+    return bestValue, state.describeMove(bestMove), minimaxInfo
+
+def principalVariationSearch(state, limit, round, table=None, ordering=None, previousValue=None, reductions=False, \
+        tablebase=None, deadline=None, minimaxInfo=None):
+    """
+    Search with negamax in an aspiration window around a previous value. When the value falls outside
+    the window, the search is repeated with the window open on that side.
+    :param state: current state of game, class GameState, restored before returning
+    :param limit: an integer that indicates limit
+    :param round: the number of round
+    :param table: a TranspositionTable with values for the player to move, None to disable it
+    :param ordering: a MoveOrdering which sorts the moves, None to search them in board order
+    :param previousValue: the value for the computer of an earlier search of the player, which centres the
+        window, None to search with the full window
+    :param reductions: a boolean represents whether late moves are probed one ply shallower
+    :param tablebase: a Tablebase or a RegionSolver which gives the exact value of the positions it solves, None to disable it
+    :param deadline: the time.time() after which SearchTimeout is raised, None for no time limit
+    :param minimaxInfo: the minimax meta information of the search, updated in place, a new one if None
+    :return: cbv for the computer, best move, minimax meta information
+    """
+    sign = 1 if state.player == 'computer' else -1
+    alpha, beta = float('-inf'), float('inf')
+    if previousValue is not None and previousValue not in (float('-inf'), float('inf')):
+        alpha = sign * previousValue - ASPIRATION_WINDOW
+        beta = sign * previousValue + ASPIRATION_WINDOW
+
+    if minimaxInfo is None:
+        minimaxInfo = MinimaxInfo()
+    while True:
+        value, move, minimaxInfo = negamax(state, limit, round, alpha, beta, table, deadline, ordering, \
+            reductions, tablebase, minimaxInfo)
+        if value <= alpha and alpha != float('-inf'):
+            alpha = float('-inf')
+        elif value >= beta and beta != float('inf'):
+            beta = float('inf')
+        else:
+            return sign * value, move, minimaxInfo
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the time budget of a move runs out.
+    """
+    pass
 
 def randomAgent(state, round):
     """
@@ -129,20 +571,53 @@ def randomAgent(state, round):
 
 class MinimaxInfo:
     """
-    A class to store meta information used in the minimax algorithm.
+    A class to store meta information used in the minimax algorithm. A search creates one object at its
+    root and passes it down, so every node updates the same counters in place. The counters by depth and
+    the timings of move generation and evaluation are only kept when detailed is set, which costs one
+    attribute test per node otherwise.
     """
+    # the counters which __add__ adds up
+    COUNTERS = ('numberEvaluation', 'totalBranchingFactors', 'numberBranchingFactors', 'numberCutoffs', \
+        'numberProbes', 'numberHits', 'numberTableCutoffs', 'numberIterations', 'numberTablebaseHits', \
+        'numberBookHits', 'numberPonderHits', 'numberPlayouts')
+
     def __init__(self, numberEvaluation=0, totalBranchingFactors=0, \
-            numberBranchingFactors=0, numberCutoffs=0):
+            numberBranchingFactors=0, numberCutoffs=0, numberProbes=0, \
+            numberHits=0, numberTableCutoffs=0, numberIterations=0, numberTablebaseHits=0, \
+            numberBookHits=0, numberPonderHits=0, numberPlayouts=0, detailed=False):
         """
         :param numberEvaluation: total number of evaluations
         :param totalBranchingFactors: total branching factors
         :param numberBranchingFactors: number of branching factors
         :param numberCutoffs: number of cutoffs
+        :param numberProbes: number of transposition table probes
+        :param numberHits: number of probes which found an entry
+        :param numberTableCutoffs: number of nodes decided by a transposition table entry
+        :param numberIterations: number of completed iterations of iterative deepening
+        :param numberTablebaseHits: number of nodes decided by the endgame tablebase
+        :param numberBookHits: number of moves taken from the opening book
+        :param numberPonderHits: number of moves found by searching during the opponent's turn
+        :param numberPlayouts: number of random games played by the Monte Carlo tree search
+        :param detailed: a boolean represents whether the counters by depth and the timings are kept
         """
         self.numberEvaluation = numberEvaluation
         self.totalBranchingFactors = totalBranchingFactors
         self.numberBranchingFactors = numberBranchingFactors
         self.numberCutoffs = numberCutoffs
+        self.numberProbes = numberProbes
+        self.numberHits = numberHits
+        self.numberTableCutoffs = numberTableCutoffs
+        self.numberIterations = numberIterations
+        self.numberTablebaseHits = numberTablebaseHits
+        self.numberBookHits = numberBookHits
+        self.numberPonderHits = numberPonderHits
+        self.numberPlayouts = numberPlayouts
+        self.detailed = detailed
+        # depth left -> [number of expanded nodes, total branching factors, number of cutoffs]
+        self.depths = {}
+        self.generationTime = 0.0
+        self.evaluationTime = 0.0
+        self.searchTime = 0.0
 
     def __add__(self, other):
         """
@@ -150,9 +625,104 @@ class MinimaxInfo:
         :param other: the other MinimaxInfo object
         :return: the sum of the two MinimaxInfo objects
         """
-        return MinimaxInfo(self.numberEvaluation + other.numberEvaluation, \
-            self.totalBranchingFactors + other.totalBranchingFactors, \
-            self.numberBranchingFactors + other.numberBranchingFactors, \
-            self.numberCutoffs + other.numberCutoffs)
+        result = MinimaxInfo(detailed=self.detailed or other.detailed)
+        for name in MinimaxInfo.COUNTERS:
+            setattr(result, name, getattr(self, name) + getattr(other, name))
+        for depths in (self.depths, other.depths):
+            for depth, counts in depths.items():
+                total = result.depths.setdefault(depth, [0, 0, 0])
+                for i in range(3):
+                    total[i] += counts[i]
+        result.generationTime = self.generationTime + other.generationTime
+        result.evaluationTime = self.evaluationTime + other.evaluationTime
+        result.searchTime = self.searchTime + other.searchTime
+        return result
+
+    def generateMoves(self, state, round, depth):
+        """
+        Generate the moves of a node, timing the generator and counting the node by its depth.
+        :param state: current state of game, class GameState
+        :param round: the number of round
+        :param depth: the depth left below the node
+        :return: the list of moves of the state
+        """
+        start = time.time()
+        listOfMoves = state.getMoves(round)
+        self.generationTime += time.time() - start
+        counts = self.depths.setdefault(depth, [0, 0, 0])
+        counts[0] += 1
+        counts[1] += len(listOfMoves)
+        return listOfMoves
+
+    def evaluate(self, function, *args):
+        """
+        :param function: the evaluation to time, such as GameState.evaluate of the leaf
+        :param args: the arguments of the evaluation
+        :return: the result of the evaluation
+        """
+        start = time.time()
+        result = function(*args)
+        self.evaluationTime += time.time() - start
+        return result
+
+    def recordCutoff(self, depth):
+        """
+        :param depth: the depth left below the node which was cut off
+        """
+        self.depths.setdefault(depth, [0, 0, 0])[2] += 1
+
+    def numberNodes(self):
+        """
+        :return: the number of nodes visited, expanded or not
+        """
+        return self.numberBranchingFactors + self.numberEvaluation + self.numberTableCutoffs + \
+            self.numberTablebaseHits
 
+    def hitRate(self):
+        """
+        :return: the fraction of transposition table probes which found an entry
+        """
+        return self.numberHits * 1.00 / self.numberProbes if self.numberProbes else 0.0
 
+    def nodesPerSecond(self):
+        """
+        :return: the number of nodes visited per second of search, 0 if no time was measured
+        """
+        return self.numberNodes() / self.searchTime if self.searchTime else 0.0
+
+    def playoutsPerSecond(self):
+        """
+        :return: the number of playouts per second of search, 0 if no time was measured
+        """
+        return self.numberPlayouts / self.searchTime if self.searchTime else 0.0
+
+    def toDict(self):
+        """
+        :return: a dictionary of the counters which can be written as JSON, with one entry per depth
+            left from the deepest to the leaves
+        """
+        result = {
+            'nodes': self.numberNodes(),
+            'evaluations': self.numberEvaluation,
+            'cutoffs': self.numberCutoffs,
+            'averageBranchingFactor': self.totalBranchingFactors * 1.00 / self.numberBranchingFactors \
+                if self.numberBranchingFactors else 0.0,
+            'tableProbes': self.numberProbes,
+            'tableHitRate': self.hitRate(),
+            'tableCutoffs': self.numberTableCutoffs,
+            'iterations': self.numberIterations,
+            'tablebaseHits': self.numberTablebaseHits,
+            'bookHits': self.numberBookHits,
+            'ponderHits': self.numberPonderHits,
+            'searchTime': self.searchTime,
+            'nodesPerSecond': self.nodesPerSecond(),
+            'playouts': self.numberPlayouts,
+            'playoutsPerSecond': self.playoutsPerSecond(),
+        }
+        if self.detailed:
+            result['generationTime'] = self.generationTime
+            result['evaluationTime'] = self.evaluationTime
+            result['depths'] = [{'depth': depth, 'nodes': nodes, 'cutoffs': cutoffs, \
+                'branchingFactor': total * 1.00 / nodes if nodes else 0.0} \
+                for depth, (nodes, total, cutoffs) in sorted(self.depths.items(), reverse=True)]
+        return result
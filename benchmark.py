@@ -0,0 +1,221 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from agent import minimaxAlphaBeta
+from agent import minimaxNaive
+from bitboard import Board
+from game import GameState
+
+SIZES = [(side, side) for side in range(4, 13)]
+
+def startState(width, height):
+    """
+    :param width: width of the game board
+    :param height: height of the game board
+    :return: the state at the start of a game, with the computer moving first
+    """
+    return GameState(Board(width, height), None, 'computer', 0)
+
+def perft(state, depth, round):
+    """
+    Count the positions reached by every sequence of moves of a given length. The successors are
+    built the way getFirstMove, getSecondMove and getSuccessors build them, so the counts check
+    the move generator as well as time it.
+    :param state: the state to start from, class GameState
+    :param depth: the number of moves
+    :param round: the number of round of the state
+    :return: a list of the numbers of positions after 1, 2, ..., depth moves
+    """
+    counts = [0] * depth
+    def walk(state, ply, round):
+        for successor in state.generateSuccessors(round):
+            counts[ply] += 1
+            if ply + 1 < depth:
+                walk(successor, ply + 1, round + 1)
+    if depth > 0:
+        walk(state, 0, round)
+    return counts
+
+def randomPosition(width, height, plies, seed):
+    """
+    Play random moves from the start of a game.
+    :param width: width of the game board
+    :param height: height of the game board
+    :param plies: the number of moves to play, fewer if the game ends earlier
+    :param seed: the seed of the random moves
+    :return: a tuple of the state reached and its number of round
+    """
+    rnd = random.Random(seed)
+    state = startState(width, height)
+    round = 1
+    for i in range(plies):
+        listOfMoves = state.getMoves(round)
+        if not listOfMoves:
+            break
+        state.makeMove(rnd.choice(listOfMoves))
+        round += 1
+    state.move = None
+    return state, round
+
+def measure(function, repeat):
+    """
+    :param function: the function to time, called without arguments
+    :param repeat: the number of calls
+    :return: a tuple of the shortest time of a call in seconds and the result of the last call
+    """
+    best = float('inf')
+    result = None
+    for i in range(repeat):
+        start = time.time()
+        result = function()
+        best = min(best, time.time() - start)
+    return best, result
+
+def benchmarkPerft(width, height, depth, repeat):
+    """
+    :return: a dictionary of the perft counts from the start of a game and the nodes per second
+    """
+    seconds, counts = measure(lambda: perft(startState(width, height), depth, 1), repeat)
+    return {'counts': counts, 'seconds': seconds, 'nodesPerSecond': sum(counts) / max(seconds, 1e-9)}
+
+def benchmarkEvaluate(width, height, positions, calls, seed):
+    """
+    :return: a dictionary of the number of calls of GameState.evaluate per second over seeded positions
+    """
+    states = []
+    for i in range(positions):
+        state, round = randomPosition(width, height, 3 + i % (width * height // 4), seed + i)
+        states.append(state)
+    def run():
+        for i in xrange(calls):
+            states[i % positions].evaluate()
+    seconds, _ = measure(run, 3)
+    return {'calls': calls, 'seconds': seconds, 'evaluationsPerSecond': calls / max(seconds, 1e-9)}
+
+def benchmarkSearch(width, height, depth, positions, seed):
+    """
+    Search the same seeded positions with minimaxNaive and with minimaxAlphaBeta, which must agree
+    on the value of every position.
+    :return: a dictionary of the time and the static evaluations of both searches, and the number
+        of positions where their values differ
+    """
+    result = {'depth': depth, 'mismatches': 0}
+    values = {}
+    for name, search in (('naive', lambda state, round: minimaxNaive(state, depth, round)), \
+            ('alphabeta', lambda state, round: minimaxAlphaBeta(state, depth, round, \
+                float('-inf'), float('inf')))):
+        seconds = 0.0
+        evaluations = 0
+        values[name] = []
+        for i in range(positions):
+            state, round = randomPosition(width, height, 2 + 2 * i, seed + i)
+            random.seed(seed + i)
+            start = time.time()
+            bestValue, move, minimaxInfo = search(state, round)
+            seconds += time.time() - start
+            evaluations += minimaxInfo.numberEvaluation
+            values[name].append(bestValue)
+        result[name] = {'seconds': seconds, 'evaluations': evaluations}
+    result['mismatches'] = sum(naive != alphaBeta for naive, alphaBeta in \
+        zip(values['naive'], values['alphabeta']))
+    return result
+
+def runBenchmarks(sizes, perftDepth, searchDepth, positions, calls, seed=0, ifPrint=True):
+    """
+    Run the benchmarks on every board size.
+    :param sizes: a list of tuples of the width and height of the boards
+    :param perftDepth: the number of moves counted by perft
+    :param searchDepth: the depth of the searches
+    :param positions: the number of seeded positions evaluated and searched on each board size
+    :param calls: the number of calls of evaluate on each board size
+    :param seed: the seed of the first position
+    :param ifPrint: a boolean represents if the progress is printed
+    :return: a dictionary of the results, which can be saved as JSON
+    """
+    results = {'python': platform.python_version(), 'seed': seed, 'sizes': {}}
+    for width, height in sizes:
+        size = '%dx%d' % (width, height)
+        results['sizes'][size] = {
+            'perft': benchmarkPerft(width, height, perftDepth, 3),
+            'evaluate': benchmarkEvaluate(width, height, positions, calls, seed),
+            'search': benchmarkSearch(width, height, searchDepth, positions, seed),
+        }
+        if ifPrint:
+            entry = results['sizes'][size]
+            print >> sys.stderr, '%s: perft %s, %.0f evaluations/s, search %.3fs naive, %.3fs alphabeta' % \
+                (size, entry['perft']['counts'], entry['evaluate']['evaluationsPerSecond'], \
+                entry['search']['naive']['seconds'], entry['search']['alphabeta']['seconds'])
+    return results
+
+def compareResults(results, baseline, tolerance=0.1):
+    """
+    Compare benchmark results against a saved baseline.
+    :param results: the results of runBenchmarks
+    :param baseline: the results of an earlier run
+    :param tolerance: the fraction a time may grow or a rate may drop by before it is a regression
+    :return: a tuple of a list of lines describing the differences and a boolean represents if
+        a perft count, a search value or a timing is worse than the baseline
+    """
+    lines = []
+    failed = False
+    for size in sorted(results['sizes'], key=lambda size: int(size.split('x')[0])):
+        entry = results['sizes'][size]
+        old = baseline['sizes'].get(size)
+        if old is None:
+            lines.append('%s: not in the baseline' % size)
+            continue
+        if entry['perft']['counts'] != old['perft']['counts']:
+            lines.append('%s: perft counts %s differ from the baseline %s' % \
+                (size, entry['perft']['counts'], old['perft']['counts']))
+            failed = True
+        if entry['search']['mismatches']:
+            lines.append('%s: alphabeta disagrees with naive minimax on %d positions' % \
+                (size, entry['search']['mismatches']))
+            failed = True
+        # rates are better when higher, times when lower
+        for name, new, previous, higher in ( \
+                ('perft nodes/s', entry['perft']['nodesPerSecond'], old['perft']['nodesPerSecond'], True), \
+                ('evaluations/s', entry['evaluate']['evaluationsPerSecond'], \
+                    old['evaluate']['evaluationsPerSecond'], True), \
+                ('naive search s', entry['search']['naive']['seconds'], old['search']['naive']['seconds'], False), \
+                ('alphabeta search s', entry['search']['alphabeta']['seconds'], \
+                    old['search']['alphabeta']['seconds'], False)):
+            ratio = new / previous if previous else 1.0
+            worse = ratio < 1 - tolerance if higher else ratio > 1 + tolerance
+            failed = failed or worse
+            lines.append('%s: %s %.4g -> %.4g (x%.2f)%s' % \
+                (size, name, previous, new, ratio, ' REGRESSION' if worse else ''))
+    return lines, failed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark move generation, evaluation and search.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[side for side, _ in SIZES], \
+        help='sides of the square boards')
+    parser.add_argument('--perft-depth', type=int, default=6, help='number of moves counted by perft')
+    parser.add_argument('--search-depth', type=int, default=4, help='depth of the searches')
+    parser.add_argument('--positions', type=int, default=4, help='number of seeded positions per board size')
+    parser.add_argument('--calls', type=int, default=20000, help='number of evaluations timed per board size')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first position')
+    parser.add_argument('--output', default=None, help='file the results are written to as JSON')
+    parser.add_argument('--baseline', default=None, help='results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed slowdown before a regression')
+    args = parser.parse_args()
+
+    results = runBenchmarks([(side, side) for side in args.sizes], args.perft_depth, args.search_depth, \
+        args.positions, args.calls, args.seed)
+    if args.output:
+        with open(args.output, 'w') as outputFile:
+            json.dump(results, outputFile, indent=2, sort_keys=True)
+    else:
+        print json.dumps(results, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as baselineFile:
+            lines, failed = compareResults(results, json.load(baselineFile), args.tolerance)
+        for line in lines:
+            print >> sys.stderr, line
+        sys.exit(1 if failed else 0)
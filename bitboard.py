@@ -0,0 +1,444 @@
+import random
+
+from geometry import getGeometry
+
+_FULL_MASKS = {}
+_INITIAL_PIECES = {}
+_ZOBRIST_KEYS = {}
+_JUMP_TABLES = {}
+
+def fullMask(width, height):
+    """
+    Calculate the mask of all cells of a board, without the guard bit of each column.
+    :param width: width of the game board
+    :param height: height of the game board
+    :return: the integer mask of all cells
+    """
+    key = (width, height)
+    if key not in _FULL_MASKS:
+        column = (1 << height) - 1
+        mask = 0
+        for x in range(width):
+            mask |= column << (x * (height + 1))
+        _FULL_MASKS[key] = mask
+    return _FULL_MASKS[key]
+
+def initialPieces(width, height):
+    """
+    Calculate the masks of both colors on a full board.
+    :param width: width of the game board
+    :param height: height of the game board
+    :return: a tuple of the masks of the dark and the light pieces
+    """
+    key = (width, height)
+    if key not in _INITIAL_PIECES:
+        pieces = [0, 0]
+        for x in range(1, width + 1):
+            for y in range(1, height + 1):
+                pieces[(x + y) % 2] |= 1 << ((x - 1) * (height + 1) + y - 1)
+        _INITIAL_PIECES[key] = tuple(pieces)
+    return _INITIAL_PIECES[key]
+
+def zobristKeys(width, height):
+    """
+    Generate the Zobrist keys of a board size, one random 64-bit key for every pair of color
+    and cell, and one for each color to move. The keys are seeded by the board size, so they
+    are the same in every process.
+    :param width: width of the game board
+    :param height: height of the game board
+    :return: a tuple of the cell keys of the dark and the light pieces, and the keys of the color to move
+    """
+    key = (width, height)
+    if key not in _ZOBRIST_KEYS:
+        generator = random.Random(width * 1000 + height)
+        size = width * (height + 1)
+        cellKeys = tuple(tuple(generator.getrandbits(64) for i in range(size)) for colorIndex in range(2))
+        sideKeys = tuple(generator.getrandbits(64) for colorIndex in range(2))
+        _ZOBRIST_KEYS[key] = (cellKeys, sideKeys)
+    return _ZOBRIST_KEYS[key]
+
+def zobristHash(width, height, pieces):
+    """
+    Calculate the Zobrist key of a board from scratch.
+    :param width: width of the game board
+    :param height: height of the game board
+    :param pieces: the masks of the dark and the light pieces
+    :return: the XOR of the keys of all pieces on the board
+    """
+    cellKeys = zobristKeys(width, height)[0]
+    result = 0
+    for colorIndex in range(2):
+        bits = pieces[colorIndex]
+        while bits:
+            lowest = bits & -bits
+            bits ^= lowest
+            result ^= cellKeys[colorIndex][lowest.bit_length() - 1]
+    return result
+
+def jumpTable(width, height):
+    """
+    Combine the jumps of the geometry of a board size with the changes of the Zobrist key they make.
+    :param width: width of the game board
+    :param height: height of the game board
+    :return: a dictionary of (initial index, step, hops) -> a tuple of the mask of the initial and destination
+        cells, the mask of the captured cells, and the changes of the key when the piece is dark and when it is light
+    """
+    key = (width, height)
+    if key not in _JUMP_TABLES:
+        geometry = getGeometry(width, height)
+        cellKeys = zobristKeys(width, height)[0]
+        table = {}
+        for (index, step, hops), entry in geometry.jumps.items():
+            keys = []
+            for colorIndex in range(2):
+                change = cellKeys[colorIndex][index]
+                if hops:
+                    change ^= cellKeys[colorIndex][index + 2 * hops * step]
+                    for over, landing in geometry.rays[index][geometry.directions.index(step)][:hops]:
+                        change ^= cellKeys[1-colorIndex][over]
+                keys.append(change)
+            table[index, step, hops] = (entry[0], entry[1], keys[0], keys[1])
+        _JUMP_TABLES[key] = table
+    return _JUMP_TABLES[key]
+
+def shift(bits, distance):
+    """
+    Shift a mask towards higher cells by distance, or towards lower cells if distance is negative.
+    :param bits: the mask being shifted
+    :param distance: the number of bits to shift
+    :return: the shifted mask
+    """
+    return bits << distance if distance >= 0 else bits >> -distance
+
+def popcount(bits):
+    """
+    :return the number of set bits in a mask
+    """
+    return bin(bits).count('1')
+
+
+class Board:
+    """
+    A bitboard which represents the board of Konone. Each color is stored as an integer mask.
+    Cell (x, y) is bit (x-1)*(height+1) + (y-1), so every column of the board is followed by
+    an always empty guard bit, which stops jumps along a column from wrapping into the next one.
+    The Zobrist key of the board is updated incrementally whenever a cell changes. The masks and key
+    changes of every jump are looked up in tables computed once per board size (geometry.py).
+    """
+
+    def __init__(self, width=8, height=8, pieces=None, key=None):
+        """
+        :param width: width of the game board
+        :param height: height of the game board
+        :param pieces: the masks of the dark and the light pieces, a full board if None
+        :param key: the Zobrist key of the pieces, calculated from scratch if None
+        """
+        self.width = width
+        self.height = height
+        self.stride = height + 1
+        self.full = fullMask(width, height)
+        self.pieces = list(pieces if pieces is not None else initialPieces(width, height))
+        # -x, +x, -y, +y, the same order in which GameState scans the directions
+        self.directions = (-self.stride, self.stride, -1, 1)
+        self.cellKeys, self.sideKeys = zobristKeys(width, height)
+        self.geometry = getGeometry(width, height)
+        self.jumps = jumpTable(width, height)
+        self.key = key if key is not None else zobristHash(width, height, self.pieces)
+
+    def index(self, position):
+        """
+        :param position: a tuple of coordinate (x,y)
+        :return the bit index of the cell
+        """
+        return (position[0] - 1) * self.stride + position[1] - 1
+
+    def position(self, index):
+        """
+        :param index: the bit index of a cell
+        :return a tuple of coordinate (x,y)
+        """
+        return (index // self.stride + 1, index % self.stride + 1)
+
+    def __getitem__(self, position):
+        """
+        Get the content of a cell.
+        :param position: a tuple of coordinate (x,y)
+        :return 0 or 1 if the cell holds a piece of that color index, 2 if it is empty
+        """
+        bit = 1 << self.index(position)
+        if self.pieces[0] & bit:
+            return 0
+        if self.pieces[1] & bit:
+            return 1
+        return 2
+
+    def __setitem__(self, position, colorIndex):
+        """
+        Set the content of a cell.
+        :param position: a tuple of coordinate (x,y)
+        :param colorIndex: 0 or 1 to place a piece of that color index, 2 to empty the cell
+        """
+        index = self.index(position)
+        bit = 1 << index
+        for oldColorIndex in range(2):
+            if self.pieces[oldColorIndex] & bit:
+                self.pieces[oldColorIndex] ^= bit
+                self.key ^= self.cellKeys[oldColorIndex][index]
+        if colorIndex != 2:
+            self.pieces[colorIndex] |= bit
+            self.key ^= self.cellKeys[colorIndex][index]
+
+    def __eq__(self, other):
+        """
+        Compare two game boards.
+        :param other: the other board being compared
+        :return if the two boards are the same
+        """
+        if other is None: return False
+        return self.width == other.width and self.height == other.height and self.pieces == other.pieces
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        """
+        The hash function of the game board.
+        :return the hash value of the game board
+        """
+        return hash(self.key)
+
+    def __getstate__(self):
+        """
+        Pickle the pieces only, since the tables of the board size are the same in every process.
+        """
+        return self.width, self.height, self.pieces, self.key
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def copy(self):
+        """
+        :return a copy of the game board
+        """
+        return Board(self.width, self.height, self.pieces, self.key)
+
+    def getKey(self, colorIndex):
+        """
+        :param colorIndex: the color index of the player to move
+        :return the Zobrist key of the board together with the player to move
+        """
+        return self.key ^ self.sideKeys[colorIndex]
+
+    def initialColor(self, index):
+        """
+        :param index: the bit index of a cell
+        :return the color index of the piece on the cell at the beginning of the game
+        """
+        return 0 if (initialPieces(self.width, self.height)[0] >> index) & 1 else 1
+
+    def empty(self):
+        """
+        :return the mask of empty cells
+        """
+        return self.full & ~(self.pieces[0] | self.pieces[1])
+
+    def count(self, colorIndex):
+        """
+        :param colorIndex: the color index being counted
+        :return the number of pieces of a color
+        """
+        return popcount(self.pieces[colorIndex])
+
+    def jumpLayers(self, colorIndex):
+        """
+        Calculate, for each direction, the masks of pieces which can jump 1, 2, 3... times in a row.
+        The k-th layer is the (k-1)-th layer masked by the shifted opponent and empty cells k hops away.
+        :param colorIndex: the color index of the player being checked
+        :return: a list with one list of masks per direction, in the order of self.directions
+        """
+        own = self.pieces[colorIndex]
+        other = self.pieces[1-colorIndex]
+        empty = self.empty()
+
+        result = []
+        for step in self.directions:
+            layers = []
+            movable = own
+            distance = step
+            while True:
+                movable &= shift(other, -distance) & shift(empty, -distance-step)
+                if not movable:
+                    break
+                layers.append(movable)
+                distance += 2 * step
+            result.append(layers)
+        return result
+
+    def hasMove(self, colorIndex):
+        """
+        :param colorIndex: the color index of the player being checked
+        :return True if the player can make at least one jump
+        """
+        own = self.pieces[colorIndex]
+        other = self.pieces[1-colorIndex]
+        empty = self.empty()
+        for step in self.directions:
+            if own & shift(other, -step) & shift(empty, -2*step):
+                return True
+        return False
+
+    def countMoves(self, colorIndex):
+        """
+        Calculate the number of single jumps of a player.
+        :param colorIndex: the color index of the player being checked
+        :return: the number of single jumps
+        """
+        own = self.pieces[colorIndex]
+        other = self.pieces[1-colorIndex]
+        empty = self.empty()
+        result = 0
+        for step in self.directions:
+            result += popcount(own & shift(other, -step) & shift(empty, -2*step))
+        return result
+
+    def countMovesPreferLonger(self, colorIndex):
+        """
+        Calculate the number of jumps of a player, where a piece that can jump k times in
+        one direction is counted k times.
+        :param colorIndex: the color index of the player being checked
+        :return: the number of jumps
+        """
+        result = 0
+        for layers in self.jumpLayers(colorIndex):
+            for movable in layers:
+                result += popcount(movable)
+        return result
+
+    def getJumps(self, colorIndex):
+        """
+        Generate the jumps of a player. Pieces are scanned by x then y, and each piece tries the
+        directions -x, +x, -y, +y with the shorter jumps first.
+        :param colorIndex: the color index of the player being checked
+        :return: a list of tuples (initial index, step, hops)
+        """
+        allLayers = self.jumpLayers(colorIndex)
+        movable = 0
+        for layers in allLayers:
+            if layers:
+                movable |= layers[0]
+
+        jumps = []
+        while movable:
+            lowest = movable & -movable
+            movable ^= lowest
+            index = lowest.bit_length() - 1
+            for step, layers in zip(self.directions, allLayers):
+                for hops in range(len(layers)):
+                    if not layers[hops] & lowest:
+                        break
+                    jumps.append((index, step, hops + 1))
+        return jumps
+
+    def randomJump(self, colorIndex, generator):
+        """
+        Choose one of the jumps of a player uniformly at random without generating them all. Each jump is
+        one piece of one layer of jumpLayers, so a number below the total of the layers is counted down
+        layer by layer, then piece by piece.
+        :param colorIndex: the color index of the player being checked
+        :param generator: the random.Random choosing the jump
+        :return: a tuple (initial index, step, hops), None if the player cannot jump
+        """
+        allLayers = self.jumpLayers(colorIndex)
+        counts = [[popcount(movable) for movable in layers] for layers in allLayers]
+        total = sum(sum(layerCounts) for layerCounts in counts)
+        if not total:
+            return None
+        number = int(generator.random() * total)
+        for step, layers, layerCounts in zip(self.directions, allLayers, counts):
+            for hops in range(len(layers)):
+                if number < layerCounts[hops]:
+                    movable = layers[hops]
+                    for i in range(number):
+                        movable &= movable - 1
+                    return ((movable & -movable).bit_length() - 1, step, hops + 1)
+                number -= layerCounts[hops]
+
+    def jumpMasks(self, index, step, hops):
+        """
+        A jump of zero hops has the same initial and destination cell, so it removes the piece.
+        :param index: the bit index of the jumping piece
+        :param step: the bit distance between two neighbouring cells in the direction of the jump
+        :param hops: the number of jumps in a row
+        :return: a tuple of the masks of the initial cell, the destination cell and the captured pieces
+        """
+        return 1 << index, 1 << (index + 2 * hops * step), self.jumps[index, step, hops][1]
+
+    def jumpKey(self, colorIndex, index, step, hops):
+        """
+        Calculate the change of the Zobrist key made by a jump, which is its own inverse.
+        :param colorIndex: the color index of the jumping piece
+        :param index: the bit index of the jumping piece
+        :param step: the bit distance between two neighbouring cells in the direction of the jump
+        :param hops: the number of jumps in a row
+        :return: the value to XOR into the key
+        """
+        return self.jumps[index, step, hops][2 + colorIndex]
+
+    def applyJump(self, colorIndex, index, step, hops):
+        """
+        Make a jump on the board.
+        :param colorIndex: the color index of the jumping piece
+        :param index: the bit index of the jumping piece
+        :param step: the bit distance between two neighbouring cells in the direction of the jump
+        :param hops: the number of jumps in a row
+        """
+        entry = self.jumps[index, step, hops]
+        self.pieces[colorIndex] ^= entry[0]
+        self.pieces[1-colorIndex] &= ~entry[1]
+        self.key ^= entry[2 + colorIndex]
+
+    def undoJump(self, colorIndex, index, step, hops):
+        """
+        Undo a jump made by applyJump, which restores the moved piece and the captured pieces.
+        :param colorIndex: the color index of the jumping piece
+        :param index: the bit index of the jumping piece
+        :param step: the bit distance between two neighbouring cells in the direction of the jump
+        :param hops: the number of jumps in a row
+        """
+        entry = self.jumps[index, step, hops]
+        self.pieces[colorIndex] ^= entry[0]
+        self.pieces[1-colorIndex] |= entry[1]
+        self.key ^= entry[2 + colorIndex]
+
+    def jumpToMove(self, jump):
+        """
+        :param jump: a tuple (initial index, step, hops)
+        :return: a tuple of the initial and destination positions of the jump
+        """
+        index, step, hops = jump
+        return (self.position(index), self.position(index + 2 * hops * step))
+
+    def moveToJump(self, initialPosition, destinationPosition):
+        """
+        Convert a straight move between two positions into a jump. Assume the move is legal.
+        :param initialPosition: a tuple of coordinate (x,y)
+        :param destinationPosition: a tuple of coordinate (x,y)
+        :return: a tuple (initial index, step, hops)
+        """
+        if initialPosition[0] == destinationPosition[0]:
+            distance = destinationPosition[1] - initialPosition[1]
+            step = 1 if distance > 0 else -1
+        else:
+            distance = destinationPosition[0] - initialPosition[0]
+            step = self.stride if distance > 0 else -self.stride
+        return (self.index(initialPosition), step, abs(distance) // 2)
+
+    def makeMove(self, initialPosition, destinationPosition, colorIndex):
+        """
+        Make move by changing the board. Assume the move is legal.
+        :param initialPosition: a tuple of coordinate (x,y)
+        :param destinationPosition: a tuple of coordinate (x,y)
+        :param colorIndex: the color index of the piece being moved
+        """
+        index, step, hops = self.moveToJump(initialPosition, destinationPosition)
+        self.applyJump(colorIndex, index, step, hops)
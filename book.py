@@ -0,0 +1,133 @@
+import argparse
+import json
+
+from agent import minimaxAlphaBetaInPlace
+from bitboard import Board
+from game import GameState
+from ordering import MoveOrdering
+from symmetry import getSymmetry
+from transposition import TranspositionTable
+
+class OpeningBook:
+    """
+    The best moves of the positions at the start of a game, searched deeply in advance. Positions
+    are found by the Zobrist key of their canonical board together with the color to move, so one
+    entry serves all the equivalent boards, and moves are stored on the canonical board. The
+    evaluation is symmetric, so the best move only depends on the position, and values are stored
+    for the player to move.
+    """
+
+    def __init__(self, width, height, depth, entries=None):
+        """
+        :param width: width of the game board
+        :param height: height of the game board
+        :param depth: the depth the positions were searched to
+        :param entries: a dictionary from key to a tuple of the value and the best move as generated by
+            getMoves on the canonical board, None for an empty book
+        """
+        self.width = width
+        self.height = height
+        self.depth = depth
+        self.entries = entries if entries is not None else {}
+        self.symmetry = getSymmetry(width, height)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, state, value, move):
+        """
+        :param state: a state of the game, class GameState
+        :param value: the value of the state for the computer
+        :param move: the best move of the state, as returned by the search
+        """
+        key, transform = self.symmetry.canonicalKey(state.board.pieces, state.colorIndex)
+        move = self.symmetry.transformMove(state.parseMove(move), transform)
+        self.entries[key] = (value if state.player == 'computer' else -value, move)
+
+    def lookup(self, state):
+        """
+        :param state: a state of the game, class GameState
+        :return: a tuple of the value of the state for the computer and the best move, None if the
+            state is not in the book
+        """
+        key, transform = self.symmetry.canonicalKey(state.board.pieces, state.colorIndex)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        value, move = entry
+        move = self.symmetry.transformMove(move, self.symmetry.inverses[transform])
+        return (value if state.player == 'computer' else -value), state.describeMove(move)
+
+    def save(self, path):
+        """
+        :param path: the path of the file the book is written to as JSON
+        """
+        entries = [[key, value, move] for key, (value, move) in sorted(self.entries.items())]
+        with open(path, 'w') as bookFile:
+            json.dump({'width': self.width, 'height': self.height, 'depth': self.depth, 'entries': entries}, \
+                bookFile)
+
+
+def buildBook(width, height, depth, plies, ifPrint=False):
+    """
+    Search every position reachable in the first moves of a game. The removals of the first two
+    rounds and the first jumps are played from every position for both colors, and all searches
+    share a transposition table and the move ordering. The dark player is the computer throughout,
+    so the values in the shared table always belong to the same player. Equivalent positions are
+    searched once.
+    :param width: width of the game board
+    :param height: height of the game board
+    :param depth: the depth of the alpha beta search of each position
+    :param plies: the number of moves from the start, so the positions of rounds 1 to plies are in the book
+    :param ifPrint: a boolean represents if the progress is printed
+    :return: the book, class OpeningBook
+    """
+    book = OpeningBook(width, height, depth)
+    table = TranspositionTable()
+    ordering = MoveOrdering()
+    state = GameState(Board(width, height), None, 'computer', 0)
+    state.symmetry = book.symmetry
+    states = [state]
+    for round in range(1, plies + 1):
+        successors = {}
+        for state in states:
+            if round > 2 and not state.board.hasMove(state.colorIndex):
+                continue
+            ordering.newSearch(round)
+            value, move, minimaxInfo = minimaxAlphaBetaInPlace(state.copy(), depth, round, \
+                float('-inf'), float('inf'), table, None, ordering)
+            book.add(state, value, move)
+            # the next round searches every position once, whichever move led to it
+            for successor in state.generateSuccessors(round):
+                successors[successor.getTableKey()[0]] = successor
+        if ifPrint:
+            print 'Round', round, 'has', len(states), 'positions'
+        states = successors.values()
+    return book
+
+def loadBook(path):
+    """
+    :param path: the path of a book written by OpeningBook.save
+    :return: the book, class OpeningBook
+    """
+    with open(path) as bookFile:
+        data = json.load(bookFile)
+    entries = {}
+    for key, value, move in data['entries']:
+        # JSON turns the tuples into lists
+        entries[key] = (value, tuple(move))
+    return OpeningBook(data['width'], data['height'], data['depth'], entries)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the opening book of Konane for a board size.')
+    parser.add_argument('width', type=int, help='width of the game board')
+    parser.add_argument('height', type=int, help='height of the game board')
+    parser.add_argument('--depth', type=int, default=6, help='depth of the search of each position')
+    parser.add_argument('--plies', type=int, default=4, help='number of moves from the start in the book')
+    parser.add_argument('--output', default=None, help='file the book is written to, WxH.book if None')
+    args = parser.parse_args()
+    path = args.output or '%dx%d.book' % (args.width, args.height)
+    book = buildBook(args.width, args.height, args.depth, args.plies, True)
+    book.save(path)
+    print 'Wrote', len(book), 'positions to', path
@@ -0,0 +1,102 @@
+# Short partizan games in canonical form. A game is a tuple (left options, right options) of two
+# frozensets of games, where Left is the dark player and Right the light player. Canonical forms
+# are unique, so equal games are equal tuples and can be memoized and compared with ==.
+ZERO = (frozenset(), frozenset())
+
+_LESS_EQUAL = {}
+_SUMS = {}
+_CANONICAL = {}
+
+def lessEqual(g, h):
+    """
+    :param g: a game
+    :param h: a game
+    :return: True if g <= h, that is Left never does better in g than in h
+    """
+    key = (g, h)
+    result = _LESS_EQUAL.get(key)
+    if result is None:
+        # g <= h unless some left option of g is at least h or some right option of h is at most g
+        result = not any(lessEqual(h, gl) for gl in g[0]) and not any(lessEqual(hr, g) for hr in h[1])
+        _LESS_EQUAL[key] = result
+    return result
+
+def canonical(left, right):
+    """
+    Simplify a game by removing dominated options and bypassing reversible ones.
+    :param left: an iterable of the left options, each in canonical form
+    :param right: an iterable of the right options, each in canonical form
+    :return: the canonical form of the game
+    """
+    key = (frozenset(left), frozenset(right))
+    result = _CANONICAL.get(key)
+    if result is not None:
+        return result
+
+    left, right = set(key[0]), set(key[1])
+    changed = True
+    while changed:
+        changed = False
+        left = set(a for a in left if not any(b != a and lessEqual(a, b) for b in left))
+        right = set(a for a in right if not any(b != a and lessEqual(b, a) for b in right))
+        game = (frozenset(left), frozenset(right))
+        for a in list(left):
+            # a left option is reversible if Right has an answer to it which is no better for Left than the game
+            for ar in a[1]:
+                if lessEqual(ar, game):
+                    left.remove(a)
+                    left.update(ar[0])
+                    changed = True
+                    break
+            if changed:
+                break
+        if changed:
+            continue
+        for a in list(right):
+            for al in a[0]:
+                if lessEqual(game, al):
+                    right.remove(a)
+                    right.update(al[1])
+                    changed = True
+                    break
+            if changed:
+                break
+
+    result = _CANONICAL[key] = (frozenset(left), frozenset(right))
+    return result
+
+def add(g, h):
+    """
+    :param g: a game in canonical form
+    :param h: a game in canonical form
+    :return: the canonical form of the disjunctive sum, where each move is made in one of the games
+    """
+    if g == ZERO:
+        return h
+    if h == ZERO:
+        return g
+    key = (g, h) if hash(g) <= hash(h) else (h, g)
+    result = _SUMS.get(key)
+    if result is None:
+        left = [add(gl, h) for gl in g[0]] + [add(g, hl) for hl in h[0]]
+        right = [add(gr, h) for gr in g[1]] + [add(g, hr) for hr in h[1]]
+        result = _SUMS[key] = canonical(left, right)
+    return result
+
+def firstPlayerWins(g, colorIndex):
+    """
+    :param g: a game
+    :param colorIndex: the color index of the player moving first, 0 for Left
+    :return: True if the player moving first wins, the player who cannot move losing
+    """
+    if colorIndex == 0:
+        return not lessEqual(g, ZERO)
+    return not lessEqual(ZERO, g)
+
+def clearCaches():
+    """
+    Forget the memoized comparisons, sums and canonical forms.
+    """
+    _LESS_EQUAL.clear()
+    _SUMS.clear()
+    _CANONICAL.clear()
@@ -0,0 +1,318 @@
+import json
+import sys
+
+from agent import MinimaxInfo
+from bitboard import Board
+from evaluation import parseWeights
+from game import Game
+from game import GameState
+from game import SearchSettings
+
+# option name -> (type, default), set with the option command
+OPTIONS = {
+    'depth': (int, 4),
+    'time': (float, None),
+    'alphabeta': (bool, True),
+    'inplace': (bool, True),
+    'table': (bool, True),
+    'ordering': (bool, True),
+    'incremental': (bool, False),
+    'batch': (bool, False),
+    'pvs': (bool, False),
+    'lmr': (bool, False),
+    'symmetry': (bool, False),
+    'regions': (bool, False),
+    'tablebase': (str, None),
+    'book': (str, None),
+    'stats': (bool, False),
+    'hash': (int, None),
+    'hashpolicy': (str, 'depth'),
+    'mcts': (bool, False),
+    'playouts': (int, 1000),
+    'mctsbatch': (int, 1),
+    'weights': (parseWeights, None),
+}
+# option name -> the name of the setting of SearchSettings it sets
+SETTINGS = {
+    'depth': 'minimaxDepth',
+    'time': 'timeLimit',
+    'alphabeta': 'ifAlphaBeta',
+    'inplace': 'ifInPlace',
+    'table': 'ifTable',
+    'ordering': 'ifOrdering',
+    'incremental': 'ifIncremental',
+    'batch': 'ifBatch',
+    'pvs': 'ifPVS',
+    'lmr': 'ifReductions',
+    'symmetry': 'ifSymmetry',
+    'regions': 'ifRegions',
+    'tablebase': 'tablebasePath',
+    'book': 'bookPath',
+    'stats': 'ifStatistics',
+    'hash': 'tableMegabytes',
+    'hashpolicy': 'tablePolicy',
+    'mcts': 'ifMCTS',
+    'playouts': 'mctsIterations',
+    'mctsbatch': 'mctsBatch',
+    'weights': 'evaluationWeights',
+}
+# the options which decide the tables and helpers shared by the searches; pvs decides whether the values of the
+# table are for the computer or for the player to move, so the table is not shared across it
+SHARED_OPTIONS = ('table', 'ordering', 'symmetry', 'regions', 'tablebase', 'book', 'stats', 'hash', 'hashpolicy', \
+    'mcts', 'playouts', 'mctsbatch', 'weights', 'pvs')
+
+def parseOption(name, text):
+    """
+    :param name: the name of an option
+    :param text: the value of the option as written in a command
+    :return: the value of the option
+    """
+    kind = OPTIONS[name][0]
+    if text in ('none', ''):
+        return None
+    if kind is bool:
+        if text not in ('true', 'false', 'on', 'off', '1', '0'):
+            raise ValueError('not a boolean: ' + text)
+        return text in ('true', 'on', '1')
+    return kind(text)
+
+def formatMove(move):
+    """
+    :param move: the position of a removal, or a tuple of the initial and destination positions of a jump
+    :return: the move as written in the protocol, x,y for a removal and x,y-x,y for a jump
+    """
+    if move is None:
+        return 'none'
+    if isinstance(move[0], tuple):
+        return '%d,%d-%d,%d' % (move[0] + move[1])
+    return '%d,%d' % move
+
+def parseMove(text):
+    """
+    :param text: a move as written in the protocol
+    :return: the position of a removal, or a tuple of the initial and destination positions of a jump
+    """
+    positions = [tuple(int(number) for number in position.split(',')) for position in text.split('-')]
+    if len(positions) > 2 or any(len(position) != 2 for position in positions):
+        raise ValueError('not a move: ' + text)
+    return positions[0] if len(positions) == 1 else tuple(positions)
+
+
+class Engine:
+    """
+    A Konane engine without a user interface, driven by one command per line and answering each with
+    one line. The game, its transposition table, move ordering history, region solver and opening book
+    live as long as the engine, so each search starts from what the previous ones learnt; they are only
+    rebuilt when the board size or an option deciding them changes.
+
+    Commands:
+        new [width height]          start a game, dark to move
+        position round rows         set the board, rows from y=1 separated by /, with X, O and . per cell
+        move m                      play a move, x,y for a removal and x,y-x,y for a jump
+        moves                       list the legal moves
+        go [depth n] [time t]       search, answered by bestmove m value v
+        option name value           set an option of OPTIONS
+        board                       print the position in the format of the position command
+        stats                       print the meta information of the last search, of the session and of the table as JSON
+        quit                        stop
+    Answers are ok, error followed by a message, or the result of the command.
+    """
+
+    def __init__(self, width=8, height=8):
+        """
+        :param width: width of the game board
+        :param height: height of the game board
+        """
+        self.options = dict((name, default) for name, (kind, default) in OPTIONS.items())
+        self.game = None
+        self.configured = None
+        self.newGame(width, height)
+        self.lastInfo = MinimaxInfo()
+        self.totalInfo = MinimaxInfo()
+
+    def newGame(self, width, height):
+        """
+        Start a game from the full board. The shared tables are kept when the size does not change.
+        :param width: width of the game board
+        :param height: height of the game board
+        """
+        if self.game is not None and (self.game.board.width, self.game.board.height) == (width, height):
+            self.setBoard(Board(width, height), 1)
+            return
+        if self.game is not None:
+            self.game.close()
+        self.game = Game('computer', width, height)
+        self.configured = None
+        self.round = 1
+
+    def setBoard(self, board, round):
+        """
+        :param board: the new board, class Board
+        :param round: the number of round of the next move
+        """
+        # the grid views the board of the game, so it is updated in place
+        self.game.board.pieces = list(board.pieces)
+        self.game.board.key = board.key
+        self.round = round
+
+    def configure(self):
+        """
+        Build the tables and helpers of the game again if an option deciding them changed.
+        """
+        shared = tuple(self.options[name] for name in SHARED_OPTIONS)
+        if shared == self.configured:
+            return
+        self.game.close()
+        self.game.configure(self.settings())
+        self.configured = shared
+
+    def settings(self):
+        """
+        :return: the settings of the searches given by the options, class SearchSettings
+        """
+        settings = dict((SETTINGS[name], value) for name, value in self.options.items())
+        if settings['evaluationWeights']:
+            settings['evaluationWeights'] = dict(settings['evaluationWeights'])
+        return SearchSettings(**settings)
+
+    def state(self):
+        """
+        :return: the state of the player to move. The dark player is always the computer, so the values in the
+            shared transposition table belong to the same player whichever color is to move
+        """
+        # the dark player removes first and the colors alternate every round
+        colorIndex = (self.round - 1) % 2
+        return GameState(self.game.board.copy(), None, 'computer' if colorIndex == 0 else 'user', colorIndex)
+
+    def legalMoves(self):
+        """
+        :return: the list of the legal moves of the player to move, as positions
+        """
+        state = self.state()
+        if self.round > 2 and not state.board.hasMove(state.colorIndex):
+            return []
+        return [state.describeMove(move) for move in state.getAllMoves(self.round)]
+
+    def play(self, move):
+        """
+        :param move: the position of a removal, or a tuple of the initial and destination positions of a jump
+        """
+        if move not in self.legalMoves():
+            raise ValueError('illegal move ' + formatMove(move))
+        state = self.state()
+        state.makeMove(state.parseMove(move))
+        self.setBoard(state.board, self.round + 1)
+
+    def search(self, depth, timeLimit):
+        """
+        :param depth: the depth of the search, the deepest iteration with a time limit
+        :param timeLimit: the time budget of the search in seconds, None for a fixed depth search
+        :return: a tuple of the value for the player to move and the best move, None if there is no move
+        """
+        if not self.legalMoves():
+            return None
+        self.configure()
+        state = self.state()
+        settings = self.settings().replace(minimaxDepth=depth, timeLimit=timeLimit)
+        value, move, minimaxInfo = self.game.search(state, self.round, settings)
+        self.lastInfo = minimaxInfo
+        self.totalInfo += minimaxInfo
+        return (value if state.player == 'computer' else -value), move
+
+    def describeBoard(self):
+        """
+        :return: the round and rows of the position, as written in the position command
+        """
+        grid = self.game.grid
+        rows = [''.join(grid[x, y] for x in range(1, grid.width + 1)) for y in range(1, grid.height + 1)]
+        return '%d %s' % (self.round, '/'.join(rows))
+
+    def parseBoard(self, rows):
+        """
+        :param rows: the rows of a position command
+        :return: the board, class Board
+        """
+        rows = rows.split('/')
+        width, height = len(rows[0]), len(rows)
+        if any(len(row) != width for row in rows) or any(cell not in 'XO.' for row in rows for cell in row):
+            raise ValueError('rows must be of the same length and made of X, O and .')
+        board = Board(width, height, (0, 0))
+        for y, row in enumerate(rows):
+            for x, cell in enumerate(row):
+                if cell != '.':
+                    board[x + 1, y + 1] = 'XO'.index(cell)
+        return board
+
+    def execute(self, line):
+        """
+        :param line: a command
+        :return: the answer, None to stop
+        """
+        words = line.split()
+        if not words:
+            return ''
+        command, arguments = words[0], words[1:]
+        try:
+            if command == 'quit':
+                return None
+            if command == 'new':
+                if arguments:
+                    self.newGame(int(arguments[0]), int(arguments[1]))
+                else:
+                    self.newGame(self.game.board.width, self.game.board.height)
+                return 'ok'
+            if command == 'position':
+                board = self.parseBoard(arguments[1])
+                self.newGame(board.width, board.height)
+                self.setBoard(board, int(arguments[0]))
+                return 'ok'
+            if command == 'move':
+                self.play(parseMove(arguments[0]))
+                return 'ok'
+            if command == 'moves':
+                return ' '.join(['moves'] + [formatMove(move) for move in self.legalMoves()])
+            if command == 'go':
+                settings = dict(zip(arguments[::2], arguments[1::2]))
+                depth = int(settings.get('depth', self.options['depth']))
+                timeLimit = float(settings['time']) if 'time' in settings else self.options['time']
+                result = self.search(depth, timeLimit)
+                if result is None:
+                    return 'bestmove none'
+                return 'bestmove %s value %s' % (formatMove(result[1]), result[0])
+            if command == 'option':
+                if arguments[0] not in OPTIONS:
+                    raise ValueError('unknown option ' + arguments[0])
+                self.options[arguments[0]] = parseOption(arguments[0], ' '.join(arguments[1:]))
+                return 'ok'
+            if command == 'board':
+                return 'board ' + self.describeBoard()
+            if command == 'stats':
+                data = {'last': self.lastInfo.toDict(), 'session': self.totalInfo.toDict()}
+                if self.game.table is not None:
+                    data['table'] = self.game.table.statistics()
+                return 'stats ' + json.dumps(data, sort_keys=True)
+            return 'error unknown command ' + command
+        except Exception as error:
+            # a malformed command, an illegal move, or a tablebase or book which cannot be used
+            return 'error ' + str(error)
+
+    def run(self, input=sys.stdin, output=sys.stdout):
+        """
+        Answer the commands read from input until quit or the end of the input.
+        :param input: the file the commands are read from
+        :param output: the file the answers are written to, flushed after each answer
+        """
+        while True:
+            line = input.readline()
+            if not line:
+                break
+            answer = self.execute(line)
+            if answer is None:
+                break
+            output.write(answer + '\n')
+            output.flush()
+        self.game.close()
+
+
+if __name__ == '__main__':
+    Engine().run()
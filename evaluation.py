@@ -0,0 +1,351 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from bitboard import popcount
+from bitboard import shift
+
+_LINE_MOBILITY = {}
+# below this many boards the overhead of NumPy calls is larger than evaluating them one by one
+BATCH_MINIMUM = 16
+# the features of a color computed by extractFeatures: its single jumps, its jumps where a piece that can jump
+# k times in one direction is counted k times, its pieces, its pieces on the edge and its pieces in the corners
+FEATURES = ('mobility', 'multiJumpMobility', 'pieces', 'edges', 'corners')
+
+def lineMobility(length, dark, light):
+    """
+    Calculate the mobility of both colors along a single row or column, where a piece that can
+    jump k times in one direction is counted k times. The result only depends on the content of
+    the line, so it is memoized.
+    :param length: the number of cells of the line
+    :param dark: the mask of the dark pieces of the line
+    :param light: the mask of the light pieces of the line
+    :return: a tuple of the mobility of the dark and the light pieces along the line
+    """
+    key = (length, dark, light)
+    result = _LINE_MOBILITY.get(key)
+    if result is None:
+        empty = ((1 << length) - 1) & ~(dark | light)
+        result = []
+        for own, other in ((dark, light), (light, dark)):
+            moves = 0
+            for step in (-1, 1):
+                movable = own
+                distance = step
+                while movable:
+                    movable &= shift(other, -distance) & shift(empty, -distance-step)
+                    moves += popcount(movable)
+                    distance += 2 * step
+            result.append(moves)
+        result = _LINE_MOBILITY[key] = tuple(result)
+    return result
+
+
+def mobilityScore(player, checkColorMoves, otherColorMoves):
+    """
+    Calculate the evaluation score of a state from the mobility of both players.
+    :param player: the player to move in the state
+    :param checkColorMoves: the mobility of the player to move
+    :param otherColorMoves: the mobility of the other player
+    :return: the evaluation value for the computer
+    """
+    # if player has no move, then player lost, -inf or inf depend on who the player is
+    # if player has moves, use heuristics.
+    if player == 'computer':
+        if checkColorMoves == 0: #computer doesn't have moves
+            return float('-inf')
+        elif otherColorMoves == 0: #user doesn't have moves
+            return float('inf')
+        else:
+            return checkColorMoves - otherColorMoves
+    else:
+        if checkColorMoves == 0: #user doesn't have moves
+            return float('inf')
+        elif otherColorMoves == 0: #computer doesn't have moves
+            return float('-inf')
+        else:
+            return otherColorMoves - checkColorMoves
+
+def extractFeatures(board):
+    """
+    Calculate the features of both colors in one sweep of the board: the shifted empty cells of each
+    direction and distance are shared by both colors, and every jump layer gives the single jumps and
+    the multiple jumps at once.
+    :param board: the bitboard, class Board
+    :return: a tuple of the features of the dark and of the light pieces, each a list in the order of FEATURES
+    """
+    dark, light = board.pieces
+    empty = board.empty()
+    darkMobility = lightMobility = darkMultiple = lightMultiple = 0
+    for step in board.directions:
+        movableDark, movableLight = dark, light
+        # the shifts are written out, since this is the cost of a leaf
+        distance = abs(step)
+        while movableDark or movableLight:
+            if step > 0:
+                landing = empty >> (distance + step)
+                movableDark &= (light >> distance) & landing
+                movableLight &= (dark >> distance) & landing
+            else:
+                landing = empty << (distance - step)
+                movableDark &= (light << distance) & landing
+                movableLight &= (dark << distance) & landing
+            darkCount = bin(movableDark).count('1') if movableDark else 0
+            lightCount = bin(movableLight).count('1') if movableLight else 0
+            if distance == abs(step):
+                darkMobility += darkCount
+                lightMobility += lightCount
+            darkMultiple += darkCount
+            lightMultiple += lightCount
+            distance += 2 * abs(step)
+    edges, corners = board.geometry.edges, board.geometry.corners
+    return ([darkMobility, darkMultiple, popcount(dark), popcount(dark & edges), popcount(dark & corners)], \
+        [lightMobility, lightMultiple, popcount(light), popcount(light & edges), popcount(light & corners)])
+
+def featureWeights(weights):
+    """
+    :param weights: a dictionary of the name of a feature of FEATURES -> its weight, the features left out weigh 0
+    :return: the tuple of the weights in the order of FEATURES
+    """
+    for name, weight in weights.items():
+        if name not in FEATURES:
+            raise Exception('Features can only be ' + ', '.join(FEATURES))
+        # BoundedTranspositionTable stores the values as integers
+        if not isinstance(weight, (int, long)):
+            raise Exception('Weights can only be integers')
+    return tuple(weights.get(name, 0) for name in FEATURES)
+
+def parseWeights(text):
+    """
+    :param text: the weights of the features as written on a command line, such as 'multiJumpMobility:2,edges:-1'
+    :return: the sorted tuple of the pairs of the name of a feature and its weight, which can be hashed, so
+        the weights can be a part of the key of the engines of the server; dict() makes them the dictionary
+        Game.configure takes
+    """
+    weights = {}
+    for item in text.split(','):
+        name, _, weight = item.partition(':')
+        weights[name] = int(weight)
+    featureWeights(weights)
+    return tuple(sorted(weights.items()))
+
+def weightedScore(player, colorIndex, features, weights):
+    """
+    Calculate the evaluation score of a state as the weighted sum of the differences of the features
+    of both colors. A player to move without a jump has lost, as in mobilityScore.
+    :param player: the player to move in the state
+    :param colorIndex: the color index of the player to move
+    :param features: the features of both colors returned by extractFeatures
+    :param weights: the weights of the features in the order of FEATURES
+    :return: the evaluation value for the computer
+    """
+    own, other = features[colorIndex], features[1-colorIndex]
+    score = mobilityScore(player, own[0], other[0])
+    if score in (float('inf'), float('-inf')):
+        return score
+    value = 0
+    for weight, ownValue, otherValue in zip(weights, own, other):
+        value += weight * (ownValue - otherValue)
+    return value if player == 'computer' else -value
+
+def isBatchWorthwhile(numberBoards):
+    """
+    :param numberBoards: the number of boards to evaluate
+    :return: True if evaluating the boards together with evaluateBatch is faster than one by one
+    """
+    return numpy is not None and numberBoards >= BATCH_MINIMUM
+
+def unpackBoards(listOfPieces, width, height):
+    """
+    Unpack the bitboards of many boards into boolean arrays.
+    :param listOfPieces: a list of the masks of the dark and the light pieces of each board
+    :param width: width of the game boards
+    :param height: height of the game boards
+    :return: a tuple of the arrays of the dark and the light pieces, each of shape (boards, width, height)
+    """
+    stride = height + 1
+    size = (width * stride + 7) // 8
+    digits = '%0' + str(2 * size) + 'x'
+    result = []
+    for colorIndex in range(2):
+        hexadecimal = ''.join(digits % pieces[colorIndex] for pieces in listOfPieces)
+        # the bytes of every board are big-endian, reverse them to get bit 0 first
+        data = numpy.frombuffer(hexadecimal.decode('hex'), dtype=numpy.uint8).reshape(len(listOfPieces), size)
+        bits = numpy.unpackbits(data[:, ::-1], axis=1).reshape(len(listOfPieces), size, 8)[:, :, ::-1]
+        bits = bits.reshape(len(listOfPieces), size * 8)[:, :width * stride]
+        result.append(bits.reshape(len(listOfPieces), width, stride)[:, :, :height].astype(bool))
+    return tuple(result)
+
+def countMovesBatch(own, other, empty):
+    """
+    Calculate the mobility of a color on many boards at once, where a piece that can jump k times
+    in one direction is counted k times. Each direction is handled by flipping and transposing the
+    arrays so that it points towards higher x, then the k-th jump compares the cells 2k-1 and 2k
+    further along.
+    :param own: the boolean array of the pieces of the color, of shape (boards, width, height)
+    :param other: the boolean array of the pieces of the other color
+    :param empty: the boolean array of the empty cells
+    :return: an integer array of the mobility of each board
+    """
+    result = numpy.zeros(own.shape[0], dtype=numpy.int64)
+    for view in (lambda a: a, lambda a: a[:, ::-1, :], lambda a: a.swapaxes(1, 2), \
+            lambda a: a.swapaxes(1, 2)[:, ::-1, :]):
+        ownView, otherView, emptyView = view(own), view(other), view(empty)
+        length = ownView.shape[1]
+        movable = ownView
+        hops = 1
+        while 2 * hops < length:
+            movable = movable[:, :length-2*hops] & otherView[:, 2*hops-1:length-1] & emptyView[:, 2*hops:]
+            counts = movable.sum(axis=(1, 2))
+            if not counts.any():
+                break
+            result += counts
+            hops += 1
+    return result
+
+def evaluateBatch(listOfPieces, width, height, colorIndex, player):
+    """
+    Evaluate many boards which have the same player to move, like GameState.evaluate does one by one.
+    :param listOfPieces: a list of the masks of the dark and the light pieces of each board
+    :param width: width of the game boards
+    :param height: height of the game boards
+    :param colorIndex: the color index of the player to move
+    :param player: the player to move
+    :return: a list of the evaluation values
+    """
+    pieces = unpackBoards(listOfPieces, width, height)
+    empty = ~(pieces[0] | pieces[1])
+    checkColorMoves = countMovesBatch(pieces[colorIndex], pieces[1-colorIndex], empty).tolist()
+    otherColorMoves = countMovesBatch(pieces[1-colorIndex], pieces[colorIndex], empty).tolist()
+    return [mobilityScore(player, check, other) for check, other in zip(checkColorMoves, otherColorMoves)]
+
+
+class MobilityTracker:
+    """
+    Keep the mobility and the piece count of both colors up to date while moves are made and
+    undone on a board. The mobility is the sum of the mobility of every row and column, so a move
+    only recomputes the lines it touches: the line it moves along and the crossing line of every
+    cell it changes. Rows are read from a transposed copy of the pieces, so every line is a shift
+    and a mask away.
+    """
+
+    def __init__(self, board):
+        """
+        :param board: the bitboard being tracked, class Board
+        """
+        self.board = board
+        self.width = board.width
+        self.height = board.height
+        self.stride = board.stride
+        self.rowStride = board.width + 1
+        self.columnMask = (1 << board.height) - 1
+        self.rowMask = (1 << board.width) - 1
+        self.jumps = board.geometry.jumps
+        self.reset()
+
+    def reset(self):
+        """
+        Recompute everything from the board.
+        """
+        board = self.board
+        self.transposed = [0, 0]
+        for colorIndex in range(2):
+            bits = board.pieces[colorIndex]
+            while bits:
+                lowest = bits & -bits
+                bits ^= lowest
+                self.transposed[colorIndex] |= 1 << self.transpose(lowest.bit_length() - 1)
+        self.pieces = [board.count(0), board.count(1)]
+        self.columns = [self.columnMobility(x) for x in range(self.width)]
+        self.rows = [self.rowMobility(y) for y in range(self.height)]
+        self.moves = [0, 0]
+        for dark, light in self.columns + self.rows:
+            self.moves[0] += dark
+            self.moves[1] += light
+        # the changed column and row numbers and their old mobility, one tuple per move made
+        self.history = []
+
+    def transpose(self, index):
+        """
+        :param index: the bit index of a cell on the board
+        :return: the bit index of the cell on the transposed board
+        """
+        return self.board.geometry.transpose(index)
+
+    def columnMobility(self, x):
+        """
+        :param x: the column number, starting from 0
+        :return: the mobility of both colors along the column
+        """
+        offset = x * self.stride
+        pieces = self.board.pieces
+        return lineMobility(self.height, (pieces[0] >> offset) & self.columnMask, \
+            (pieces[1] >> offset) & self.columnMask)
+
+    def rowMobility(self, y):
+        """
+        :param y: the row number, starting from 0
+        :return: the mobility of both colors along the row
+        """
+        offset = y * self.rowStride
+        return lineMobility(self.width, (self.transposed[0] >> offset) & self.rowMask, \
+            (self.transposed[1] >> offset) & self.rowMask)
+
+    def toggle(self, colorIndex, move):
+        """
+        Flip the cells a move changes on the transposed board.
+        Flipping is its own inverse, so the same call is used to undo the move.
+        :param colorIndex: the color index of the moving piece
+        :param move: a tuple (initial index, step, hops)
+        :return: a tuple of the changed column numbers and the changed row numbers
+        """
+        entry = self.jumps[move]
+        self.transposed[colorIndex] ^= entry[2]
+        self.transposed[1-colorIndex] ^= entry[3]
+        return entry[4], entry[5]
+
+    def makeMove(self, colorIndex, move):
+        """
+        Update the mobility after a move has been made on the board.
+        :param colorIndex: the color index of the moving piece
+        :param move: a tuple (initial index, step, hops)
+        """
+        columns, rows = self.toggle(colorIndex, move)
+        if move[2]:
+            self.pieces[1-colorIndex] -= move[2]
+        else:
+            self.pieces[colorIndex] -= 1
+
+        moves = self.moves
+        oldColumns = [self.columns[x] for x in columns]
+        oldRows = [self.rows[y] for y in rows]
+        for x, old in zip(columns, oldColumns):
+            new = self.columns[x] = self.columnMobility(x)
+            moves[0] += new[0] - old[0]
+            moves[1] += new[1] - old[1]
+        for y, old in zip(rows, oldRows):
+            new = self.rows[y] = self.rowMobility(y)
+            moves[0] += new[0] - old[0]
+            moves[1] += new[1] - old[1]
+        self.history.append((columns, oldColumns, rows, oldRows))
+
+    def undoMove(self, colorIndex, move):
+        """
+        Restore the mobility after the last move has been undone on the board.
+        :param colorIndex: the color index of the moving piece
+        :param move: a tuple (initial index, step, hops)
+        """
+        self.toggle(colorIndex, move)
+        if move[2]:
+            self.pieces[1-colorIndex] += move[2]
+        else:
+            self.pieces[colorIndex] += 1
+        columns, oldColumns, rows, oldRows = self.history.pop()
+        moves = self.moves
+        for lines, numbers, olds in ((self.columns, columns, oldColumns), (self.rows, rows, oldRows)):
+            for number, old in zip(numbers, olds):
+                new = lines[number]
+                lines[number] = old
+                moves[0] += old[0] - new[0]
+                moves[1] += old[1] - new[1]
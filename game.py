@@ -1,23 +1,54 @@
+import json
+import time
+
 from agent import minimaxNaive
 from agent import minimaxAlphaBeta
+from agent import minimaxNaiveInPlace
+from agent import minimaxAlphaBetaInPlace
+from agent import iterativeDeepening
+from agent import principalVariationSearch
 from agent import randomAgent
 from agent import MinimaxInfo
+from bitboard import Board
+from bitboard import popcount
+from transposition import TranspositionTable
+from transposition import BoundedTranspositionTable
+from transposition import DEPTH_PREFERRED
+from transposition import fitsBoard
+from ordering import MoveOrdering
+import evaluation
+from evaluation import MobilityTracker
+from evaluation import evaluateBatch
+from evaluation import extractFeatures
+from evaluation import featureWeights
+from evaluation import weightedScore
+from evaluation import mobilityScore
+from parallel import ParallelSearch
+from mcts import ITERATIONS
+from mcts import MonteCarloSearch
+from ponder import Ponderer
+from records import GameRecord
+from records import GameRecordWriter
+from symmetry import getSymmetry
+from regions import RegionSolver
+from tablebase import loadTablebase
 
 class Grid:
     """
-    A 2-dimensional array which represents the board of Konone.
+    A 2-dimensional view of the board of Konone, which is stored as a bitboard.
     """
 
-    def __init__(self, width=8, height=8):
+    def __init__(self, width=8, height=8, board=None):
         """
         :param width: width of the game board
         :param height: height of the game board
+        :param board: the bitboard being viewed, a new full board if None
         """
         self.REPRESENTATION = ['X', 'O', '.']
 
         self.width = width
         self.height = height
-        self.data = [[self.REPRESENTATION[(x + y) % 2] for y in range(height)] for x in range(width)]
+        self.board = board if board is not None else Board(width, height)
 
     def __getitem__(self, index):
         """
@@ -25,7 +56,7 @@ class Grid:
         :param index: index of the cell in the game board represented by a 2-tuple
         :return the value of the cell
         """
-        return self.data[index[0] - 1][index[1] - 1]
+        return self.REPRESENTATION[self.board[index]]
 
     def __setitem__(self, index, item):
         """
@@ -34,7 +65,7 @@ class Grid:
         :param item: the expected value of the cell in the game board
         """
         if item not in self.REPRESENTATION: raise Exception('Grids can only \'X\', \'O\' and \'.\'')
-        self.data[index[0] - 1][index[1] - 1] = item
+        self.board[index] = self.REPRESENTATION.index(item)
 
     def __str__(self):
         """
@@ -49,7 +80,7 @@ class Grid:
             out += '\n'
             out += str(i + 1) + '   '
             for j in range(self.width):
-                out += self.data[i][j] + ' '
+                out += self[i + 1, j + 1] + ' '
         return out
 
     def __eq__(self, other):
@@ -59,29 +90,20 @@ class Grid:
         :return if the two boards are the same
         """
         if other == None: return False
-        return self.data == other.data
+        return self.board == other.board
 
     def __hash__(self):
         """
         The hash function of the game board.
         :return the hash value of the game board
         """
-        base = 1
-        h = 0
-        for l in self.data:
-            for i in l:
-                if i:
-                    h += base
-                base *= 2
-        return hash(h)
+        return hash(self.board)
 
     def copy(self):
         """
         :return a deep copy of the game board
         """
-        g = Grid(self.width, self.height)
-        g.data = [x[:] for x in self.data]
-        return g
+        return Grid(self.width, self.height, self.board.copy())
 
     def deepCopy(self):
         """
@@ -93,47 +115,37 @@ class Grid:
         """
         :return a shallow copy of the game board
         """
-        g = Grid(self.width, self.height)
-        g.data = self.data
-        return g
+        return Grid(self.width, self.height, self.board)
 
     def countPlayerX(self):
         """
         :return the total number of dark pieces on the board
         """
-        return sum([x.count(self.REPRESENTATION[0]) for x in self.data])
+        return self.board.count(0)
 
     def countPlayerO(self):
         """
         :return the total number of light pieces on the board
         """
-        return sum([x.count(self.REPRESENTATION[1]) for x in self.data])
+        return self.board.count(1)
 
     def countPlayerXEdge(self):
         """
         :return the total number of dark pieces on the edge of the board
         """
-        result = self.data[0].count(self.REPRESENTATION[0]) + self.data[height-1].count(self.REPRESENTATION[0])
-        for x in range(1, height-1):
-            if self.data[x][0] == self.REPRESENTATION[0]:
-                result += 1
-        return result
+        return popcount(self.board.pieces[0] & self.board.geometry.edges)
 
-    def countPlayerYEdge(self):
+    def countPlayerOEdge(self):
         """
         :return the total number of light pieces on the edge of the board
         """
-        result = self.data[0].count(self.REPRESENTATION[1]) + self.data[height-1].count(self.REPRESENTATION[1])
-        for x in range(1, height-1):
-            if self.data[x][0] == self.REPRESENTATION[1]:
-                result += 1
-        return result
+        return popcount(self.board.pieces[1] & self.board.geometry.edges)
 
     def countEmptySpace(self):
         """
         :return the total number of empty cells on the board
         """
-        return sum([x.count(self.REPRESENTATION[2]) for x in self.data])
+        return popcount(self.board.empty())
 
     def asList(self):
         """
@@ -146,6 +158,108 @@ class Grid:
         return list
 
 
+class SearchSettings:
+    """
+    The settings of the searches of a game and of the tables and helpers they share, which Game.play,
+    Game.configure and Game.search take as one object. A new option of the search is a new setting here,
+    whose default keeps the searches as they were, so the calls which do not use it do not change.
+    """
+
+    def __init__(self, minimaxDepth=4, ifAlphaBeta=True, ifInPlace=False, ifTable=False, timeLimit=None, \
+            ifOrdering=False, ifIncremental=False, processes=None, ifBatch=False, tablebasePath=None, bookPath=None, \
+            ifSymmetry=False, ifPVS=False, ifReductions=False, ifRegions=False, ifStatistics=False, statsPath=None, \
+            ifPonder=False, recordPath=None, tableMegabytes=None, tablePolicy=DEPTH_PREFERRED, ifMCTS=False, \
+            mctsIterations=ITERATIONS, mctsBatch=1, evaluationWeights=None):
+        """
+        :param minimaxDepth: an integer represents the depth of the minimax search
+        :param ifAlphaBeta: a boolean represents whether to use alpha beta pruning in the minimax algorithm
+        :param ifInPlace: a boolean represents whether to make and undo moves on a single board while searching
+        :param ifTable: a boolean represents whether the alpha beta search uses a transposition table,
+            which is kept for the whole game
+        :param timeLimit: the time budget of each move in seconds, which makes the search iteratively deepen
+            an alpha beta search up to minimaxDepth, None for a fixed depth search
+        :param ifOrdering: a boolean represents whether the alpha beta search orders moves by the principal
+            variation, killer moves and the history heuristic
+        :param ifIncremental: a boolean represents whether the in place search updates the mobility of both
+            players incrementally instead of evaluating the whole board at every leaf
+        :param processes: the number of worker processes which search the successors of the root of the
+            fixed depth alpha beta search in parallel, None for a serial search; the search in parallel can be
+            neither a principal variation search, nor iterative deepening, nor pondering
+        :param ifBatch: a boolean represents whether the alpha beta search evaluates the successors one ply above
+            the leaves together, with NumPy when it is installed
+        :param tablebasePath: the path of an endgame tablebase of this board size written by tablebase.py, which
+            decides the positions with few pieces exactly, None to search them
+        :param bookPath: the path of an opening book of this board size written by book.py, whose moves are
+            played while the game is in the book, None to search every move
+        :param ifSymmetry: a boolean represents whether the search generates the moves leading to equivalent
+            boards of the first rounds once, and shares transposition table entries between equivalent boards
+        :param ifPVS: a boolean represents whether the alpha beta search is replaced by the negamax principal
+            variation search with aspiration windows, centred on the value of the previous search of the player
+        :param ifReductions: a boolean represents whether the principal variation search searches late moves
+            one ply shallower first
+        :param ifRegions: a boolean represents whether the positions of the jumping phase whose pieces fall apart
+            into regions that can never interact are solved exactly as sums of combinatorial games
+        :param ifStatistics: a boolean represents whether the detailed meta information of every search is
+            recorded, which statsPath implies
+        :param statsPath: the path of a JSON file the meta information of every search and of the whole game is
+            written to, with the counters by depth and the times of move generation and evaluation, None to
+            only print the totals
+        :param ifPonder: a boolean represents whether the computer searches the replies of the user while the user
+            thinks, which needs the alpha beta search with a transposition table
+        :param recordPath: the path of a file of game records the game is appended to when it ends, with the
+            settings of the agents, None to not record it
+        :param tableMegabytes: the memory of the transposition table in megabytes, which makes it an array of
+            a fixed size, None for a table which grows with the game
+        :param tablePolicy: the replacement policy of the transposition table of a fixed size, 'depth' to keep
+            the deeper entries of the current search, 'always' to always store the new entry
+        :param ifMCTS: a boolean represents whether the moves are searched by Monte Carlo tree search instead of
+            minimax, with timeLimit as the time budget of a move and processes running the playouts
+        :param mctsIterations: the number of playouts of a move of the Monte Carlo tree search without a time limit
+        :param mctsBatch: the number of leaves the Monte Carlo tree search selects before playing them out
+        :param evaluationWeights: a dictionary of the name of a feature of evaluation.FEATURES -> its integer
+            weight, which makes the static evaluation the weighted sum of the differences of the features of both
+            colors, None for the difference of mobility
+        """
+        self.minimaxDepth = minimaxDepth
+        self.ifAlphaBeta = ifAlphaBeta
+        self.ifInPlace = ifInPlace
+        self.ifTable = ifTable
+        self.timeLimit = timeLimit
+        self.ifOrdering = ifOrdering
+        self.ifIncremental = ifIncremental
+        self.processes = processes
+        self.ifBatch = ifBatch
+        self.tablebasePath = tablebasePath
+        self.bookPath = bookPath
+        self.ifSymmetry = ifSymmetry
+        self.ifPVS = ifPVS
+        self.ifReductions = ifReductions
+        self.ifRegions = ifRegions
+        self.ifStatistics = ifStatistics
+        self.statsPath = statsPath
+        self.ifPonder = ifPonder
+        self.recordPath = recordPath
+        self.tableMegabytes = tableMegabytes
+        self.tablePolicy = tablePolicy
+        self.ifMCTS = ifMCTS
+        self.mctsIterations = mctsIterations
+        self.mctsBatch = mctsBatch
+        self.evaluationWeights = evaluationWeights
+
+    def replace(self, **settings):
+        """
+        :param settings: the settings to change, by name
+        :return: a copy of the settings with those changed, class SearchSettings
+        """
+        copy = SearchSettings()
+        copy.__dict__.update(self.__dict__)
+        for name, value in settings.items():
+            if name not in copy.__dict__:
+                raise Exception('Unknown search setting ' + name)
+            setattr(copy, name, value)
+        return copy
+
+
 class Game:
     """
     Play the Konane game.
@@ -160,9 +274,161 @@ class Game:
             raise Exception('Either computer or user move first.')
         self.moveFirst = moveFirst
         self.moveNow = moveFirst
-        self.grid = Grid(width, height)
+        self.board = Board(width, height)
+        self.grid = Grid(width, height, self.board)
+        self.table = None
+        self.ordering = None
+        self.parallel = None
+        self.tablebase = None
+        self.book = None
+        self.symmetry = None
+        # the records of the searches of the game, None when they are not collected
+        self.statistics = None
+        self.ponderer = None
+        self.mcts = None
+        # the weights of the features of the weighted evaluation, None for the mobility evaluation
+        self.weights = None
+        # player -> the value of the last principal variation search of the player
+        self.previousValues = {}
+        # the moves of the game, the positions of the two removals then the jumps
+        self.moves = []
+
+    def configure(self, settings=None):
+        """
+        Create the tables and helpers the searches share for the rest of the game.
+        :param settings: the settings of the searches, class SearchSettings, None for the defaults
+        """
+        if settings is None:
+            settings = SearchSettings()
+        if not settings.ifTable:
+            self.table = None
+        elif settings.tableMegabytes:
+            if not fitsBoard(self.board.width, self.board.height):
+                raise Exception('The transposition table of a fixed size does not fit this board size.')
+            self.table = BoundedTranspositionTable(settings.tableMegabytes, policy=settings.tablePolicy)
+        else:
+            self.table = TranspositionTable()
+        self.ordering = MoveOrdering() if settings.ifOrdering else None
+        processes, ifMCTS = settings.processes, settings.ifMCTS
+        if processes and not ifMCTS and (not settings.ifAlphaBeta or settings.ifPVS or \
+                settings.timeLimit is not None or settings.ifPonder):
+            raise Exception('Only the fixed depth alpha beta search without pvs or pondering runs in parallel.')
+        self.parallel = ParallelSearch(settings, self.board.width, self.board.height) \
+            if processes and not ifMCTS else None
+        self.mcts = MonteCarloSearch(settings.mctsIterations, settings.mctsBatch, processes) if ifMCTS else None
+        self.symmetry = getSymmetry(self.board.width, self.board.height) if settings.ifSymmetry else None
+        self.previousValues = {}
+        self.weights = featureWeights(settings.evaluationWeights) if settings.evaluationWeights else None
+        self.statistics = [] if settings.ifStatistics or settings.statsPath else None
+        self.tablebase = loadTablebase(settings.tablebasePath) if settings.tablebasePath else None
+        if self.tablebase is not None and \
+                (self.tablebase.width, self.tablebase.height) != (self.board.width, self.board.height):
+            raise Exception('The tablebase is for another board size.')
+        if settings.ifRegions:
+            self.tablebase = RegionSolver(self.board.width, self.board.height, tablebase=self.tablebase)
+        if settings.bookPath:
+            from book import loadBook
+            self.book = loadBook(settings.bookPath)
+        else:
+            self.book = None
+        if self.book is not None and (self.book.width, self.book.height) != (self.board.width, self.board.height):
+            raise Exception('The opening book is for another board size.')
+
+    def close(self):
+        """
+        Stop the worker processes and release the tablebase.
+        """
+        if self.ponderer is not None:
+            self.ponderer.stop()
+            self.ponderer = None
+        if self.parallel is not None:
+            self.parallel.close()
+            self.parallel = None
+        if self.mcts is not None:
+            self.mcts.close()
+            self.mcts = None
+        if self.tablebase is not None:
+            self.tablebase.close()
+            self.tablebase = None
+
+    def search(self, currentState, round, settings):
+        """
+        Search the best move for the player of the current state.
+        :param currentState: the current state of the game, class GameState
+        :param round: the number of round
+        :param settings: the settings of the search, class SearchSettings, whose tables and helpers are those
+            of the last configure
+        :return: best value, best move, minimax meta information
+        """
+        minimaxInfo = MinimaxInfo(detailed=self.statistics is not None)
+        if self.table is not None:
+            self.table.newSearch()
+        start = time.time()
+        bestValue, move, minimaxInfo = self.searchMove(currentState, round, settings, minimaxInfo)
+        minimaxInfo.searchTime += time.time() - start
+        if self.statistics is not None:
+            self.statistics.append({'round': round, 'player': currentState.player, 'move': move, \
+                'value': bestValue, 'stats': minimaxInfo.toDict()})
+        return bestValue, move, minimaxInfo
+
+    def searchMove(self, currentState, round, settings, minimaxInfo):
+        """
+        Choose the search which finds the best move, with the same parameters as search.
+        :param minimaxInfo: the minimax meta information the search updates
+        :return: best value, best move, minimax meta information
+        """
+        minimaxDepth, timeLimit, ifAlphaBeta = settings.minimaxDepth, settings.timeLimit, settings.ifAlphaBeta
+        ifInPlace, ifPVS = settings.ifInPlace, settings.ifPVS
+        currentState.symmetry = self.symmetry
+        currentState.weights = self.weights
+        if self.book is not None:
+            result = self.book.lookup(currentState)
+            if result is not None:
+                minimaxInfo.numberBookHits += 1
+                return result[0], result[1], minimaxInfo
+        if self.tablebase is not None:
+            result = self.tablebase.bestMove(currentState, round)
+            if result is not None:
+                minimaxInfo.numberTablebaseHits += 1
+                return result[0], result[1], minimaxInfo
+        if self.mcts is not None:
+            return self.mcts.search(currentState, round, timeLimit, minimaxInfo)
+        if self.ponderer is not None and timeLimit is None:
+            result = self.ponderer.take(currentState, minimaxDepth)
+            if result is not None:
+                minimaxInfo.numberPonderHits += 1
+                if ifPVS:
+                    self.previousValues[currentState.player] = result[0]
+                return result[0], result[1], minimaxInfo
+        if ifInPlace and settings.ifIncremental:
+            currentState.trackMobility()
+        if timeLimit is not None:
+            return iterativeDeepening(currentState, round, timeLimit, minimaxDepth, self.table, ifInPlace, \
+                self.ordering, settings.ifBatch, self.tablebase, ifAlphaBeta and ifPVS, settings.ifReductions, \
+                minimaxInfo)
+        if ifAlphaBeta and ifPVS:
+            if self.ordering is not None:
+                self.ordering.newSearch(round)
+            result = principalVariationSearch(currentState, minimaxDepth, round, self.table, self.ordering, \
+                self.previousValues.get(currentState.player), settings.ifReductions, self.tablebase, None, minimaxInfo)
+            self.previousValues[currentState.player] = result[0]
+            return result
+        if ifAlphaBeta and self.parallel is not None:
+            return self.parallel.search(currentState, minimaxDepth, round, float('-inf'), float('inf'), minimaxInfo, \
+                self.table, self.ordering, self.tablebase)
+        if ifAlphaBeta and self.ordering is not None:
+            self.ordering.newSearch(round)
+        if ifInPlace:
+            if ifAlphaBeta:
+                return minimaxAlphaBetaInPlace(currentState, minimaxDepth, round, float('-inf'), float('inf'), \
+                    self.table, None, self.ordering, settings.ifBatch, self.tablebase, minimaxInfo)
+            return minimaxNaiveInPlace(currentState, minimaxDepth, round, minimaxInfo)
+        if ifAlphaBeta:
+            return minimaxAlphaBeta(currentState, minimaxDepth, round, float('-inf'), float('inf'), \
+                self.table, None, self.ordering, settings.ifBatch, self.tablebase, minimaxInfo)
+        return minimaxNaive(currentState, minimaxDepth, round, minimaxInfo)
 
-    def play(self, minimaxDepth, ifPrint, ifTestRandom, ifTestCombat, ifAlphaBeta):
+    def play(self, minimaxDepth, ifPrint, ifTestRandom, ifTestCombat, ifAlphaBeta, settings=None, **options):
         """
         Play the game.
         :param minimaxDepth: an integer represents the depth of the minimax search
@@ -170,8 +436,18 @@ class Game:
         :param ifTestRandom: a boolean represents whether to let a random agent play as the user to test
         :param ifTestCombat: a boolean represents whether to let a minimax agent play as the user to test
         :param ifAlphaBeta: a boolean represents whether to use alpha beta pruning in the minimax algorithm
+        :param settings: the settings of the searches and of the game, class SearchSettings, None for the defaults
+        :param options: settings of SearchSettings by name, e.g. ifTable=True, which replace those of settings
         :return 1 if the player wins, 0 if the computer wins
         """
+        settings = (settings or SearchSettings()).replace(minimaxDepth=minimaxDepth, ifAlphaBeta=ifAlphaBeta, \
+            **options)
+        self.configure(settings)
+        if settings.ifPonder:
+            if not ifAlphaBeta or settings.ifMCTS or self.table is None:
+                raise Exception('Pondering needs the alpha beta search with a transposition table.')
+            self.ponderer = Ponderer(self.table, self.ordering, self.symmetry, settings.ifPVS, settings.ifReductions, \
+                self.tablebase, self.weights)
         round = 1
         endOfGame = False
         firstMove = ()
@@ -185,43 +461,34 @@ class Game:
                 if ifTestCombat:
                     #test: two minimax agents combat with each other
                     if round == 1:
-                        currentState = GameState(self.grid, None, 'user', int(self.moveNow!=self.moveFirst))
+                        currentState = GameState(self.board.copy(), None, 'user', int(self.moveNow!=self.moveFirst))
                         
                         firstMove = None
                         minimaxInfo = None
-                        if ifAlphaBeta:
-                            bestValue, firstMove, minimaxInfo = minimaxAlphaBeta(currentState, minimaxDepth, round, float('-inf'), float('inf'))
-                        else:
-                            bestValue, firstMove, minimaxInfo = minimaxNaive(currentState, minimaxDepth, round)
+                        bestValue, firstMove, minimaxInfo = self.search(currentState, round, settings)
                         
                         userMinimaxInfo += minimaxInfo
-                        self.grid[firstMove] = self.grid.REPRESENTATION[2]
+                        self.removePiece(firstMove)
                         if ifPrint:
                             print 'User removed piece at', firstMove
 
                     elif round == 2:
-                        currentState = GameState(self.grid, None, 'user', int(self.moveNow!=self.moveFirst))
+                        currentState = GameState(self.board.copy(), None, 'user', int(self.moveNow!=self.moveFirst))
                         
                         secondMove = None
                         minimaxInfo = None
-                        if ifAlphaBeta:
-                            bestValue, secondMove, minimaxInfo = minimaxAlphaBeta(currentState, minimaxDepth, round, float('-inf'), float('inf'))
-                        else:
-                            bestValue, secondMove, minimaxInfo = minimaxNaive(currentState, minimaxDepth, round)
+                        bestValue, secondMove, minimaxInfo = self.search(currentState, round, settings)
                         
                         userMinimaxInfo += minimaxInfo
-                        self.grid[secondMove] = self.grid.REPRESENTATION[2]
+                        self.removePiece(secondMove)
                         if ifPrint:
                             print 'User removed piece at', secondMove
                     else:
-                        currentState = GameState(self.grid, None, 'user', int(self.moveNow!=self.moveFirst))
+                        currentState = GameState(self.board.copy(), None, 'user', int(self.moveNow!=self.moveFirst))
                         
                         move = None
                         minimaxInfo = None
-                        if ifAlphaBeta:
-                            bestValue, move, minimaxInfo = minimaxAlphaBeta(currentState, minimaxDepth, round, float('-inf'), float('inf'))
-                        else:
-                            bestValue, move, minimaxInfo = minimaxNaive(currentState, minimaxDepth, round)
+                        bestValue, move, minimaxInfo = self.search(currentState, round, settings)
                         
                         userMinimaxInfo += minimaxInfo
                         self.makeMove(move[0], move[1], int(self.moveNow!=self.moveFirst))
@@ -229,67 +496,63 @@ class Game:
                             print 'User moved piece at', move[0], 'to', move[1]
                 elif ifTestRandom:
                     # test: a random agent combat with a minimax agent
-                    currentState = GameState(self.grid, None, 'user', int(self.moveNow!=self.moveFirst))
+                    currentState = GameState(self.board.copy(), None, 'user', int(self.moveNow!=self.moveFirst))
                     move = randomAgent(currentState, round)
                     if round == 1 or round == 2:
-                        self.grid[move] = self.grid.REPRESENTATION[2]
+                        self.removePiece(move)
                     else:
                         self.makeMove(move[0], move[1], int(self.moveNow!=self.moveFirst))
                     if ifPrint:
                             print 'User moved piece at', move[0], 'to', move[1]
                 else:
+                    if self.ponderer is not None:
+                        self.ponderer.start(GameState(self.board.copy(), None, 'user', \
+                            int(self.moveNow!=self.moveFirst)), round, minimaxDepth)
                     if round == 1:
                         firstMove = self.getFirstMove()
-                        self.grid[firstMove] = self.grid.REPRESENTATION[2]
+                        self.removePiece(firstMove)
                     elif round == 2:
                         secondMove = self.getSecondMove(firstMove)
-                        self.grid[secondMove] = self.grid.REPRESENTATION[2]
+                        self.removePiece(secondMove)
                     else:
                         success = False
                         while not success:
                             init, dest = self.getMove()
                             success = self.checkLegalMove(init, dest, int(self.moveNow!=self.moveFirst))
                         self.makeMove(init, dest, int(self.moveNow!=self.moveFirst))
+                    if self.ponderer is not None:
+                        self.ponderer.stop()
 
                 self.moveNow = 'computer'
             else:
                 if round == 1:
-                    currentState = GameState(self.grid, None, 'computer', int(self.moveNow!=self.moveFirst))     
+                    currentState = GameState(self.board.copy(), None, 'computer', int(self.moveNow!=self.moveFirst))     
                     
                     firstMove = None
                     minimaxInfo = None
-                    if ifAlphaBeta:
-                        bestValue, firstMove, minimaxInfo = minimaxAlphaBeta(currentState, minimaxDepth, round, float('-inf'), float('inf'))
-                    else:
-                        bestValue, firstMove, minimaxInfo = minimaxNaive(currentState, minimaxDepth, round)
+                    bestValue, firstMove, minimaxInfo = self.search(currentState, round, settings)
 
                     computerMinimaxInfo +=  minimaxInfo
-                    self.grid[firstMove] = self.grid.REPRESENTATION[2]
+                    self.removePiece(firstMove)
                     if ifPrint:
                         print 'Computer removed piece at', firstMove
                 elif round == 2:
-                    currentState = GameState(self.grid, None, 'computer', int(self.moveNow!=self.moveFirst))
+                    currentState = GameState(self.board.copy(), None, 'computer', int(self.moveNow!=self.moveFirst))
                     
                     secondMove = None
                     minimaxInfo = None
-                    if ifAlphaBeta:
-                        bestValue, secondMove, minimaxInfo = minimaxAlphaBeta(currentState, minimaxDepth, round, float('-inf'), float('inf'))
-                    else:
-                        bestValue, secondMove, minimaxInfo = minimaxNaive(currentState, minimaxDepth, round)
+                    bestValue, secondMove, minimaxInfo = self.search(currentState, round, settings)
 
                     computerMinimaxInfo +=  minimaxInfo
-                    self.grid[secondMove] = self.grid.REPRESENTATION[2]
+                    self.removePiece(secondMove)
                     if ifPrint:
                         print 'Computer removed piece at', secondMove
                 else:
-                    currentState = GameState(self.grid, None, 'computer', int(self.moveNow!=self.moveFirst))
+                    currentState = GameState(self.board.copy(), None, 'computer', int(self.moveNow!=self.moveFirst))
                     
                     move = None
                     minimaxInfo = None
-                    if ifAlphaBeta:
-                        bestValue, move, minimaxInfo = minimaxAlphaBeta(currentState, minimaxDepth, round, float('-inf'), float('inf'))
-                    else:
-                        bestValue, move, minimaxInfo = minimaxNaive(currentState, minimaxDepth, round)
+                    bestValue, move, minimaxInfo = self.search(currentState, round, settings)
 
                     computerMinimaxInfo +=  minimaxInfo
                     self.makeMove(move[0], move[1], int(self.moveNow!=self.moveFirst))
@@ -300,6 +563,8 @@ class Game:
                 endOfGame = self.checkEndOfGame(int(self.moveNow!=self.moveFirst))
             round += 1
 
+        self.close()
+
         if ifPrint:
             print self.grid
 
@@ -309,12 +574,52 @@ class Game:
             print 'Average branching factor:', userMinimaxInfo.totalBranchingFactors * 1.00 / userMinimaxInfo.numberBranchingFactors
             if ifAlphaBeta:
                 print 'Number of cutoffs:', userMinimaxInfo.numberCutoffs
+            if ifAlphaBeta and settings.ifTable:
+                print 'Transposition table hit rate:', userMinimaxInfo.hitRate()
+                print 'Number of transposition table cutoffs:', userMinimaxInfo.numberTableCutoffs
+            if settings.timeLimit is not None:
+                print 'Number of completed iterations:', userMinimaxInfo.numberIterations
+            if settings.tablebasePath or settings.ifRegions:
+                print 'Number of tablebase hits:', userMinimaxInfo.numberTablebaseHits
+            if settings.bookPath:
+                print 'Number of moves from the opening book:', userMinimaxInfo.numberBookHits
 
         print '\nComputer minimix meta information:'
         print 'Total times of static evaluation:', computerMinimaxInfo.numberEvaluation
         print 'Average branching factor:', computerMinimaxInfo.totalBranchingFactors * 1.00 / computerMinimaxInfo.numberBranchingFactors
         if ifAlphaBeta:
             print 'Number of cutoffs:', computerMinimaxInfo.numberCutoffs
+        if ifAlphaBeta and settings.ifTable:
+            print 'Transposition table hit rate:', computerMinimaxInfo.hitRate()
+            print 'Number of transposition table cutoffs:', computerMinimaxInfo.numberTableCutoffs
+        if ifAlphaBeta and settings.tableMegabytes:
+            statistics = self.table.statistics()
+            print 'Transposition table occupancy:', statistics['occupancy'], 'of', statistics['capacity'], 'entries'
+            print 'Transposition table collisions and overwrites:', statistics['collisions'], statistics['overwrites']
+        if settings.timeLimit is not None:
+            print 'Number of completed iterations:', computerMinimaxInfo.numberIterations
+        if settings.tablebasePath or settings.ifRegions:
+            print 'Number of tablebase hits:', computerMinimaxInfo.numberTablebaseHits
+        if settings.bookPath:
+            print 'Number of moves from the opening book:', computerMinimaxInfo.numberBookHits
+        if settings.ifMCTS:
+            print 'Number of playouts:', computerMinimaxInfo.numberPlayouts
+            print 'Playouts per second:', computerMinimaxInfo.playoutsPerSecond()
+        if settings.ifPonder:
+            print 'Number of moves found while the user was thinking:', computerMinimaxInfo.numberPonderHits
+        if self.ordering is not None:
+            print 'Move ordering by depth (depth, nodes, cutoffs, first move cutoff rate):'
+            for depth, nodes, cutoffs, rate in self.ordering.report():
+                print depth, nodes, cutoffs, rate
+        if settings.statsPath:
+            self.writeStatistics(settings.statsPath, userMinimaxInfo, computerMinimaxInfo)
+        if settings.recordPath:
+            agents = {'depth': minimaxDepth, 'alphaBeta': ifAlphaBeta, 'inPlace': settings.ifInPlace, \
+                'table': settings.ifTable, 'timeLimit': settings.timeLimit, 'ordering': settings.ifOrdering, \
+                'pvs': settings.ifPVS, 'reductions': settings.ifReductions, 'regions': settings.ifRegions, \
+                'mcts': settings.ifMCTS, 'weights': settings.evaluationWeights, \
+                'user': 'minimax' if ifTestCombat else 'random' if ifTestRandom else 'human'}
+            self.writeRecord(settings.recordPath, agents)
 
         if self.moveNow == 'computer':
             print 'Congratulations! You win!'
@@ -324,6 +629,37 @@ class Game:
             return 0
             
 
+    def writeStatistics(self, path, userMinimaxInfo, computerMinimaxInfo):
+        """
+        Write the meta information of the searches of the game as JSON.
+        :param path: the path of the file
+        :param userMinimaxInfo: the minimax meta information of all the searches of the user
+        :param computerMinimaxInfo: the minimax meta information of all the searches of the computer
+        """
+        data = {'width': self.board.width, 'height': self.board.height, \
+            'winner': 'user' if self.moveNow == 'computer' else 'computer', 'moves': self.statistics, \
+            'user': userMinimaxInfo.toDict(), 'computer': computerMinimaxInfo.toDict()}
+        if self.table is not None:
+            data['table'] = self.table.statistics()
+        if self.ordering is not None:
+            data['ordering'] = [{'depth': depth, 'nodes': nodes, 'cutoffs': cutoffs, 'firstMoveCutoffRate': rate} \
+                for depth, nodes, cutoffs, rate in self.ordering.report()]
+        with open(path, 'w') as statsFile:
+            json.dump(data, statsFile, indent=1)
+
+    def writeRecord(self, path, settings):
+        """
+        Append the game to a file of game records.
+        :param path: the path of the file
+        :param settings: a dictionary of the settings of the agents
+        """
+        writer = GameRecordWriter(path)
+        try:
+            writer.write(GameRecord(self.board.width, self.board.height, self.moveFirst, self.moves, \
+                'user' if self.moveNow == 'computer' else 'computer', settings))
+        finally:
+            writer.close()
+
     def getMove(self):
         """
         Get the move of the user from keyboard.
@@ -397,7 +733,6 @@ class Game:
         :return: True if the move is legal, False if it is not
         """
         checkColor = self.grid.REPRESENTATION[colorIndex]
-        otherColor = self.grid.REPRESENTATION[1-colorIndex]
         emptyColor = self.grid.REPRESENTATION[2]
         if self.grid[initialPosition] != checkColor:
             print 'The piece you are trying to move is not yours! Please reselect your move.'
@@ -409,43 +744,20 @@ class Game:
             print 'The initial and destination position of your move are the same. Please reselect your move.'
             return False
 
-        if initialPosition[0] == destinationPosition[0]:
-            x = initialPosition[0]
-            if (destinationPosition[1] - initialPosition[1]) %2 != 0:
-                print 'Invalid move! Please reselect your move.'
-                return False
-            if initialPosition[1] < destinationPosition[1]:
-                for i in range(initialPosition[1]+1, destinationPosition[1], 2):
-                    if self.grid[(x, i)] != otherColor or self.grid[(x, i+1)] != emptyColor:
-                        print 'Invalid move! Please reselect your move.'
-                        return False
-                return True
-            else:
-                for i in range(initialPosition[1]-1, destinationPosition[1], -2):
-                    if self.grid[(x, i)] != otherColor or self.grid[(x, i-1)] != emptyColor:
-                        print 'Invalid move! Please reselect your move.'
-                        return False
-                return True
-        elif initialPosition[1] == destinationPosition[1]:
-            y = initialPosition[1]
-            if (destinationPosition[0] - initialPosition[0])%2 != 0:
+        if initialPosition[0] != destinationPosition[0] and initialPosition[1] != destinationPosition[1]:
+            print 'Making turns is invalid move! Please reselect your move.'
+            return False
+        board = self.board
+        jump = board.geometry.findJump(board.index(initialPosition), board.index(destinationPosition))
+        if jump is None:
+            print 'Invalid move! Please reselect your move.'
+            return False
+        other, empty = board.pieces[1-colorIndex], board.empty()
+        for over, landing in jump[1]:
+            if not (other >> over) & 1 or not (empty >> landing) & 1:
                 print 'Invalid move! Please reselect your move.'
                 return False
-            if initialPosition[0] < destinationPosition[0]:
-                for i in range(initialPosition[0]+1, destinationPosition[0], 2):
-                    if self.grid[(i, y)] != otherColor or self.grid[(i+1, y)] != emptyColor:
-                        print 'Invalid move! Please reselect your move.'
-                        return False
-                return True
-            else:
-                for i in range(initialPosition[0]-1, destinationPosition[0], -2):
-                    if self.grid[(i, y)] != otherColor or self.grid[(i-1, y)] != emptyColor:
-                        print 'Invalid move! Please reselect your move.'
-                        return False
-                return True
-        # make turns
-        print 'Making turns is invalid move! Please reselect your move.'
-        return False
+        return True
 
     def makeMove(self, initialPosition, destinationPosition, colorIndex):
         """
@@ -454,28 +766,16 @@ class Game:
         :param destinationPosition: a tuple of coordinate (x,y)
         :param colorIndex: the index of the color being moved now in Grid.REPRESENTATION
         """
-        checkColor = self.grid.REPRESENTATION[colorIndex]
-        otherColor = self.grid.REPRESENTATION[1-colorIndex]
-        emptyColor = self.grid.REPRESENTATION[2]
+        self.board.makeMove(initialPosition, destinationPosition, colorIndex)
+        self.moves.append((initialPosition, destinationPosition))
 
-        self.grid[initialPosition], self.grid[destinationPosition] = ".", checkColor
-
-        if initialPosition[0] == destinationPosition[0]:
-            x = initialPosition[0]
-            if initialPosition[1] < destinationPosition[1]:
-                for i in range(initialPosition[1]+1, destinationPosition[1], 2):
-                    self.grid[(x, i)] = emptyColor
-            else:
-                for i in range(initialPosition[1]-1, destinationPosition[1], -2):
-                    self.grid[(x, i)] = emptyColor
-        else:
-            y = initialPosition[1]
-            if initialPosition[0] < destinationPosition[0]:
-                for i in range(initialPosition[0]+1, destinationPosition[0], 2):
-                    self.grid[(i, y)] = emptyColor
-            else:
-                for i in range(initialPosition[0]-1, destinationPosition[0], -2):
-                    self.grid[(i, y)] = emptyColor
+    def removePiece(self, position):
+        """
+        Remove a piece in the first two rounds.
+        :param position: a tuple of coordinate (x,y)
+        """
+        self.grid[position] = self.grid.REPRESENTATION[2]
+        self.moves.append(position)
 
 
     def checkEndOfGame(self, colorIndex):
@@ -484,22 +784,7 @@ class Game:
         :param colorIndex: the index of the color being moved now in Grid.REPRESENTATION
         :return: True if the game ends, False else
         """
-        checkColor = self.grid.REPRESENTATION[colorIndex]
-        otherColor = self.grid.REPRESENTATION[1-colorIndex]
-        emptyColor = self.grid.REPRESENTATION[2]
-        for i in range(1, self.grid.width+1):
-            for j in range(1, self.grid.height+1):
-                if self.grid[i, j] != checkColor:
-                    continue
-                if (i > 2) and (self.grid[i-1, j] == otherColor) and (self.grid[i-2, j] == emptyColor):
-                    return False
-                if (i < self.grid.width-1) and (self.grid[i+1, j] == otherColor) and (self.grid[i+2, j] == emptyColor):
-                    return False
-                if (j > 2) and (self.grid[i, j-1] == otherColor) and (self.grid[i, j-2] == emptyColor):
-                    return False
-                if (j < self.grid.height-1) and (self.grid[i, j+1] == otherColor) and (self.grid[i, j+2] == emptyColor):
-                    return False
-        return True
+        return not self.board.hasMove(colorIndex)
 
 
 class GameState:
@@ -507,25 +792,47 @@ class GameState:
     Store game state of Konone.
     """
 
-    def __init__(self, grid, move, player, colorIndex):
+    def __init__(self, board, move, player, colorIndex):
         """
-        :param grid: the current game board.
+        :param board: the current game board, a bitboard owned by this state from now on
         :param move: a tupe of the initial and destination positions of the move
         :param player: the current player
         :param colorIndex: the piece color of the current player
         """
-        self.grid = grid.copy()
+        self.board = board
         self.move = move
         self.player = player
         self.minMax = 'max' if player == 'computer' else 'min'
         self.colorIndex = colorIndex
         self.bestValue = None
+        # the move generated by getMoves which led to this state
+        self.lastMove = None
+        # a MobilityTracker kept up to date by makeMove and undoMove, None if not tracking
+        self.mobility = None
+        # a Symmetry which merges equivalent successors and table entries, None to treat every board apart
+        self.symmetry = None
+        # the weights of evaluation.FEATURES of the weighted evaluation, None for the difference of mobility
+        self.weights = None
 
     def copy(self):
         """
         :return a deep copy of the game state
         """
-        return GameState(self.grid.deepCopy(), self.move, self.player, self.colorIndex, self.bestValue)
+        state = GameState(self.board.copy(), self.move, self.player, self.colorIndex)
+        state.bestValue = self.bestValue
+        state.lastMove = self.lastMove
+        state.symmetry = self.symmetry
+        state.weights = self.weights
+        if self.mobility is not None:
+            state.trackMobility()
+        return state
+
+    def trackMobility(self):
+        """
+        Keep the mobility and the piece counts up to date while moves are made and undone on the
+        board of this state, so evaluate does not need to scan the board.
+        """
+        self.mobility = MobilityTracker(self.board)
 
     def deepCopy(self):
         """
@@ -536,40 +843,50 @@ class GameState:
     def evaluate(self):
         """
         Calculate the evaluation score for current state.
-        :param grid: the current game board
-        :return: the evaluation value of the grid for checkColor
+        :return: the evaluation value of the board for the computer
         """
-        # if player has no move, then player lost, -inf or inf depend on who the player is
-        # if player has moves, use heuristics.
-        
+        if self.weights is not None:
+            return weightedScore(self.player, self.colorIndex, extractFeatures(self.board), self.weights)
+
         #checkColorMoves = self.getAvailableMoves(self.colorIndex)
         #otherColorMoves = self.getAvailableMoves(1-self.colorIndex)
-        
+
         checkColorMoves = self.getAvailableMovesPreferLonger(self.colorIndex)
         otherColorMoves = self.getAvailableMovesPreferLonger(1-self.colorIndex)
 
-        checkColorPieces = self.getPieceCount(self.colorIndex)
-        otherColorPieces = self.getPieceCount(1-self.colorIndex)
+        #checkColorPieces = self.getPieceCount(self.colorIndex)
+        #otherColorPieces = self.getPieceCount(1-self.colorIndex)
 
         #checkColorEdgePieces = self.getEgdePieceCount(self.colorIndex)
         #otherColorEdgePieces = self.getEgdePieceCount(1-self.colorIndex)
 
-        if self.player == 'computer':
-            if checkColorMoves == 0: #computer doesn't have moves
-                return float('-inf')
-            elif otherColorMoves == 0: #user doesn't have moves
-                return float('inf')
-            else:
-                #return checkColorPieces - otherColorPieces
-                return checkColorMoves - otherColorMoves
-        else:
-            if checkColorMoves == 0: #user doesn't have moves
-                return float('inf')
-            elif otherColorMoves == 0: #computer doesn't have moves
-                return float('-inf')
-            else:
-                #return otherColorPieces - checkColorPieces
-                return otherColorMoves - checkColorMoves
+        return mobilityScore(self.player, checkColorMoves, otherColorMoves)
+
+    def evaluateMoves(self, listOfMoves):
+        """
+        Calculate the evaluation scores of the successors of this state without building them. With
+        NumPy the successors are evaluated together, else, or with the weighted evaluation, one by one on the
+        board of this state.
+        :param listOfMoves: the moves generated by getMoves
+        :return: the list of the evaluation values of the successors
+        """
+        if evaluation.numpy is None or self.weights is not None:
+            values = []
+            for move in listOfMoves:
+                self.makeMove(move)
+                values.append(self.evaluate())
+                self.undoMove(move)
+            return values
+
+        board = self.board
+        listOfPieces = []
+        for move in listOfMoves:
+            moveColorIndex = self.getMoveColor(move)
+            board.applyJump(moveColorIndex, *move)
+            listOfPieces.append(tuple(board.pieces))
+            board.undoJump(moveColorIndex, *move)
+        otherPlayer = 'user' if self.player == 'computer' else 'computer'
+        return evaluateBatch(listOfPieces, board.width, board.height, 1-self.colorIndex, otherPlayer)
 
     def getPieceCount(self, checkColorIndex):
         """
@@ -577,8 +894,9 @@ class GameState:
         :param checkColorIndex: the index of color of the player being checked
         :return: the number of pieces of a certain color
         """
-        return self.grid.countPlayerX() if self.grid.REPRESENTATION[checkColorIndex] == 'X' \
-            else self.grid.countPlayerO()
+        if self.mobility is not None:
+            return self.mobility.pieces[checkColorIndex]
+        return self.board.count(checkColorIndex)
 
     def getEgdePieceCount(self, checkColorIndex):
         """
@@ -586,8 +904,7 @@ class GameState:
         :param checkColorIndex: the index of color of the player being checked
         :return: the number of pieces on the edge of a certain color
         """
-        return self.grid.countPlayerXEdge() if self.grid.REPRESENTATION[checkColorIndex] == 'X' \
-            else self.grid.countPlayerOEdge()
+        return popcount(self.board.pieces[checkColorIndex] & self.board.geometry.edges)
 
     def getAvailableMoves(self, checkColorIndex):
         """
@@ -596,32 +913,7 @@ class GameState:
         :param checkColorIndex: the index of color of the player being checked
         :return: integer value of available moves for a certain color
         """
-        checkColor = self.grid.REPRESENTATION[checkColorIndex]
-        otherColor = self.grid.REPRESENTATION[1-checkColorIndex]
-        emptyColor = self.grid.REPRESENTATION[2]
-
-        result = 0
-        for x in range(1, self.grid.width+1):
-            for y in range(1, self.grid.height+1):
-                if self.grid[x, y] != checkColor:
-                    continue
-
-                if x - 2 >= 1 and self.grid[x - 1, y] == otherColor \
-                        and self.grid[x - 2, y] == emptyColor:
-                    result += 1
-                
-                if x + 2 <= self.grid.width and self.grid[x + 1, y] == otherColor \
-                        and self.grid[x + 2, y] == emptyColor:
-                    result += 1
-
-                if y - 2 >= 1 and self.grid[x, y - 1] == otherColor \
-                        and self.grid[x, y - 2] == emptyColor:
-                    result += 1
-
-                if y + 2 <= self.grid.height and self.grid[x, y + 1] == otherColor \
-                        and self.grid[x, y + 2] == emptyColor:
-                    result += 1
-        return result
+        return self.board.countMoves(checkColorIndex)
 
     def getAvailableMovesPreferLonger(self, checkColorIndex):
         """
@@ -631,182 +923,197 @@ class GameState:
         :param checkColorIndex: the index of color of the player being checked
         :return: integer value of available moves for a certain color
         """
-        checkColor = self.grid.REPRESENTATION[checkColorIndex]
-        otherColor = self.grid.REPRESENTATION[1-checkColorIndex]
-        emptyColor = self.grid.REPRESENTATION[2]
+        if self.mobility is not None:
+            return self.mobility.moves[checkColorIndex]
+        return self.board.countMovesPreferLonger(checkColorIndex)
 
-        result = 0
-        for x in range(1, self.grid.width+1):
-            for y in range(1, self.grid.height+1):
-                if self.grid[x, y] != checkColor:
-                    continue
-
-                copy_x = x - 2
-                while copy_x >= 1 and self.grid[copy_x+1, y] == otherColor \
-                        and self.grid[copy_x, y] == emptyColor:
-                    result += 1
-                    copy_x -= 2
-                
-                copy_x = x + 2
-                while copy_x <= self.grid.width \
-                        and self.grid[copy_x-1, y] == otherColor \
-                        and self.grid[copy_x, y] == emptyColor:
-                    result += 1
-                    copy_x += 2
-
-                copy_y = y - 2
-                while copy_y >= 1 and self.grid[x, copy_y+1] == otherColor \
-                        and self.grid[x, copy_y] == emptyColor:
-                    result += 1
-                    copy_y -= 2
-
-                copy_y = y + 2
-                while copy_y <= self.grid.height \
-                        and self.grid[x, copy_y-1] == otherColor \
-                        and self.grid[x, copy_y] == emptyColor:
-                    result += 1
-                    copy_y += 2
-        return result
+    def getMoves(self, round):
+        """
+        Generate the moves of the current player as lightweight tuples (initial index, step, hops)
+        on the bitboard. The removals of the first two rounds have neither step nor hops.
+        Moves leading to equivalent boards are generated once in the first rounds if this state has a symmetry.
+        :param round: the number of round
+        :return: the list of moves
+        """
+        listOfMoves = self.getAllMoves(round)
+        if self.symmetry is not None and round <= self.symmetry.maxRound:
+            return self.symmetry.uniqueMoves(self, listOfMoves)
+        return listOfMoves
 
-    def getFirstMove(self):
+    def getAllMoves(self, round):
         """
-        :return the list of possible moves for the first move
+        :param round: the number of round
+        :return: the list of moves, including those leading to equivalent boards
         """
-        emptyColor = self.grid.REPRESENTATION[2]
-        listOfSuccessors = []
-        otherPlayer = 'user' if self.player == 'computer' else 'computer'
+        board = self.board
+        if round == 1:
+            width, height = board.width, board.height
+            return [(board.index(position), 0, 0) for position in \
+                [(1, 1), (width/2, height/2), (width/2+1, height/2+1), (width, height)]]
+        if round == 2:
+            empty = board.empty()
+            listOfMoves = []
+            neighbours = board.geometry.neighbours
+            own = board.pieces[self.colorIndex]
+            while own:
+                lowest = own & -own
+                own ^= lowest
+                index = lowest.bit_length() - 1
+                if neighbours[index] & empty:
+                    listOfMoves.append((index, 0, 0))
+            return listOfMoves
+        return board.getJumps(self.colorIndex)
 
-        for (x, y) in [(1, 1), (self.grid.width/2, self.grid.height/2), \
-                (self.grid.width/2+1, self.grid.height/2+1), (self.grid.width, self.grid.height)]:
-            new_grid = self.grid.copy()
-            new_grid[x, y] = emptyColor
-            successor = GameState(new_grid, (x, y), otherPlayer, 1-self.colorIndex)
-            listOfSuccessors.append(successor)
-        return listOfSuccessors
+    def describeMove(self, move):
+        """
+        :param move: a move generated by getMoves
+        :return: the position of a removal, or a tuple of the initial and destination positions of a jump
+        """
+        if move is None:
+            return None
+        if move[2] == 0:
+            return self.board.position(move[0])
+        return self.board.jumpToMove(move)
 
-    def getSecondMove(self):
+    def parseMove(self, move):
         """
-        :return the list of possible moves for the second move
+        :param move: the position of a removal, or a tuple of the initial and destination positions of a jump
+        :return: the move as generated by getMoves
         """
-        checkColor = self.grid.REPRESENTATION[self.colorIndex]
-        otherColor = self.grid.REPRESENTATION[1-self.colorIndex]
-        emptyColor = self.grid.REPRESENTATION[2]
+        if isinstance(move[0], tuple):
+            return self.board.moveToJump(move[0], move[1])
+        return (self.board.index(move), 0, 0)
 
-        listOfSuccessors = []
-        listOfMoves = []
-        otherPlayer = 'user' if self.player == 'computer' else 'computer'
+    def getKey(self):
+        """
+        :return the Zobrist key of the board together with the player to move
+        """
+        return self.board.getKey(self.colorIndex)
 
-        for x in range(1, self.grid.width+1):
-            for y in range(1, self.grid.height+1):
-                if self.grid[x, y] != checkColor:
-                    continue
+    def getTableKey(self):
+        """
+        :return a tuple of the key of the state in a transposition table, which is shared by the equivalent
+            boards if this state has a symmetry, and the symmetry mapping the board to the one stored
+        """
+        if self.symmetry is None:
+            return self.getKey(), None
+        return self.symmetry.canonicalKey(self.board.pieces, self.colorIndex)
 
-                if x-1 >= 1 and self.grid[x-1, y] == emptyColor:
-                    listOfMoves.append((x, y))
+    def toTableMove(self, move, transform):
+        """
+        :param move: a move generated by getMoves
+        :param transform: the symmetry returned by getTableKey
+        :return: the move on the board stored in the table
+        """
+        if transform is None:
+            return move
+        return self.symmetry.transformMove(move, transform)
 
-                if x+1 <= self.grid.width and self.grid[x+1, y] == emptyColor:
-                    listOfMoves.append((x, y))
+    def fromTableMove(self, move, transform):
+        """
+        :param move: a move stored in the table
+        :param transform: the symmetry returned by getTableKey
+        :return: the move on the board of this state
+        """
+        if transform is None or move is None:
+            return move
+        return self.symmetry.transformMove(move, self.symmetry.inverses[transform])
 
-                if y-1 >= 1 and self.grid[x, y-1] == emptyColor:
-                    listOfMoves.append((x, y))
+    def getMoveColor(self, move):
+        """
+        :param move: a move generated by getMoves
+        :return: the color index of the piece being moved or removed
+        """
+        if move[2] == 0:
+            # nothing has moved before the removals, so the color follows the checkerboard
+            return self.board.initialColor(move[0])
+        return self.colorIndex
+
+    def makeMove(self, move):
+        """
+        Make a move on the board of this state and pass the turn to the other player.
+        :param move: a move generated by getMoves
+        """
+        moveColorIndex = self.getMoveColor(move)
+        self.board.applyJump(moveColorIndex, *move)
+        if self.mobility is not None:
+            self.mobility.makeMove(moveColorIndex, move)
+        self.player = 'user' if self.player == 'computer' else 'computer'
+        self.minMax = 'max' if self.player == 'computer' else 'min'
+        self.colorIndex = 1 - self.colorIndex
 
-                if y+1 <= self.grid.height and self.grid[x, y+1] == emptyColor:
-                    listOfMoves.append((x, y))
+    def undoMove(self, move):
+        """
+        Undo the last move made by makeMove and give the turn back.
+        :param move: the move being undone
+        """
+        self.player = 'user' if self.player == 'computer' else 'computer'
+        self.minMax = 'max' if self.player == 'computer' else 'min'
+        self.colorIndex = 1 - self.colorIndex
+        moveColorIndex = self.getMoveColor(move)
+        self.board.undoJump(moveColorIndex, *move)
+        if self.mobility is not None:
+            self.mobility.undoMove(moveColorIndex, move)
 
+    def getSuccessor(self, move):
+        """
+        :param move: a move generated by getMoves
+        :return: a new state after the move, leaving this state unchanged
+        """
+        new_board = self.board.copy()
+        new_board.applyJump(self.getMoveColor(move), *move)
+        otherPlayer = 'user' if self.player == 'computer' else 'computer'
+        successor = GameState(new_board, self.describeMove(move), otherPlayer, 1-self.colorIndex)
+        successor.lastMove = move
+        successor.symmetry = self.symmetry
+        successor.weights = self.weights
+        return successor
+
+    def generateSuccessors(self, round, listOfMoves=None):
+        """
+        Lazily generate the successors of this state. Each successor is only built when it is pulled,
+        so a search which stops early never builds the rest.
+        :param round: the number of round
+        :param listOfMoves: the moves generated by getMoves in the order to follow, None for all moves
+        :return: a generator of the successors
+        """
+        if listOfMoves is None:
+            listOfMoves = self.getMoves(round)
         for move in listOfMoves:
-            new_grid = self.grid.copy()
-            new_grid[move] = emptyColor
-            successor = GameState(new_grid, move, otherPlayer, 1-self.colorIndex)
-            listOfSuccessors.append(successor)
-        return listOfSuccessors
+            yield self.getSuccessor(move)
+
+    def getFirstMove(self):
+        """
+        :return the list of possible moves for the first move
+        """
+        return list(self.generateSuccessors(1))
+
+    def getSecondMove(self):
+        """
+        :return the list of possible moves for the second move
+        """
+        return list(self.generateSuccessors(2))
 
     def getSuccessors(self):
         """
         :return the list of possible moves for any round of moves after the second round
         """
-        checkColor = self.grid.REPRESENTATION[self.colorIndex]
-        otherColor = self.grid.REPRESENTATION[1-self.colorIndex]
-        emptyColor = self.grid.REPRESENTATION[2]
-
-        listOfSuccessors = []
-        otherPlayer = 'user' if self.player == 'computer' else 'computer'
+        return list(self.generateSuccessors(3))
 
-        for x in range(1, self.grid.width+1):
-            for y in range(1, self.grid.height+1):
-                if self.grid[x, y] != checkColor:
-                    continue
-
-                new_grid = self.grid.copy()
-                copy_x = x - 2
-                while copy_x >= 1 \
-                        and self.grid[copy_x+1, y] == otherColor \
-                        and self.grid[copy_x, y] == emptyColor:
-                    new_grid = new_grid.copy()
-                    new_grid[copy_x+2, y] = emptyColor
-                    new_grid[copy_x+1, y] = emptyColor
-                    new_grid[copy_x, y] = checkColor
-                    successor = GameState(new_grid, ((x, y), (copy_x, y)), 
-                        otherPlayer, 1-self.colorIndex)
-                    listOfSuccessors.append(successor)
-                    copy_x -= 2
-
-                new_grid = self.grid.copy()
-                copy_x = x + 2
-                while copy_x <= self.grid.width \
-                        and self.grid[copy_x-1, y] == otherColor \
-                        and self.grid[copy_x, y] == emptyColor:
-                    new_grid = new_grid.copy()
-                    new_grid[copy_x-2, y] = emptyColor
-                    new_grid[copy_x-1, y] = emptyColor
-                    new_grid[copy_x, y] = checkColor
-                    successor = GameState(new_grid, ((x, y), (copy_x, y)), 
-                        otherPlayer, 1-self.colorIndex)
-                    listOfSuccessors.append(successor)
-                    copy_x += 2
-
-                new_grid = self.grid.copy()
-                copy_y = y - 2
-                while copy_y >= 1 \
-                        and self.grid[x, copy_y+1] == otherColor \
-                        and self.grid[x, copy_y] == emptyColor:
-                    new_grid = new_grid.copy()
-                    new_grid[x, copy_y+2] = emptyColor
-                    new_grid[x, copy_y+1] = emptyColor
-                    new_grid[x, copy_y] = checkColor
-                    successor = GameState(new_grid, ((x, y), (x, copy_y)), 
-                        otherPlayer, 1-self.colorIndex)
-                    listOfSuccessors.append(successor)
-                    copy_y -= 2
-
-                new_grid = self.grid.copy()
-                copy_y = y + 2
-                while copy_y <= self.grid.height \
-                        and self.grid[x, copy_y-1] == otherColor \
-                        and self.grid[x, copy_y] == emptyColor:
-                    new_grid = new_grid.copy()
-                    new_grid[x, copy_y-2] = emptyColor
-                    new_grid[x, copy_y-1] = emptyColor
-                    new_grid[x, copy_y] = checkColor
-                    successor = GameState(new_grid, ((x, y), (x, copy_y)), 
-                        otherPlayer, 1-self.colorIndex)
-                    listOfSuccessors.append(successor)
-                    copy_y += 2
-
-        return listOfSuccessors
-
-def calculateWinRate():
+def calculateWinRate(times=10, processes=None):
     """
-    Print the win rate of the user against the computer.
+    Print the win rate of a random user against a minimax computer on a 6x6 board, the user moving first.
+    :param times: the number of games
+    :param processes: the number of worker processes playing the games, the number of CPUs if None
     """
-    times = 10
-    winRate = 0.0
-    for i in range(times):
-        game = Game('user', 6, 6)
-        winRate += game.play(5, False, True, False, False)
-    winRate = winRate/times
-    print "Winrate:", winRate
-
-game = Game('user', 6, 6)
-game.play(5, True, False, False, True)
-
-#calculateWinRate()
\ No newline at end of file
+    from tournament import parseAgent, runTournament
+    summary = runTournament(parseAgent('random'), parseAgent('minimax:5'), [(6, 6)], times, processes, \
+        ifPrint=False, ifAlternate=False)
+    played, won, interval = summary[(6, 6)]
+    print "Winrate:", won * 1.00 / played
+
+if __name__ == '__main__':
+    game = Game('user', 6, 6)
+    game.play(5, True, False, False, True)
+
+    #calculateWinRate()
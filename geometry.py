@@ -0,0 +1,111 @@
+_GEOMETRIES = {}
+
+def getGeometry(width, height):
+    """
+    :param width: width of the game board
+    :param height: height of the game board
+    :return: the geometry of the board size, class Geometry, computed once and shared
+    """
+    key = (width, height)
+    if key not in _GEOMETRIES:
+        _GEOMETRIES[key] = Geometry(width, height)
+    return _GEOMETRIES[key]
+
+
+class Geometry:
+    """
+    The neighbours, edges and jump rays of every cell of a board size, computed once so that the moves are
+    looked up instead of stepping through coordinates and checking the edges of the board. Cells are
+    the bit indices of Board, and the directions are -x, +x, -y, +y, in the order of Board.directions.
+    A ray is the list of (over cell, landing cell) pairs of the jumps in a row from a cell in one direction,
+    up to the edge of the board; a jump of k hops captures the over cells of the first k pairs and lands
+    on the k-th landing cell.
+    """
+
+    def __init__(self, width, height):
+        """
+        :param width: width of the game board
+        :param height: height of the game board
+        """
+        self.width = width
+        self.height = height
+        self.stride = height + 1
+        self.rowStride = width + 1
+        self.directions = (-self.stride, self.stride, -1, 1)
+        self.cells = [(x - 1) * self.stride + y - 1 for x in range(1, width + 1) for y in range(1, height + 1)]
+        # the masks of the cells on the edge of the board, corners included, and of the four corners
+        self.edges = 0
+        self.corners = 0
+        for index in self.cells:
+            x, y = index // self.stride, index % self.stride
+            if x in (0, width - 1) or y in (0, height - 1):
+                self.edges |= 1 << index
+            if x in (0, width - 1) and y in (0, height - 1):
+                self.corners |= 1 << index
+        size = width * self.stride
+        # bit index -> the mask of its orthogonal neighbours, 0 for the guard bits
+        self.neighbours = [0] * size
+        # bit index -> a tuple of one ray per direction, None for the guard bits
+        self.rays = [None] * size
+        # (initial index, step, hops) -> the masks of the initial and destination cells and of the captured cells,
+        # the same two masks on the board transposed by MobilityTracker, and the numbers of the columns and rows
+        # the move changes
+        self.jumps = {}
+        for index in self.cells:
+            x, y = index // self.stride, index % self.stride
+            rays = []
+            for step, (dx, dy) in zip(self.directions, [(-1, 0), (1, 0), (0, -1), (0, 1)]):
+                if 0 <= x + dx < width and 0 <= y + dy < height:
+                    self.neighbours[index] |= 1 << (index + step)
+                ray = []
+                hops = 1
+                while 0 <= x + 2 * hops * dx < width and 0 <= y + 2 * hops * dy < height:
+                    ray.append((index + (2 * hops - 1) * step, index + 2 * hops * step))
+                    hops += 1
+                rays.append(tuple(ray))
+                for hops in range(1, len(ray) + 1):
+                    self.jumps[index, step, hops] = self.jumpEntry(index, step, ray[:hops])
+            self.rays[index] = tuple(rays)
+            self.jumps[index, 0, 0] = self.jumpEntry(index, 0, ())
+
+    def transpose(self, index):
+        """
+        :param index: the bit index of a cell on the board
+        :return: the bit index of the cell on the board transposed by MobilityTracker, whose rows are its columns
+        """
+        return (index % self.stride) * self.rowStride + index // self.stride
+
+    def jumpEntry(self, index, step, pairs):
+        """
+        A jump of zero hops has the same initial and destination cell, so it removes the piece.
+        :param index: the bit index of the jumping piece
+        :param step: the bit distance between two neighbouring cells in the direction of the jump
+        :param pairs: the (over cell, landing cell) pairs of the jump
+        :return: the entry of the jump in self.jumps
+        """
+        destination = pairs[-1][1] if pairs else index
+        moved = (1 << index) | (1 << destination)
+        transposedMoved = (1 << self.transpose(index)) | (1 << self.transpose(destination))
+        captured = transposedCaptured = 0
+        for over, landing in pairs:
+            captured |= 1 << over
+            transposedCaptured |= 1 << self.transpose(over)
+        low, high = min(index, destination), max(index, destination)
+        if step in (0, 1, -1):
+            columns, rows = (index // self.stride,), tuple(range(low % self.stride, high % self.stride + 1))
+        else:
+            columns, rows = tuple(range(low // self.stride, high // self.stride + 1)), (index % self.stride,)
+        return moved, captured, transposedMoved, transposedCaptured, columns, rows
+
+    def findJump(self, initial, destination):
+        """
+        :param initial: the bit index of the initial cell
+        :param destination: the bit index of the destination cell
+        :return: a tuple of the step and the (over cell, landing cell) pairs of the jump between the cells, None if
+            the destination is on no ray of the initial cell
+        """
+        for step, ray in zip(self.directions, self.rays[initial]):
+            for hops, (over, landing) in enumerate(ray):
+                if landing == destination:
+                    return step, ray[:hops + 1]
+        return None
@@ -0,0 +1,202 @@
+import math
+import multiprocessing
+import random
+import time
+
+from agent import MinimaxInfo
+
+# the exploration constant of UCT
+EXPLORATION = math.sqrt(2)
+# the number of playouts of a search without a time limit
+ITERATIONS = 1000
+
+def playout(state, round, generator):
+    """
+    Play uniformly random moves until the player to move cannot move, as randomAgent chooses them, but
+    on the bitboard of the state, drawing each jump without listing the jumps or building successor states.
+    :param state: the state the playout starts from, class GameState, which is played on
+    :param round: the number of round of the state
+    :param generator: the random.Random choosing the moves
+    :return: the color index of the winner
+    """
+    while round <= 2:
+        state.makeMove(generator.choice(state.getAllMoves(round)))
+        round += 1
+    board, colorIndex = state.board, state.colorIndex
+    while True:
+        jump = board.randomJump(colorIndex, generator)
+        if jump is None:
+            return 1 - colorIndex
+        board.applyJump(colorIndex, *jump)
+        colorIndex = 1 - colorIndex
+
+def _playout(task):
+    """
+    Run a playout in a worker process.
+    :param task: a tuple (state, round, seed)
+    :return: the color index of the winner
+    """
+    state, round, seed = task
+    return playout(state, round, random.Random(seed))
+
+
+class MonteCarloNode:
+    """
+    A node of the search tree of MonteCarloSearch. The playouts through a node are counted in visits,
+    and those won by the player who made the move leading to it in wins.
+    """
+
+    def __init__(self, parent, move, state, round):
+        """
+        :param parent: the parent node, None for the root
+        :param move: the move from the parent, None for the root
+        :param state: the state of the node, class GameState
+        :param round: the number of round of the state
+        """
+        self.parent = parent
+        self.move = move
+        self.colorIndex = state.colorIndex
+        self.key = state.getKey()
+        self.round = round
+        # the moves without a child yet
+        self.untried = state.getMoves(round)
+        self.terminal = round > 2 and not self.untried
+        self.children = []
+        self.visits = 0
+        self.wins = 0.0
+
+
+class MonteCarloSearch:
+    """
+    Monte Carlo tree search with UCT. Every iteration descends the tree from the root, choosing the child
+    with the best upper confidence bound, adds one child for an untried move, plays a random game from it,
+    and counts the result on the way back. The move played is the most visited child of the root. The tree
+    is kept between searches, and the next search starts from the node of its position if the tree reached
+    it, so the playouts through the moves actually played are not lost.
+
+    The leaves are selected batch at a time before their playouts run. Each selected node counts its visit
+    at once, a virtual loss until its result comes back, so the leaves of a batch spread over the tree. With
+    processes, the playouts of a batch run on a pool of worker processes.
+    """
+
+    def __init__(self, iterations=ITERATIONS, batch=1, processes=None, exploration=EXPLORATION, seed=None):
+        """
+        :param iterations: the number of playouts of a search without a time limit
+        :param batch: the number of leaves selected before their playouts run
+        :param processes: the number of worker processes running the playouts, None to run them in this process
+        :param exploration: the exploration constant of UCT
+        :param seed: the seed of the random moves, None to draw it from the random module, so the search is
+            repeatable after random.seed
+        """
+        self.iterations = iterations
+        self.batch = batch
+        self.exploration = exploration
+        self.generator = random.Random(seed if seed is not None else random.getrandbits(64))
+        self.pool = multiprocessing.Pool(processes) if processes else None
+        self.root = None
+
+    def close(self):
+        """
+        Stop the worker processes.
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def findRoot(self, state, round):
+        """
+        :param state: the state being searched, class GameState
+        :param round: the number of round of the state
+        :return: the node of the state in the tree of the previous search, two plies deep at most, else a new node
+        """
+        key = state.getKey()
+        nodes = [self.root] if self.root is not None else []
+        for depth in range(3):
+            for node in nodes:
+                if node.key == key and node.round == round:
+                    node.parent = None
+                    return node
+            nodes = [child for node in nodes for child in node.children]
+        return MonteCarloNode(None, None, state, round)
+
+    def select(self, node, state, minimaxInfo):
+        """
+        Descend from a node to a leaf, adding a child if the leaf has untried moves, and count a visit of
+        every node on the way.
+        :param node: the node to start from
+        :param state: the state of the node, class GameState, which is moved to the state of the leaf
+        :param minimaxInfo: the meta information of the search, which counts the nodes added
+        :return: the leaf
+        """
+        node.visits += 1
+        while not node.untried and node.children:
+            logVisits = math.log(node.visits)
+            exploration = self.exploration
+            best, bestScore = None, float('-inf')
+            for child in node.children:
+                score = child.wins / child.visits + exploration * math.sqrt(logVisits / child.visits)
+                if score > bestScore:
+                    best, bestScore = child, score
+            node = best
+            state.makeMove(node.move)
+            node.visits += 1
+        if node.untried:
+            move = node.untried.pop(int(self.generator.random() * len(node.untried)))
+            state.makeMove(move)
+            child = MonteCarloNode(node, move, state, node.round + 1)
+            if child.untried:
+                minimaxInfo.numberBranchingFactors += 1
+                minimaxInfo.totalBranchingFactors += len(child.untried)
+            node.children.append(child)
+            node = child
+            node.visits += 1
+        return node
+
+    def search(self, state, round, timeLimit=None, minimaxInfo=None):
+        """
+        :param state: current state of game, class GameState
+        :param round: the number of round
+        :param timeLimit: the time budget of the search in seconds, None to run self.iterations playouts
+        :param minimaxInfo: the meta information of the search, updated in place, a new one if None
+        :return: the value for the computer, twice the winning rate of the best move minus one, the best move,
+            the meta information
+        """
+        if minimaxInfo is None:
+            minimaxInfo = MinimaxInfo()
+        root = self.root = self.findRoot(state, round)
+        if not root.visits and root.untried:
+            minimaxInfo.numberBranchingFactors += 1
+            minimaxInfo.totalBranchingFactors += len(root.untried)
+        if root.terminal:
+            return (float('-inf') if state.player == 'computer' else float('inf')), None, minimaxInfo
+        deadline = time.time() + timeLimit if timeLimit is not None else None
+        number = 0
+        while True:
+            if deadline is None and number >= self.iterations or deadline is not None and number and \
+                    time.time() >= deadline:
+                break
+            leaves = []
+            for i in range(self.batch):
+                leafState = state.copy()
+                leaves.append((self.select(root, leafState, minimaxInfo), leafState))
+            tasks = [(leafState, leaf.round, self.generator.getrandbits(32)) for leaf, leafState in leaves \
+                if not leaf.terminal]
+            if self.pool is not None:
+                winners = iter(self.pool.map(_playout, tasks))
+            else:
+                winners = iter([_playout(task) for task in tasks])
+            minimaxInfo.numberPlayouts += len(tasks)
+            for leaf, leafState in leaves:
+                # the player to move at a terminal node has lost
+                winner = 1 - leaf.colorIndex if leaf.terminal else next(winners)
+                node = leaf
+                while node is not None:
+                    if winner != node.colorIndex:
+                        node.wins += 1
+                    node = node.parent
+            number += len(leaves)
+
+        best = max(root.children, key=lambda child: child.visits)
+        value = 2 * best.wins / best.visits - 1
+        return (value if state.player == 'computer' else -value), state.describeMove(best.move), minimaxInfo
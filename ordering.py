@@ -0,0 +1,122 @@
+class MoveOrdering:
+    """
+    Order the moves of the alpha beta search so that cutoffs come early. The principal variation
+    move of the transposition table is searched first, then the killer moves of the round, then the
+    other moves by their history score. Moves are the tuples (initial index, step, hops) of GameState.
+    """
+
+    def __init__(self, ifKillers=True, ifHistory=True, ifStaticRoot=False, numberKillers=2):
+        """
+        :param ifKillers: a boolean represents whether to search the killer moves of each round early
+        :param ifHistory: a boolean represents whether to sort the remaining moves by the history table
+        :param ifStaticRoot: a boolean represents whether to sort the moves of the root by their static evaluation
+        :param numberKillers: the number of killer moves kept for each round
+        """
+        self.ifKillers = ifKillers
+        self.ifHistory = ifHistory
+        self.ifStaticRoot = ifStaticRoot
+        self.numberKillers = numberKillers
+        self.rootRound = None
+        # round -> the latest moves which caused a cutoff in that round
+        self.killers = {}
+        # (initial index, destination index) -> sum of the squared depths of the cutoffs it caused
+        self.history = {}
+        # depth -> [number of nodes, number of cutoffs, number of cutoffs by the first move]
+        self.depthStats = {}
+
+    def newSearch(self, round):
+        """
+        Prepare a search from a new root. The history of the previous searches is halved, so it
+        still helps but newer cutoffs count more.
+        :param round: the number of round of the root
+        """
+        self.rootRound = round
+        for key in self.history.keys():
+            self.history[key] //= 2
+            if not self.history[key]:
+                del self.history[key]
+
+    def order(self, items, state, round, tableMove=None, key=None):
+        """
+        Sort the moves of a node.
+        :param items: the moves, or anything the key function maps to moves
+        :param state: the state of the node, class GameState
+        :param round: the number of round of the node
+        :param tableMove: the best move stored in the transposition table, None if there is none
+        :param key: a function from an item to its move, None if the items are moves
+        :return: a new list of the items in search order
+        """
+        if key is None:
+            key = lambda item: item
+        killers = self.killers.get(round, ()) if self.ifKillers else ()
+        history = self.history if self.ifHistory else {}
+
+        staticValues = {}
+        if self.ifStaticRoot and round == self.rootRound:
+            # the maximizing player searches the successors with high values first
+            sign = -1 if state.minMax == 'max' else 1
+            for item in items:
+                move = key(item)
+                staticValues[move] = sign * state.getSuccessor(move).evaluate()
+
+        def priority(item):
+            move = key(item)
+            if move == tableMove:
+                return (0, 0, 0)
+            if move in killers:
+                return (1, killers.index(move), 0)
+            return (2, staticValues.get(move, 0), -history.get(historyKey(move), 0))
+        return sorted(items, key=priority)
+
+    def recordNode(self, depth):
+        """
+        Count a node which generated moves.
+        :param depth: the depth left to search below the node
+        """
+        stats = self.depthStats.get(depth)
+        if stats is None:
+            stats = self.depthStats[depth] = [0, 0, 0]
+        stats[0] += 1
+
+    def recordCutoff(self, move, round, depth, moveNumber):
+        """
+        Remember a move which caused a cutoff.
+        :param move: the move which caused the cutoff
+        :param round: the number of round of the node
+        :param depth: the depth left to search below the node
+        :param moveNumber: the position of the move in the search order, 0 for the first
+        """
+        stats = self.depthStats[depth]
+        stats[1] += 1
+        if moveNumber == 0:
+            stats[2] += 1
+
+        if self.ifKillers:
+            killers = self.killers.setdefault(round, [])
+            if move in killers:
+                killers.remove(move)
+            killers.insert(0, move)
+            del killers[self.numberKillers:]
+        if self.ifHistory:
+            key = historyKey(move)
+            self.history[key] = self.history.get(key, 0) + depth * depth
+
+    def report(self):
+        """
+        :return: a list of tuples (depth, number of nodes, number of cutoffs, first move cutoff rate)
+            from the deepest depth to the shallowest
+        """
+        result = []
+        for depth in sorted(self.depthStats.keys(), reverse=True):
+            nodes, cutoffs, firstMoveCutoffs = self.depthStats[depth]
+            rate = firstMoveCutoffs * 1.00 / cutoffs if cutoffs else 0.0
+            result.append((depth, nodes, cutoffs, rate))
+        return result
+
+
+def historyKey(move):
+    """
+    :param move: a tuple (initial index, step, hops)
+    :return: a tuple of the initial and the destination index of the move
+    """
+    return (move[0], move[0] + 2 * move[2] * move[1])
@@ -0,0 +1,176 @@
+import multiprocessing
+import random
+
+from agent import MinimaxInfo
+from agent import minimaxAlphaBeta
+from agent import minimaxAlphaBetaInPlace
+from ordering import MoveOrdering
+from regions import RegionSolver
+from tablebase import loadTablebase
+from transposition import BoundedTranspositionTable
+from transposition import TranspositionTable
+
+# shared between the processes of the pool, set by _initWorker
+_generations = None
+_bounds = None
+_settings = None
+_table = None
+_ordering = None
+_tablebase = None
+# the generation of the last search of the worker, whose move ordering history is kept
+_generation = None
+
+def _initWorker(generations, bounds, settings, width, height):
+    """
+    Initialize a worker process of the pool, with its own transposition table, move ordering and tablebase,
+    which it keeps across tasks.
+    :param generations: the shared array of the search generation each child result belongs to
+    :param bounds: the shared array of the bound each finished child proves for the root
+    :param settings: the settings of the searches of the game, class SearchSettings
+    :param width: width of the game board
+    :param height: height of the game board
+    """
+    global _generations, _bounds, _settings, _table, _ordering, _tablebase
+    _generations = generations
+    _bounds = bounds
+    _settings = settings
+    if not settings.ifTable:
+        _table = None
+    elif settings.tableMegabytes:
+        _table = BoundedTranspositionTable(settings.tableMegabytes, policy=settings.tablePolicy)
+    else:
+        _table = TranspositionTable()
+    _ordering = MoveOrdering() if settings.ifOrdering else None
+    _tablebase = loadTablebase(settings.tablebasePath) if settings.tablebasePath else None
+    if settings.ifRegions:
+        _tablebase = RegionSolver(width, height, tablebase=_tablebase)
+
+def _searchChild(task):
+    """
+    Search one successor of the root in a worker process. The window is narrowed by the bounds of
+    the successors before it which have already finished, so the result decides the best move of
+    the root exactly as the serial search would.
+    :param task: a tuple (generation, number of the successor, successor, limit, round, alpha, beta, a boolean
+        represents whether the detailed meta information is kept)
+    :return: a tuple (number of the successor, value, alpha, beta, minimax meta information)
+    """
+    global _generation
+    generation, number, successor, limit, round, alpha, beta, detailed = task
+    if _table is not None and generation != _generation:
+        _table.newSearch()
+    if _ordering is not None and generation != _generation:
+        _ordering.newSearch(round)
+    _generation = generation
+    maximizing = successor.minMax == 'min'
+    for previous in range(number):
+        if _generations[previous] != generation:
+            continue
+        if maximizing:
+            alpha = max(alpha, _bounds[previous])
+        else:
+            beta = min(beta, _bounds[previous])
+
+    if _settings.ifInPlace:
+        if _settings.ifIncremental:
+            successor.trackMobility()
+        search = minimaxAlphaBetaInPlace
+    else:
+        search = minimaxAlphaBeta
+    bv, move, minimaxInfo = search(successor, limit, round, alpha, beta, _table, None, _ordering, \
+        _settings.ifBatch, _tablebase, MinimaxInfo(detailed=detailed))
+
+    # a fail-low value only bounds this successor, the window it was searched with bounds the root
+    _bounds[number] = max(bv, alpha) if maximizing else min(bv, beta)
+    _generations[number] = generation
+    return number, bv, alpha, beta, minimaxInfo
+
+
+class ParallelSearch:
+    """
+    Search the successors of the root in parallel on a pool of worker processes. The first successor
+    is searched alone, then all the others are handed out at once. Every finished successor publishes
+    the bound it proves for the root, which narrows the window of the successors after it that start
+    later. Results are merged in move order, so the best value is that of the serial alpha beta search.
+    The workers search as the settings of the game say, in place or not, with the batch evaluation, and
+    each with its own transposition table, move ordering and tablebase.
+    """
+
+    def __init__(self, settings, width, height, capacity=4096):
+        """
+        :param settings: the settings of the searches of the game, class SearchSettings, whose processes is
+            the number of worker processes, the number of CPUs if None
+        :param width: width of the game board
+        :param height: height of the game board
+        :param capacity: the largest number of successors of a root
+        """
+        self.capacity = capacity
+        self.generation = 0
+        self.generations = multiprocessing.Array('l', capacity, lock=False)
+        self.bounds = multiprocessing.Array('d', capacity, lock=False)
+        self.settings = settings
+        self.pool = multiprocessing.Pool(settings.processes, _initWorker, \
+            (self.generations, self.bounds, settings, width, height))
+
+    def close(self):
+        """
+        Stop the worker processes.
+        """
+        self.pool.close()
+        self.pool.join()
+
+    def search(self, state, limit, round, alpha, beta, minimaxInfo=None, table=None, ordering=None, tablebase=None):
+        """
+        Minmax algorithm with Alpha-Beta pruning, with the successors of the root searched in parallel.
+        :param state: current state of game, class GameState
+        :param limit: an integer that indicates limit
+        :param round: the number of round
+        :param alpha: the min value of the max level
+        :param beta: the max value of the min level
+        :param minimaxInfo: the minimax meta information of the search, a new one if None
+        :param table: the TranspositionTable of a root searched in this process, None if there is none
+        :param ordering: the MoveOrdering of a root searched in this process, None if there is none
+        :param tablebase: the Tablebase or RegionSolver of a root searched in this process, None if there is none
+        :return: cbv, best move, minimax meta information
+        """
+        listOfMoves = state.getMoves(round)
+        if limit <= 1 or len(listOfMoves) < 2 or len(listOfMoves) > self.capacity:
+            # too few successors to share, so the root is searched here as the serial search would
+            if ordering is not None:
+                ordering.newSearch(round)
+            search = minimaxAlphaBetaInPlace if self.settings.ifInPlace else minimaxAlphaBeta
+            return search(state.copy(), limit, round, alpha, beta, table, None, ordering, self.settings.ifBatch, \
+                tablebase, minimaxInfo)
+
+        if minimaxInfo is None:
+            minimaxInfo = MinimaxInfo()
+        minimaxInfo.numberBranchingFactors += 1
+        minimaxInfo.totalBranchingFactors += len(listOfMoves)
+
+        self.generation += 1
+        tasks = [(self.generation, number, state.getSuccessor(move), limit-1, round+1, alpha, beta, \
+            minimaxInfo.detailed) for number, move in enumerate(listOfMoves)]
+        # the eldest successor is searched first, so all the others start with its bound
+        results = [self.pool.apply(_searchChild, (tasks[0],))]
+        results.extend(self.pool.imap_unordered(_searchChild, tasks[1:]))
+        results.sort()
+
+        maximizing = state.minMax == 'max'
+        cbv = float("-inf") if maximizing else float("inf")
+        bestMove = None
+        for number, bv, childAlpha, childBeta, successorMinimaxInfo in results:
+            # the workers' counters come back pickled, so they are added up here
+            minimaxInfo += successorMinimaxInfo
+            if maximizing and bv > cbv:
+                cbv = bv
+                bestMove = listOfMoves[number]
+                alpha = bv
+            elif not maximizing and bv < cbv:
+                cbv = bv
+                bestMove = listOfMoves[number]
+                beta = bv
+            if beta <= alpha:
+                minimaxInfo.numberCutoffs += 1
+                break
+        if bestMove == None:
+            bestMove = random.choice(listOfMoves)
+        return cbv, state.describeMove(bestMove), minimaxInfo
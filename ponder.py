@@ -0,0 +1,134 @@
+import threading
+import time
+
+from agent import SearchTimeout
+from agent import minimaxAlphaBetaInPlace
+from agent import principalVariationSearch
+
+# the longest time in seconds a search of the ponderer runs before it checks whether to stop
+PONDER_SLICE = 0.05
+
+class Ponderer:
+    """
+    Search during the opponent's turn. While the user thinks, a background thread searches the
+    position after each reply of the user, as the computer will search it, with the transposition
+    table and move ordering of the game. The reply the table predicts is searched first, then the
+    others, one more ply deep each round. Every search is cut into slices of PONDER_SLICE seconds by
+    its deadline, so the thread stops soon after the user moves. When a reply has been searched to the
+    full depth, its result is kept, and the computer plays it at once if the user chose that reply;
+    otherwise the search of the computer still finds the table filled. The main thread only waits for
+    input while the thread runs, so they never use the table at the same time.
+    """
+
+    def __init__(self, table, ordering=None, symmetry=None, ifPVS=False, reductions=False, tablebase=None, \
+            weights=None):
+        """
+        :param table: the TranspositionTable of the computer's searches, which carries the work of a slice
+            over to the next
+        :param ordering: the MoveOrdering of the computer's searches, None if they use none
+        :param symmetry: the symmetries of the board the computer's searches use, None if they use none
+        :param ifPVS: a boolean represents whether the computer searches with principalVariationSearch,
+            whose table values are for the player to move, instead of minimaxAlphaBetaInPlace
+        :param reductions: a boolean represents whether the principal variation search reduces late moves
+        :param tablebase: a Tablebase or a RegionSolver of the computer's searches, None if they use none
+        :param weights: the weights of the features of the computer's evaluation, None for the mobility evaluation
+        """
+        self.table = table
+        self.ordering = ordering
+        self.symmetry = symmetry
+        self.ifPVS = ifPVS
+        self.reductions = reductions
+        self.tablebase = tablebase
+        self.weights = weights
+        self.thread = None
+        self.stopped = False
+        # key of a position of the computer -> (depth, value, best move) of its completed search
+        self.results = {}
+
+    def start(self, state, round, depth):
+        """
+        Start pondering the replies of the user.
+        :param state: the state of the user to move, class GameState
+        :param round: the number of round of the user's move
+        :param depth: the depth the computer will search to
+        """
+        self.stop()
+        self.results = {}
+        self.stopped = False
+        state = state.copy()
+        state.symmetry = self.symmetry
+        state.weights = self.weights
+        self.thread = threading.Thread(target=self.ponder, args=(state, round, depth))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop the background search and wait for it, which takes at most PONDER_SLICE seconds.
+        """
+        if self.thread is not None:
+            self.stopped = True
+            self.thread.join()
+            self.thread = None
+
+    def ponder(self, state, round, depth):
+        """
+        Search the positions after the replies of the user, deeper and deeper, until stopped.
+        :param state: the state of the user to move, class GameState
+        :param round: the number of round of the user's move
+        :param depth: the depth the computer will search to
+        """
+        listOfMoves = state.getMoves(round)
+        key, transform = state.getTableKey()
+        entry = self.table.probe(key)
+        if entry is not None and entry[3] is not None:
+            # the reply the last search of the computer expects is searched first
+            predicted = state.fromTableMove(entry[3], transform)
+            listOfMoves.sort(key=lambda move: move != predicted)
+        successors = [state.getSuccessor(move) for move in listOfMoves]
+
+        for limit in range(1, depth + 1):
+            for successor in successors:
+                if self.ordering is not None:
+                    self.ordering.newSearch(round + 1)
+                while True:
+                    if self.stopped:
+                        return
+                    try:
+                        value, move = self.search(successor, round + 1, limit)
+                        break
+                    except SearchTimeout:
+                        # the subtrees the slice finished are in the table, so the next slice goes further
+                        pass
+                if move is not None:
+                    self.results[successor.getKey()] = (limit, value, move)
+
+    def search(self, state, round, limit):
+        """
+        :param state: the state of the computer to move, class GameState
+        :param round: the number of round
+        :param limit: the depth of the search
+        :return: the value and best move found, SearchTimeout is raised when the slice runs out
+        """
+        deadline = time.time() + PONDER_SLICE
+        if self.ifPVS:
+            value, move, minimaxInfo = principalVariationSearch(state.copy(), limit, round, self.table, \
+                self.ordering, None, self.reductions, self.tablebase, deadline)
+        else:
+            value, move, minimaxInfo = minimaxAlphaBetaInPlace(state.copy(), limit, round, float('-inf'), \
+                float('inf'), self.table, deadline, self.ordering, False, self.tablebase)
+        return value, move
+
+    def take(self, state, depth):
+        """
+        Keep the result of the reply the user chose, and forget the others.
+        :param state: the state of the computer to move after the user's move, class GameState
+        :param depth: the depth the computer searches to
+        :return: the value and best move of the state searched to that depth, None if it was not reached
+        """
+        self.stop()
+        result = self.results.get(state.getKey())
+        self.results = {}
+        if result is None or result[0] != depth:
+            return None
+        return result[1], result[2]
@@ -0,0 +1,188 @@
+import argparse
+import json
+import os
+import struct
+
+from bitboard import Board
+
+MAGIC = 'KGR1'
+# the length of the body of a record, which lets a reader skip it
+LENGTH = struct.Struct('<I')
+# width, height, who moved first, winner, number of jumps, length of the settings
+RECORD_HEADER = struct.Struct('<BBBBHH')
+# the cells of the two removals
+REMOVALS = struct.Struct('<HH')
+# the cell a jump starts from, and its direction times 64 plus its number of hops
+JUMP = struct.Struct('<HB')
+PLAYERS = ['computer', 'user']
+# the winner of a game which was not finished
+NO_WINNER = 255
+# -x, +x, -y, +y, as the directions of Board
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+# number of jumps -> the Struct of that many jumps, so the jumps of a record are unpacked at once
+JUMPS = {}
+# (width, height) -> the decoded jumps of that board size by their cell times 256 plus their packed byte
+DECODED = {}
+
+class GameRecord:
+    """
+    A game as stored in a record file: the board size, who moved first, the winner, the settings of
+    the agents, and the moves. A removal is stored as the number of its cell and a jump as the cell it
+    starts from with its direction and number of hops, which together take 3 bytes, so a game on 8x8
+    takes a few dozen bytes besides its settings.
+    """
+
+    def __init__(self, width, height, moveFirst, moves, winner=None, settings=None):
+        """
+        :param width: width of the game board
+        :param height: height of the game board
+        :param moveFirst: the player who moved first, 'computer' or 'user'
+        :param moves: the list of moves, the positions of the two removals then the tuples of the initial and
+            destination positions of the jumps
+        :param winner: the player who won, None if the game was not finished
+        :param settings: a dictionary of the settings of the agents which can be written as JSON, None if there
+            are none
+        """
+        self.width = width
+        self.height = height
+        self.moveFirst = moveFirst
+        self.moves = moves
+        self.winner = winner
+        self.settings = settings if settings is not None else {}
+
+    def cell(self, position):
+        """
+        :param position: a tuple of coordinate (x,y)
+        :return: the number of the cell, column by column
+        """
+        return (position[0] - 1) * self.height + position[1] - 1
+
+    def position(self, cell):
+        """
+        :param cell: the number of a cell
+        :return: the tuple of coordinate (x,y) of the cell
+        """
+        return cell // self.height + 1, cell % self.height + 1
+
+    def pack(self):
+        """
+        :return: the record as a string of bytes, its length first
+        """
+        settings = json.dumps(self.settings, sort_keys=True, separators=(',', ':'))
+        jumps = self.moves[2:]
+        winner = PLAYERS.index(self.winner) if self.winner is not None else NO_WINNER
+        parts = [RECORD_HEADER.pack(self.width, self.height, PLAYERS.index(self.moveFirst), winner, len(jumps), \
+            len(settings)), settings, REMOVALS.pack(self.cell(self.moves[0]), self.cell(self.moves[1]))]
+        for initial, destination in jumps:
+            dx, dy = destination[0] - initial[0], destination[1] - initial[1]
+            hops = (abs(dx) + abs(dy)) // 2
+            direction = DIRECTIONS.index((dx // (2 * hops), dy // (2 * hops)))
+            parts.append(JUMP.pack(self.cell(initial), direction * 64 + hops))
+        body = ''.join(parts)
+        return LENGTH.pack(len(body)) + body
+
+    @staticmethod
+    def unpack(body):
+        """
+        :param body: the bytes of a record after its length
+        :return: the record, class GameRecord
+        """
+        width, height, moveFirst, winner, numberJumps, settingsLength = RECORD_HEADER.unpack_from(body)
+        offset = RECORD_HEADER.size
+        settings = json.loads(body[offset:offset + settingsLength])
+        offset += settingsLength
+        record = GameRecord(width, height, PLAYERS[moveFirst], [], \
+            PLAYERS[winner] if winner != NO_WINNER else None, settings)
+        moves = [record.position(cell) for cell in REMOVALS.unpack_from(body, offset)]
+        offset += REMOVALS.size
+        jumps = JUMPS.get(numberJumps)
+        if jumps is None:
+            jumps = JUMPS[numberJumps] = struct.Struct('<' + JUMP.format[1:] * numberJumps)
+        values = jumps.unpack_from(body, offset)
+        decoded = DECODED.setdefault((width, height), {})
+        for i in range(0, len(values), 2):
+            key = values[i] * 256 + values[i + 1]
+            move = decoded.get(key)
+            if move is None:
+                (x, y), (dx, dy), hops = record.position(values[i]), DIRECTIONS[values[i + 1] // 64], values[i + 1] % 64
+                move = decoded[key] = ((x, y), (x + 2 * hops * dx, y + 2 * hops * dy))
+            moves.append(move)
+        record.moves = moves
+        return record
+
+    def replay(self):
+        """
+        Play the moves of the game from the start.
+        :return: a generator of the board after each move, class Board, the same object updated in place
+        """
+        board = Board(self.width, self.height)
+        for number, move in enumerate(self.moves):
+            if number < 2:
+                board[move] = 2
+            else:
+                # the player who moved first has the dark pieces, and the colors alternate every move
+                board.makeMove(move[0], move[1], number % 2)
+            yield board
+
+
+class GameRecordWriter:
+    """
+    Append game records to a file. The file starts with MAGIC and is only ever appended to, so many
+    games can be added over time, and a file cut short by a crash loses at most its last record.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: the path of the file, created if it does not exist
+        """
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+
+    def write(self, record):
+        """
+        :param record: the record to append, class GameRecord
+        """
+        self.file.write(record.pack())
+
+    def close(self):
+        self.file.close()
+
+
+def readRecords(path):
+    """
+    Read the records of a file one at a time, so a file of any size takes the memory of one record.
+    An incomplete last record is ignored.
+    :param path: the path of a file written by GameRecordWriter
+    :return: a generator of the records, class GameRecord
+    """
+    with open(path, 'rb') as recordFile:
+        if recordFile.read(len(MAGIC)) != MAGIC:
+            raise Exception(path + ' is not a file of game records')
+        while True:
+            prefix = recordFile.read(LENGTH.size)
+            if len(prefix) < LENGTH.size:
+                return
+            length, = LENGTH.unpack(prefix)
+            body = recordFile.read(length)
+            if len(body) < length:
+                return
+            yield GameRecord.unpack(body)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Summarize a file of Konane game records.')
+    parser.add_argument('path', help='file written by GameRecordWriter')
+    parser.add_argument('--print', dest='ifPrint', action='store_true', help='print every game')
+    args = parser.parse_args()
+    games = moves = 0
+    wins = {}
+    for record in readRecords(args.path):
+        games += 1
+        moves += len(record.moves)
+        wins[record.winner] = wins.get(record.winner, 0) + 1
+        if args.ifPrint:
+            print record.width, record.height, record.moveFirst, record.winner, record.moves
+    print 'Games:', games, 'moves:', moves, 'bytes:', os.path.getsize(args.path)
+    for winner, count in sorted(wins.items()):
+        print 'Won by', winner, count
@@ -0,0 +1,252 @@
+from bitboard import Board
+from bitboard import popcount
+from bitboard import shift
+from combinatorial import ZERO
+from combinatorial import add
+from combinatorial import canonical
+from combinatorial import firstPlayerWins
+
+class RegionSolver:
+    """
+    Solve late game positions which fall apart into regions that can never interact. Groups of
+    orthogonally adjacent pieces are grown into regions: the reach of a region is every cell its
+    pieces can occupy in any sequence of moves of both colors made in it alone, and regions whose
+    reaches touch are merged, until no two regions can ever have a piece next to each other. The
+    game is then the sum of the games of the regions. Each region is valued exactly as a short
+    partizan game in canonical form, memoized by its shape, so the interleavings of moves between
+    regions are never searched.
+    """
+
+    def __init__(self, width, height, maxPieces=10, budget=500, tablebase=None):
+        """
+        :param width: width of the game board
+        :param height: height of the game board
+        :param maxPieces: the largest number of pieces of a position the solver tries
+        :param budget: the largest number of positions explored to find the reach of a region
+        :param tablebase: a Tablebase consulted before the regions, None if there is none
+        """
+        self.width = width
+        self.height = height
+        self.stride = height + 1
+        self.maxPieces = maxPieces
+        self.budget = budget
+        self.tablebase = tablebase
+        self.board = Board(width, height, (0, 0), 0)
+        # (dark mask, light mask) -> list of regions, None if the position cannot be decomposed
+        self.decompositions = {}
+        # (dark mask, light mask) of a region -> its reach, None if it exceeds the budget
+        self.reaches = {}
+        # (dark mask, light mask) -> the game of the pieces alone
+        self.values = {}
+        # region shifted to the corner (reach, dark mask, light mask) -> the game of the region
+        self.shapes = {}
+
+    def neighbourhood(self, bits):
+        """
+        :param bits: a mask of cells
+        :return: the mask of the cells and their orthogonal neighbours on the board
+        """
+        result = bits
+        for step in self.board.directions:
+            result |= shift(bits, step)
+        return result & self.board.full
+
+    def groups(self, pieces):
+        """
+        :param pieces: the masks of the dark and the light pieces
+        :return: the list of the masks of the groups of orthogonally adjacent pieces
+        """
+        remaining = pieces[0] | pieces[1]
+        result = []
+        while remaining:
+            group = remaining & -remaining
+            while True:
+                grown = self.neighbourhood(group) & remaining
+                if grown == group:
+                    break
+                group = grown
+            remaining &= ~group
+            result.append(group)
+        return result
+
+    def reach(self, pieces):
+        """
+        Find every cell the pieces of a region can occupy, exploring the moves of both colors in
+        any order with the rest of the board empty.
+        :param pieces: the masks of the dark and the light pieces of the region
+        :return: the mask of the cells, None if the region has more positions than the budget
+        """
+        key = (pieces[0], pieces[1])
+        if key in self.reaches:
+            return self.reaches[key]
+        board = self.board
+        seen = set([key])
+        stack = [key]
+        result = 0
+        while stack:
+            dark, light = stack.pop()
+            result |= dark | light
+            for colorIndex in range(2):
+                board.pieces[0], board.pieces[1] = dark, light
+                for move in board.getJumps(colorIndex):
+                    board.applyJump(colorIndex, *move)
+                    child = (board.pieces[0], board.pieces[1])
+                    board.undoJump(colorIndex, *move)
+                    if child not in seen:
+                        if len(seen) >= self.budget:
+                            self.reaches[key] = None
+                            return None
+                        seen.add(child)
+                        stack.append(child)
+        self.reaches[key] = result
+        return result
+
+    def decompose(self, pieces):
+        """
+        :param pieces: the masks of the dark and the light pieces
+        :return: the list of regions as tuples (dark mask, light mask, reach), None if the position has
+            too many pieces or a region too many positions
+        """
+        key = (pieces[0], pieces[1])
+        if key in self.decompositions:
+            return self.decompositions[key]
+        if len(self.decompositions) > 100000:
+            self.decompositions.clear()
+
+        result = None
+        if popcount(pieces[0] | pieces[1]) <= self.maxPieces:
+            regions = self.groups(pieces)
+            while True:
+                reaches = [self.reach((pieces[0] & region, pieces[1] & region)) for region in regions]
+                if None in reaches:
+                    break
+                merged = False
+                for i in range(len(regions)):
+                    for j in range(i + 1, len(regions)):
+                        if self.neighbourhood(reaches[i]) & reaches[j]:
+                            regions[i] |= regions.pop(j)
+                            merged = True
+                            break
+                    if merged:
+                        break
+                if not merged:
+                    result = [(pieces[0] & region, pieces[1] & region, reach) for region, reach in zip(regions, reaches)]
+                    break
+        self.decompositions[key] = result
+        return result
+
+    def regionValue(self, dark, light, reach):
+        """
+        :param dark: the mask of the dark pieces of a region
+        :param light: the mask of the light pieces of the region
+        :param reach: the reach of the region
+        :return: the game of the region in canonical form
+        """
+        # the game only depends on the cells of the reach, so it is the same wherever the region is
+        cells = [cell for cell in range(reach.bit_length()) if (reach >> cell) & 1]
+        offset = min(cells) // self.stride * self.stride + min(cell % self.stride for cell in cells)
+        key = (reach >> offset, dark >> offset, light >> offset)
+        result = self.shapes.get(key)
+        if result is None:
+            result = self.shapes[key] = self.value(dark, light)
+        return result
+
+    def value(self, dark, light):
+        """
+        :param dark: the mask of the dark pieces
+        :param light: the mask of the light pieces
+        :return: the game of the pieces in canonical form, with the rest of the board empty
+        """
+        key = (dark, light)
+        result = self.values.get(key)
+        if result is None:
+            options = []
+            for colorIndex in range(2):
+                board = self.board
+                board.pieces[0], board.pieces[1] = dark, light
+                children = []
+                for move in board.getJumps(colorIndex):
+                    board.applyJump(colorIndex, *move)
+                    children.append((board.pieces[0], board.pieces[1]))
+                    board.undoJump(colorIndex, *move)
+                options.append([self.value(*child) for child in children])
+            result = self.values[key] = canonical(options[0], options[1])
+        return result
+
+    def solve(self, pieces):
+        """
+        :param pieces: the masks of the dark and the light pieces
+        :return: a tuple of the list of regions and the list of their games, None if the position
+            cannot be decomposed
+        """
+        regions = self.decompose(pieces)
+        if regions is None:
+            return None
+        return regions, [self.regionValue(*region) for region in regions]
+
+    def evaluate(self, state, round):
+        """
+        :param state: a state of the game, class GameState
+        :param round: the number of round of the state
+        :return: the exact value of the state for the computer, None if it cannot be solved
+        """
+        if self.tablebase is not None:
+            value = self.tablebase.evaluate(state, round)
+            if value is not None:
+                return value
+        if round <= 2:
+            return None
+        result = self.solve(state.board.pieces)
+        if result is None:
+            return None
+        total = ZERO
+        for game in result[1]:
+            total = add(total, game)
+        ifWin = firstPlayerWins(total, state.colorIndex)
+        return float('inf') if ifWin == (state.player == 'computer') else float('-inf')
+
+    def bestMove(self, state, round):
+        """
+        Choose a move after which the opponent, moving first in the sum of the regions, loses.
+        :param state: a state of the game, class GameState
+        :param round: the number of round of the state
+        :return: a tuple of the exact value of the state for the computer and a move as a tuple of the
+            initial and destination positions, None if the state cannot be solved
+        """
+        if self.tablebase is not None:
+            result = self.tablebase.bestMove(state, round)
+            if result is not None:
+                return result
+        if round <= 2:
+            return None
+        result = self.solve(state.board.pieces)
+        if result is None:
+            return None
+        regions, games = result
+        colorIndex = state.colorIndex
+        bestMove = None
+        for i, (dark, light, reach) in enumerate(regions):
+            others = ZERO
+            for j, game in enumerate(games):
+                if j != i:
+                    others = add(others, game)
+            regionBoard = Board(self.width, self.height, (dark, light), 0)
+            for move in regionBoard.getJumps(colorIndex):
+                regionBoard.applyJump(colorIndex, *move)
+                child = self.value(regionBoard.pieces[0], regionBoard.pieces[1])
+                regionBoard.undoJump(colorIndex, *move)
+                if bestMove is None:
+                    bestMove = move
+                if not firstPlayerWins(add(others, child), 1 - colorIndex):
+                    return (float('inf') if state.player == 'computer' else float('-inf')), \
+                        state.describeMove(move)
+        if bestMove is None:
+            return None
+        return (float('-inf') if state.player == 'computer' else float('inf')), state.describeMove(bestMove)
+
+    def close(self):
+        """
+        Release the tablebase consulted before the regions.
+        """
+        if self.tablebase is not None:
+            self.tablebase.close()
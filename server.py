@@ -0,0 +1,387 @@
+import argparse
+import asynchat
+import asyncore
+import collections
+import json
+import multiprocessing
+import Queue
+import socket
+import threading
+import time
+
+from engine import Engine
+from engine import SHARED_OPTIONS
+from engine import formatMove
+from engine import parseMove
+
+# the fraction of the time left in its budget a game may spend on one search
+BUDGET_SHARE = 0.1
+# the number of latest searches the percentiles of the think time are taken over
+LATENCY_WINDOW = 10000
+
+# engines of a worker process by (width, height, options deciding the tables), set by _searchTask
+_ENGINES = {}
+
+def _searchTask(task):
+    """
+    Search a position in a worker process. Each worker keeps one engine per board size and options, so
+    its transposition table and move ordering history carry over between the searches of all games;
+    the dark player is always the computer, so the values agree whichever game stored them.
+    :param task: a tuple (width, height, position as written in the position command, options, depth,
+        time limit)
+    :return: a tuple of a tuple (value for the player to move, best move) or None if there is no move, the
+        meta information of the search as a dictionary, the time the search took, and the message of the
+        error which stopped the search or None
+    """
+    width, height, position, options, depth, timeLimit = task
+    key = (width, height) + tuple(options[name] for name in SHARED_OPTIONS)
+    start = time.time()
+    try:
+        engine = _ENGINES.get(key)
+        if engine is None:
+            engine = _ENGINES[key] = Engine(width, height)
+        engine.options.update(options)
+        answer = engine.execute('position ' + position)
+        if answer != 'ok':
+            return None, None, time.time() - start, answer[len('error '):]
+        result = engine.search(depth, timeLimit)
+    except Exception as error:
+        # the pool of Python 2 has no error callback, so errors are answered like results
+        return None, None, time.time() - start, str(error)
+    return result, engine.lastInfo.toDict(), time.time() - start, None
+
+def percentile(values, fraction):
+    """
+    :param values: a sorted list of numbers
+    :param fraction: the fraction of the values at or below the result, between 0 and 1
+    :return: the nearest rank percentile, 0 if there are no values
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class Session(asynchat.async_chat):
+    """
+    One connection to the server, speaking the protocol of engine.Engine. Commands are answered in the
+    order they arrive: a go command is sent to the worker pool, and the commands after it wait until
+    its answer has been written. Each session has its own game and may have a time budget for all of
+    its searches, set with option budget.
+    """
+
+    def __init__(self, server, connection):
+        """
+        :param server: the server which accepted the connection, class GameServer
+        :param connection: the socket of the connection
+        """
+        asynchat.async_chat.__init__(self, connection, map=server.sessionMap)
+        self.set_terminator('\n')
+        self.server = server
+        self.buffer = []
+        self.lines = collections.deque()
+        self.engine = Engine(server.width, server.height)
+        self.budget = None
+        self.searching = False
+        self.lastStats = {}
+
+    def collect_incoming_data(self, data):
+        self.buffer.append(data)
+
+    def found_terminator(self):
+        self.lines.append(''.join(self.buffer))
+        self.buffer = []
+        self.processLines()
+
+    def processLines(self):
+        """
+        Answer the waiting commands until a search is sent to the pool.
+        """
+        while self.lines and not self.searching and self.connected:
+            line = self.lines.popleft()
+            words = line.split()
+            if words and words[0] == 'go':
+                self.startSearch(words[1:])
+            elif words and words[0] == 'quit':
+                self.close_when_done()
+            else:
+                self.push(self.execute(words, line) + '\n')
+
+    def execute(self, words, line):
+        """
+        :param words: the words of a command other than go and quit
+        :param line: the command
+        :return: the answer
+        """
+        if words and words[0] == 'metrics':
+            return 'metrics ' + json.dumps(self.server.metrics(), sort_keys=True)
+        if words and words[0] == 'stats':
+            return 'stats ' + json.dumps(self.lastStats, sort_keys=True)
+        if words[:2] == ['option', 'budget']:
+            try:
+                self.budget = float(words[2]) if words[2] != 'none' else None
+            except (IndexError, ValueError):
+                return 'error the budget must be a number of seconds or none'
+            return 'ok'
+        return self.engine.execute(line)
+
+    def startSearch(self, arguments):
+        """
+        :param arguments: the words after go
+        """
+        settings = dict(zip(arguments[::2], arguments[1::2]))
+        try:
+            depth = int(settings.get('depth', self.engine.options['depth']))
+            timeLimit = float(settings['time']) if 'time' in settings else self.engine.options['time']
+        except ValueError:
+            self.push('error depth and time must be numbers\n')
+            return
+        if self.budget is not None:
+            if self.budget <= 0:
+                self.push('error the time budget of the game is spent\n')
+                return
+            share = self.budget * BUDGET_SHARE
+            timeLimit = share if timeLimit is None else min(timeLimit, share)
+        board = self.engine.game.board
+        task = (board.width, board.height, self.engine.describeBoard(), dict(self.engine.options), depth, timeLimit)
+        self.searching = True
+        self.server.submit(self, task)
+
+    def finishSearch(self, result, stats, thinkTime, error):
+        """
+        Answer a search sent to the pool, called by the server in the thread of the event loop.
+        :param result: a tuple of the value and the best move, None if there is no move
+        :param stats: the meta information of the search as a dictionary
+        :param thinkTime: the time from the go command to the answer, waiting in the queue included
+        :param error: the message of an exception raised by the search, None if there is none
+        """
+        self.searching = False
+        if self.budget is not None:
+            self.budget -= thinkTime
+        if not self.connected:
+            return
+        if error is not None:
+            self.push('error ' + error + '\n')
+        elif result is None:
+            self.push('bestmove none\n')
+        else:
+            self.lastStats = stats
+            self.push('bestmove %s value %s\n' % (formatMove(result[1]), result[0]))
+        self.processLines()
+
+    def handle_close(self):
+        self.close()
+        self.server.sessionClosed(self)
+
+
+class GameServer(asyncore.dispatcher):
+    """
+    Serve many games at once over local sockets. The connections are handled by a single thread with
+    an event loop, so a session waiting for its opponent costs nothing, and the searches are run by a
+    bounded pool of worker processes. At most maxPending searches are in the pool at a time; the others
+    wait in a queue in the order they arrived, and their waiting time counts as thinking time.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, processes=None, maxPending=None, width=8, height=8):
+        """
+        :param host: the address to listen on
+        :param port: the port to listen on, any free port if 0
+        :param processes: the number of worker processes, the number of CPUs if None
+        :param maxPending: the largest number of searches in the pool at a time, twice the number of
+            processes if None
+        :param width: width of the board of a new session
+        :param height: height of the board of a new session
+        """
+        self.sessionMap = {}
+        asyncore.dispatcher.__init__(self, map=self.sessionMap)
+        self.create_socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.set_reuse_addr()
+        self.bind((host, port))
+        self.listen(128)
+        self.address = self.socket.getsockname()
+        self.width = width
+        self.height = height
+        self.processes = processes or multiprocessing.cpu_count()
+        self.maxPending = maxPending or 2 * self.processes
+        self.pool = multiprocessing.Pool(self.processes)
+        self.waiting = collections.deque()
+        self.pending = 0
+        # results of the pool, put by its result thread and answered by the event loop
+        self.results = Queue.Queue()
+        self.sessions = 0
+        self.started = time.time()
+        self.numberSearches = 0
+        self.searchTime = 0.0
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.running = False
+
+    def handle_accept(self):
+        pair = self.accept()
+        if pair is not None:
+            Session(self, pair[0])
+            self.sessions += 1
+
+    def sessionClosed(self, session):
+        """
+        :param session: a session whose connection was closed
+        """
+        self.sessions -= 1
+
+    def submit(self, session, task):
+        """
+        :param session: the session asking for the search
+        :param task: the task of the search, as taken by _searchTask
+        """
+        self.waiting.append((session, task, time.time()))
+        self.dispatch()
+
+    def dispatch(self):
+        """
+        Send waiting searches to the pool while it has room.
+        """
+        while self.waiting and self.pending < self.maxPending:
+            session, task, submitted = self.waiting.popleft()
+            if not session.connected:
+                continue
+            self.pending += 1
+            self.pool.apply_async(_searchTask, (task,), \
+                callback=lambda result, session=session, submitted=submitted: \
+                    self.results.put((session, submitted, result)))
+
+    def collectResults(self):
+        """
+        Answer the searches the pool has finished.
+        """
+        while True:
+            try:
+                session, submitted, (result, stats, searchTime, error) = self.results.get_nowait()
+            except Queue.Empty:
+                return
+            self.pending -= 1
+            thinkTime = time.time() - submitted
+            if error is None:
+                self.numberSearches += 1
+                self.searchTime += searchTime
+                self.latencies.append(thinkTime)
+            session.finishSearch(result, stats, thinkTime, error)
+            self.dispatch()
+
+    def metrics(self):
+        """
+        :return: a dictionary of the throughput and latency of the server
+        """
+        uptime = time.time() - self.started
+        latencies = sorted(self.latencies)
+        return {'sessions': self.sessions, 'searches': self.numberSearches, 'pending': self.pending, \
+            'waiting': len(self.waiting), 'uptime': uptime, \
+            'movesPerSecond': self.numberSearches / uptime if uptime else 0.0, \
+            'thinkTimeP50': percentile(latencies, 0.5), 'thinkTimeP99': percentile(latencies, 0.99), \
+            'averageSearchTime': self.searchTime / self.numberSearches if self.numberSearches else 0.0}
+
+    def serve(self, timeout=0.01):
+        """
+        Run the event loop until stop is called.
+        :param timeout: the longest time in seconds a finished search waits to be answered
+        """
+        self.running = True
+        while self.running:
+            asyncore.loop(timeout, True, self.sessionMap, 1)
+            self.collectResults()
+
+    def stop(self):
+        """
+        Make serve return, from any thread.
+        """
+        self.running = False
+
+    def close(self):
+        """
+        Close the connections and stop the worker processes.
+        """
+        for channel in self.sessionMap.values():
+            if channel is not self:
+                channel.close()
+        asyncore.dispatcher.close(self)
+        self.pool.terminate()
+        self.pool.join()
+
+
+def playClient(address, width, height, depth, timeLimit=None, results=None):
+    """
+    Play a game against itself on a server, for testing.
+    :param address: the (host, port) of the server
+    :param width: width of the game board
+    :param height: height of the game board
+    :param depth: the depth of every search
+    :param timeLimit: the time budget of every search in seconds, None for a fixed depth search
+    :param results: a list the number of moves of the game is appended to, None to return it only
+    :return: the number of moves played
+    """
+    connection = socket.create_connection(address)
+    reader = connection.makefile('r')
+
+    def ask(command):
+        connection.sendall(command + '\n')
+        return reader.readline().strip()
+
+    ask('new %d %d' % (width, height))
+    go = 'go depth %d' % depth + (' time %s' % timeLimit if timeLimit is not None else '')
+    moves = 0
+    while True:
+        answer = ask(go)
+        if not answer.startswith('bestmove') or answer == 'bestmove none':
+            break
+        ask('move ' + formatMove(parseMove(answer.split()[1])))
+        moves += 1
+    connection.sendall('quit\n')
+    connection.close()
+    if results is not None:
+        results.append(moves)
+    return moves
+
+def runClients(address, clients, width, height, depth, timeLimit=None):
+    """
+    Play games on a server from many clients at once, one thread per client.
+    :param address: the (host, port) of the server
+    :param clients: the number of clients
+    :param width: width of the game board
+    :param height: height of the game board
+    :param depth: the depth of every search
+    :param timeLimit: the time budget of every search in seconds, None for a fixed depth search
+    :return: the list of the number of moves of each game
+    """
+    results = []
+    threads = [threading.Thread(target=playClient, args=(address, width, height, depth, timeLimit, results)) \
+        for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve Konane games over local sockets.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=7777, help='port to listen on')
+    parser.add_argument('--processes', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--pending', type=int, default=None, help='largest number of searches in the pool')
+    parser.add_argument('--width', type=int, default=8, help='width of the board of a new session')
+    parser.add_argument('--height', type=int, default=8, help='height of the board of a new session')
+    parser.add_argument('--clients', type=int, default=0, \
+        help='play this many games against the server from local clients, then print the metrics and stop')
+    parser.add_argument('--depth', type=int, default=3, help='depth of the searches of the clients')
+    args = parser.parse_args()
+
+    server = GameServer(args.host, args.port, args.processes, args.pending, args.width, args.height)
+    print 'Listening on %s:%d' % server.address
+    if args.clients:
+        def clients():
+            runClients(server.address, args.clients, args.width, args.height, args.depth)
+            server.stop()
+        threading.Thread(target=clients).start()
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+    print json.dumps(server.metrics(), sort_keys=True)
+    server.close()
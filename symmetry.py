@@ -0,0 +1,150 @@
+import operator
+
+from bitboard import zobristHash
+from bitboard import zobristKeys
+
+_SYMMETRIES = {}
+
+def symmetryPermutations(width, height):
+    """
+    Find the reflections and rotations of a board which keep every cell on its color, so that
+    every piece stays on a cell of its own color. A reflection keeps the colors only along an odd
+    side, and the transpositions and quarter turns need a square board.
+    :param width: width of the game board
+    :param height: height of the game board
+    :return: a list of permutations of the bit indices, one per symmetry, the identity first
+    """
+    stride = height + 1
+    candidates = [lambda x, y: (x, y), lambda x, y: (width + 1 - x, y), lambda x, y: (x, height + 1 - y), \
+        lambda x, y: (width + 1 - x, height + 1 - y)]
+    if width == height:
+        candidates += [lambda x, y: (y, x), lambda x, y: (height + 1 - y, width + 1 - x), \
+            lambda x, y: (y, width + 1 - x), lambda x, y: (height + 1 - y, x)]
+
+    result = []
+    for transform in candidates:
+        # guard bits are always empty, so they stay where they are
+        permutation = range(width * stride)
+        keepsColors = True
+        for x in range(1, width + 1):
+            for y in range(1, height + 1):
+                newX, newY = transform(x, y)
+                keepsColors = keepsColors and (newX + newY) % 2 == (x + y) % 2
+                permutation[(x - 1) * stride + y - 1] = (newX - 1) * stride + newY - 1
+        if keepsColors and permutation not in result:
+            result.append(permutation)
+    return result
+
+def getSymmetry(width, height, maxRound=4):
+    """
+    :param width: width of the game board
+    :param height: height of the game board
+    :param maxRound: the last round whose moves are deduplicated
+    :return: the symmetries of the board size, class Symmetry, shared by all callers
+    """
+    key = (width, height, maxRound)
+    if key not in _SYMMETRIES:
+        _SYMMETRIES[key] = Symmetry(width, height, maxRound)
+    return _SYMMETRIES[key]
+
+
+class Symmetry:
+    """
+    Map boards to a canonical representative among the boards equal to them up to a symmetry. The
+    mobility evaluation counts jumps in every direction alike, so equivalent boards have the same
+    value. A mask is transformed by writing it out as a string of bits and picking the characters
+    in the permuted order, which is done in C by operator.itemgetter.
+    """
+
+    def __init__(self, width, height, maxRound=4):
+        """
+        :param width: width of the game board
+        :param height: height of the game board
+        :param maxRound: the last round whose moves are deduplicated, where equivalent successors are
+            common because the board is still almost full
+        """
+        self.width = width
+        self.height = height
+        self.maxRound = maxRound
+        self.sideKeys = zobristKeys(width, height)[1]
+        self.length = width * (height + 1)
+        self.permutations = symmetryPermutations(width, height)
+        self.inverses = []
+        self.getters = []
+        length = self.length
+        for permutation in self.permutations:
+            inverse = [0] * length
+            for index, image in enumerate(permutation):
+                inverse[image] = index
+            self.inverses.append(self.permutations.index(inverse))
+            # bit i of a mask is character length-1-i of its string of bits
+            self.getters.append(operator.itemgetter(*[length - 1 - inverse[length - 1 - k] for k in range(length)]))
+        self.digits = '0' + str(length) + 'b'
+
+    def __len__(self):
+        return len(self.permutations)
+
+    def transformMask(self, bits, transform):
+        """
+        :param bits: a mask of cells
+        :param transform: the number of the symmetry
+        :return: the mask of the images of the cells
+        """
+        return int(''.join(self.getters[transform](format(bits, self.digits))), 2)
+
+    def transformMove(self, move, transform):
+        """
+        :param move: a tuple (initial index, step, hops)
+        :param transform: the number of the symmetry
+        :return: the image of the move
+        """
+        index, step, hops = move
+        permutation = self.permutations[transform]
+        if not hops:
+            return (permutation[index], 0, 0)
+        # the neighbour in the direction of a jump holds a captured piece, so it is on the board
+        return (permutation[index], permutation[index + step] - permutation[index], hops)
+
+    def canonical(self, pieces):
+        """
+        :param pieces: the masks of the dark and the light pieces
+        :return: a tuple of the smallest image of the masks, and the number of the symmetry giving it
+        """
+        best = (pieces[0], pieces[1])
+        bestTransform = 0
+        for transform in range(1, len(self.permutations)):
+            image = (self.transformMask(pieces[0], transform), self.transformMask(pieces[1], transform))
+            if image < best:
+                best = image
+                bestTransform = transform
+        return best, bestTransform
+
+    def canonicalKey(self, pieces, colorIndex):
+        """
+        :param pieces: the masks of the dark and the light pieces
+        :param colorIndex: the color index of the player to move
+        :return: a tuple of the Zobrist key of the canonical board together with the player to move,
+            and the number of the symmetry mapping the board to it
+        """
+        image, transform = self.canonical(pieces)
+        return zobristHash(self.width, self.height, image) ^ self.sideKeys[colorIndex], transform
+
+    def uniqueMoves(self, state, listOfMoves):
+        """
+        Remove the moves whose successor is equivalent to the successor of an earlier move.
+        :param state: the state the moves are made from, class GameState
+        :param listOfMoves: the moves generated by getMoves
+        :return: the list of the first move of each class of equivalent successors
+        """
+        board = state.board
+        seen = set()
+        result = []
+        for move in listOfMoves:
+            moveColorIndex = state.getMoveColor(move)
+            board.applyJump(moveColorIndex, *move)
+            image = self.canonical(board.pieces)[0]
+            board.undoJump(moveColorIndex, *move)
+            if image not in seen:
+                seen.add(image)
+                result.append(move)
+        return result
@@ -0,0 +1,317 @@
+import argparse
+import itertools
+import mmap
+import struct
+
+from bitboard import Board
+from bitboard import initialPieces
+from bitboard import popcount
+
+MAGIC = 'KTB1'
+# magic, width, height, the largest number of pieces
+HEADER = struct.Struct('<4sHHH')
+
+def binomials(n):
+    """
+    :param n: the largest number of items
+    :return: the table of the binomial coefficients, result[n][k] is n choose k
+    """
+    result = [[0] * (n + 2) for i in range(n + 1)]
+    for i in range(n + 1):
+        result[i][0] = 1
+        for k in range(1, i + 1):
+            result[i][k] = result[i-1][k-1] + result[i-1][k]
+    return result
+
+def encode(ifWin, distance):
+    """
+    :param ifWin: a boolean represents whether the player to move wins
+    :param distance: the number of moves until the loser has no move
+    :return: the byte stored in the table
+    """
+    return 2 * distance + int(ifWin)
+
+def decode(value):
+    """
+    :param value: a byte stored in the table
+    :return: a tuple of a boolean represents whether the player to move wins, and the number of
+        moves until the loser has no move
+    """
+    return bool(value & 1), value >> 1
+
+
+class Tablebase:
+    """
+    The exact result of every position of the jumping phase with a small number of pieces, for one
+    board size. A jump never changes the color of the cell a piece stands on, so the dark pieces are
+    always on the cells which were dark at the start, and a position is indexed by the combination
+    of dark cells taken, the combination of light cells taken and the color to move. Positions are
+    grouped into blocks by their numbers of dark and light pieces, and the blocks are laid out by
+    the total number of pieces, so a table for fewer pieces is a prefix of a larger table.
+    """
+
+    def __init__(self, width, height, maxPieces, data=None, start=0):
+        """
+        :param width: width of the game board
+        :param height: height of the game board
+        :param maxPieces: the largest number of pieces of a position in the table
+        :param data: the bytes of the table, anything indexable such as a memory map, None to
+            allocate an unsolved table
+        :param start: the position of the first byte of the table in data
+        """
+        self.width = width
+        self.height = height
+        self.maxPieces = maxPieces
+        # the bit indices of the cells of each color, in increasing order
+        self.cells = []
+        self.numbers = []
+        for colorIndex in range(2):
+            bits = initialPieces(width, height)[colorIndex]
+            cells = []
+            while bits:
+                lowest = bits & -bits
+                bits ^= lowest
+                cells.append(lowest.bit_length() - 1)
+            self.cells.append(cells)
+            self.numbers.append(dict((cell, number) for number, cell in enumerate(cells)))
+        self.binomials = binomials(max(len(cells) for cells in self.cells))
+
+        # (number of dark pieces, number of light pieces) -> offset of the block
+        self.offsets = {}
+        self.size = 0
+        for total in range(maxPieces + 1):
+            for dark in range(total + 1):
+                light = total - dark
+                if dark > len(self.cells[0]) or light > len(self.cells[1]):
+                    continue
+                self.offsets[(dark, light)] = self.size
+                self.size += 2 * self.combinations(0, dark) * self.combinations(1, light)
+        self.data = data if data is not None else bytearray(self.size)
+        self.start = start
+        self.file = None
+
+    def combinations(self, colorIndex, count):
+        """
+        :return: the number of ways to place count pieces on the cells of a color
+        """
+        return self.binomials[len(self.cells[colorIndex])][count]
+
+    def rank(self, colorIndex, bits):
+        """
+        Calculate the position of a combination of cells in the colexicographic order.
+        :param colorIndex: the color of the cells
+        :param bits: the mask of the pieces, which must all stand on cells of the color
+        :return: the rank of the combination, None if a piece stands on a cell of the other color
+        """
+        numbers = self.numbers[colorIndex]
+        result = 0
+        k = 1
+        while bits:
+            lowest = bits & -bits
+            bits ^= lowest
+            number = numbers.get(lowest.bit_length() - 1)
+            if number is None:
+                return None
+            result += self.binomials[number][k]
+            k += 1
+        return result
+
+    def index(self, pieces, colorIndex):
+        """
+        :param pieces: the masks of the dark and the light pieces
+        :param colorIndex: the color index of the player to move
+        :return: the index of the position in the table, None if the position is not in the table
+        """
+        dark, light = popcount(pieces[0]), popcount(pieces[1])
+        offset = self.offsets.get((dark, light))
+        if offset is None:
+            return None
+        darkRank = self.rank(0, pieces[0])
+        lightRank = self.rank(1, pieces[1])
+        if darkRank is None or lightRank is None:
+            return None
+        return offset + 2 * (darkRank * self.combinations(1, light) + lightRank) + colorIndex
+
+    def probe(self, pieces, colorIndex):
+        """
+        :param pieces: the masks of the dark and the light pieces
+        :param colorIndex: the color index of the player to move
+        :return: a tuple of a boolean represents whether the player to move wins, and the number of
+            moves until the loser has no move, None if the position is not in the table
+        """
+        index = self.index(pieces, colorIndex)
+        if index is None:
+            return None
+        return decode(self.read(index))
+
+    def read(self, index):
+        """
+        :param index: the index of a position in the table
+        :return: the byte of the position
+        """
+        value = self.data[self.start + index]
+        # a memory map returns a string of one character, a bytearray an integer
+        return value if isinstance(value, int) else ord(value)
+
+    def evaluate(self, state, round):
+        """
+        :param state: a state of the game, class GameState
+        :param round: the number of round of the state
+        :return: the exact value of the state for the computer, None if the state is not in the table
+        """
+        if round <= 2:
+            return None
+        result = self.probe(state.board.pieces, state.colorIndex)
+        if result is None:
+            return None
+        return float('inf') if result[0] == (state.player == 'computer') else float('-inf')
+
+    def bestMove(self, state, round):
+        """
+        Choose the move which wins in the fewest moves, or loses in the most.
+        :param state: a state of the game, class GameState
+        :param round: the number of round of the state
+        :return: a tuple of the exact value of the state for the computer and the best move as a tuple
+            of the initial and destination positions, None if the state is not in the table
+        """
+        value = self.evaluate(state, round)
+        if value is None:
+            return None
+        board = state.board
+        bestMove = None
+        bestScore = None
+        for move in board.getJumps(state.colorIndex):
+            board.applyJump(state.colorIndex, *move)
+            ifWin, distance = self.probe(board.pieces, 1 - state.colorIndex)
+            board.undoJump(state.colorIndex, *move)
+            # a lost position for the opponent is good, the sooner the better, else the later the better
+            score = -distance if not ifWin else distance - 256
+            if bestScore is None or score > bestScore:
+                bestScore = score
+                bestMove = move
+        return value, state.describeMove(bestMove)
+
+    def solve(self, ifPrint=False):
+        """
+        Solve every position of the table. A jump always captures, so every successor has fewer
+        pieces and is in a block which was solved before; the blocks are therefore solved in the
+        order they are laid out, and no position is visited twice.
+        :param ifPrint: a boolean represents if the progress is printed
+        """
+        board = Board(self.width, self.height, (0, 0), 0)
+        data = self.data
+        for total in range(self.maxPieces + 1):
+            for dark in range(total + 1):
+                light = total - dark
+                if (dark, light) not in self.offsets:
+                    continue
+                index = self.offsets[(dark, light)]
+                lightMasks = self.masks(1, light)
+                for darkMask in self.masks(0, dark):
+                    for lightMask in lightMasks:
+                        for colorIndex in range(2):
+                            board.pieces[0], board.pieces[1] = darkMask, lightMask
+                            data[index] = self.solvePosition(board, colorIndex)
+                            index += 1
+            if ifPrint:
+                print 'Solved the positions with', total, 'pieces'
+
+    def solvePosition(self, board, colorIndex):
+        """
+        :param board: a board whose successors are all solved
+        :param colorIndex: the color index of the player to move
+        :return: the byte of the position
+        """
+        winDistance = None
+        lossDistance = 0
+        for index, step, hops in board.getJumps(colorIndex):
+            initial, destination, captured = board.jumpMasks(index, step, hops)
+            successor = [0, 0]
+            successor[colorIndex] = board.pieces[colorIndex] ^ initial ^ destination
+            successor[1-colorIndex] = board.pieces[1-colorIndex] & ~captured
+            ifWin, distance = decode(self.read(self.index(successor, 1 - colorIndex)))
+            if not ifWin:
+                if winDistance is None or distance + 1 < winDistance:
+                    winDistance = distance + 1
+            else:
+                lossDistance = max(lossDistance, distance + 1)
+        if winDistance is not None:
+            return encode(True, winDistance)
+        return encode(False, lossDistance)
+
+    def masks(self, colorIndex, count):
+        """
+        :return: the list of the masks of every way to place count pieces on the cells of a color,
+            in the colexicographic order used by rank
+        """
+        cells = self.cells[colorIndex]
+        result = []
+        for combination in itertools.combinations(range(len(cells)), count):
+            mask = 0
+            for number in combination:
+                mask |= 1 << cells[number]
+            result.append((self.rank(colorIndex, mask), mask))
+        result.sort()
+        return [mask for _, mask in result]
+
+    def save(self, path):
+        """
+        :param path: the path of the file the table is written to
+        """
+        with open(path, 'wb') as tableFile:
+            tableFile.write(HEADER.pack(MAGIC, self.width, self.height, self.maxPieces))
+            tableFile.write(self.data)
+
+    def close(self):
+        """
+        Release the memory map of a loaded table.
+        """
+        if self.file is not None:
+            self.data.close()
+            self.file.close()
+            self.file = None
+
+
+def generateTablebase(width, height, maxPieces, path=None, ifPrint=False):
+    """
+    :param width: width of the game board
+    :param height: height of the game board
+    :param maxPieces: the largest number of pieces of a position in the table
+    :param path: the path of the file the table is written to, None to keep it in memory only
+    :param ifPrint: a boolean represents if the progress is printed
+    :return: the solved table, class Tablebase
+    """
+    tablebase = Tablebase(width, height, maxPieces)
+    tablebase.solve(ifPrint)
+    if path is not None:
+        tablebase.save(path)
+    return tablebase
+
+def loadTablebase(path):
+    """
+    Open a table written by generateTablebase. The file is memory mapped, so only the pages which
+    are probed are read, and processes reading the same file share them.
+    :param path: the path of the file
+    :return: the table, class Tablebase
+    """
+    tableFile = open(path, 'rb')
+    magic, width, height, maxPieces = HEADER.unpack(tableFile.read(HEADER.size))
+    if magic != MAGIC:
+        tableFile.close()
+        raise Exception(path + ' is not a tablebase')
+    data = mmap.mmap(tableFile.fileno(), 0, access=mmap.ACCESS_READ)
+    tablebase = Tablebase(width, height, maxPieces, data, HEADER.size)
+    tablebase.file = tableFile
+    return tablebase
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Solve the endgame positions of Konane with few pieces.')
+    parser.add_argument('width', type=int, help='width of the game board')
+    parser.add_argument('height', type=int, help='height of the game board')
+    parser.add_argument('--pieces', type=int, default=4, help='the largest number of pieces of a position')
+    parser.add_argument('--output', default=None, help='file the table is written to, WxH-N.tb if None')
+    args = parser.parse_args()
+    path = args.output or '%dx%d-%d.tb' % (args.width, args.height, args.pieces)
+    tablebase = generateTablebase(args.width, args.height, args.pieces, path, True)
+    print 'Wrote', tablebase.size, 'positions to', path
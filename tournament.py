@@ -0,0 +1,235 @@
+import argparse
+import json
+import math
+import multiprocessing
+import random
+import time
+
+from agent import MinimaxInfo
+from agent import iterativeDeepening
+from agent import minimaxAlphaBeta
+from agent import minimaxAlphaBetaInPlace
+from agent import minimaxNaive
+from agent import minimaxNaiveInPlace
+from agent import principalVariationSearch
+from agent import randomAgent
+from bitboard import Board
+from evaluation import featureWeights
+from evaluation import parseWeights
+from game import GameState
+from mcts import ITERATIONS
+from mcts import MonteCarloSearch
+from ordering import MoveOrdering
+from transposition import TranspositionTable
+
+AGENTS = ['random', 'minimax', 'alphabeta', 'mcts']
+
+def parseAgent(spec):
+    """
+    Parse an agent from a string such as 'random', 'minimax:3', 'alphabeta:6+inplace+table+time=0.5' or
+    'mcts:2000+batch=8'. The options after the depth are inplace, table, ordering, pvs, lmr, time=<seconds per
+    move>, batch=<leaves> and weights=<feature>:<weight>,... of the weighted evaluation. The depth of mcts is
+    its number of playouts per move.
+    :param spec: the string describing the agent
+    :return: a dictionary of the settings of the agent
+    """
+    parts = spec.split('+')
+    kind, _, depth = parts[0].partition(':')
+    if kind not in AGENTS:
+        raise Exception('Agents can only be ' + ', '.join(AGENTS))
+    if not depth:
+        depth = ITERATIONS if kind == 'mcts' else 3
+    settings = {'name': spec, 'agent': kind, 'depth': int(depth), 'inPlace': False, \
+        'table': False, 'ordering': False, 'pvs': False, 'lmr': False, 'timeLimit': None, 'batch': 1, \
+        'weights': None}
+    for option in parts[1:]:
+        if option == 'inplace':
+            settings['inPlace'] = True
+        elif option in ('table', 'ordering', 'pvs', 'lmr'):
+            settings[option] = True
+        elif option.startswith('time='):
+            settings['timeLimit'] = float(option[len('time='):])
+        elif option.startswith('batch='):
+            settings['batch'] = int(option[len('batch='):])
+        elif option.startswith('weights='):
+            settings['weights'] = dict(parseWeights(option[len('weights='):]))
+        else:
+            raise Exception('Unknown agent option ' + option)
+    return settings
+
+
+class Player:
+    """
+    An agent playing one side of a game, together with the search tables it keeps for the game.
+    """
+
+    def __init__(self, settings):
+        """
+        :param settings: a dictionary of the settings of the agent, see parseAgent
+        """
+        self.settings = settings
+        self.table = TranspositionTable() if settings['table'] else None
+        self.ordering = MoveOrdering() if settings['ordering'] else None
+        self.mcts = MonteCarloSearch(settings['depth'], settings['batch']) if settings['agent'] == 'mcts' else None
+        self.weights = featureWeights(settings['weights']) if settings['weights'] else None
+        self.minimaxInfo = MinimaxInfo()
+        self.time = 0.0
+        self.previousValue = None
+
+    def chooseMove(self, state, round):
+        """
+        :param state: the current state of the game, with this player to move as 'computer'
+        :param round: the number of round
+        :return: the move chosen
+        """
+        settings = self.settings
+        start = time.time()
+        state.weights = self.weights
+        if settings['agent'] == 'random':
+            move = randomAgent(state, round)
+        else:
+            depth = settings['depth']
+            if settings['agent'] == 'mcts':
+                bestValue, move, minimaxInfo = self.mcts.search(state, round, settings['timeLimit'])
+            elif settings['agent'] == 'minimax':
+                search = minimaxNaiveInPlace if settings['inPlace'] else minimaxNaive
+                bestValue, move, minimaxInfo = search(state, depth, round)
+            elif settings['timeLimit'] is not None:
+                bestValue, move, minimaxInfo = iterativeDeepening(state, round, settings['timeLimit'], depth, \
+                    self.table, settings['inPlace'], self.ordering, False, None, settings['pvs'], settings['lmr'])
+            elif settings['pvs']:
+                if self.ordering is not None:
+                    self.ordering.newSearch(round)
+                bestValue, move, minimaxInfo = principalVariationSearch(state, depth, round, self.table, \
+                    self.ordering, self.previousValue, settings['lmr'])
+                self.previousValue = bestValue
+            else:
+                if self.ordering is not None:
+                    self.ordering.newSearch(round)
+                search = minimaxAlphaBetaInPlace if settings['inPlace'] else minimaxAlphaBeta
+                bestValue, move, minimaxInfo = search(state, depth, round, float('-inf'), float('inf'), \
+                    self.table, None, self.ordering)
+            self.minimaxInfo += minimaxInfo
+        self.time += time.time() - start
+        return move
+
+
+def playGame(task):
+    """
+    Play a game between two agents without printing anything.
+    :param task: a tuple (game number, settings of the first agent, settings of the second agent,
+        width, height, index of the agent moving first, seed)
+    :return: a dictionary of the result of the game
+    """
+    number, first, second, width, height, moveFirst, seed = task
+    random.seed(seed)
+    players = [Player(first), Player(second)]
+    board = Board(width, height)
+    round = 1
+    # the agent moving first plays the dark pieces, color index 0
+    moveNow = moveFirst
+    while True:
+        colorIndex = int(moveNow != moveFirst)
+        state = GameState(board.copy(), None, 'computer', colorIndex)
+        if round > 2 and not board.hasMove(colorIndex):
+            break
+        move = players[moveNow].chooseMove(state, round)
+        if round == 1 or round == 2:
+            board[move] = 2
+        else:
+            board.makeMove(move[0], move[1], colorIndex)
+        moveNow = 1 - moveNow
+        round += 1
+
+    return {'game': number, 'width': width, 'height': height, 'seed': seed, 'first': moveFirst, \
+        'winner': 1 - moveNow, 'moves': round - 1, \
+        'nodes': [player.minimaxInfo.numberNodes() for player in players], \
+        'playouts': [player.minimaxInfo.numberPlayouts for player in players], \
+        'time': [player.time for player in players]}
+
+def wilsonInterval(wins, games, z=1.96):
+    """
+    Calculate the Wilson score interval of a win rate.
+    :param wins: the number of games won
+    :param games: the number of games played
+    :param z: the quantile of the normal distribution, 1.96 for a 95% interval
+    :return: a tuple of the lower and the upper end of the interval
+    """
+    if games == 0:
+        return (0.0, 1.0)
+    rate = wins * 1.00 / games
+    center = (rate + z * z / (2 * games)) / (1 + z * z / games)
+    spread = z * math.sqrt(rate * (1 - rate) / games + z * z / (4 * games * games)) / (1 + z * z / games)
+    return (center - spread, center + spread)
+
+def runTournament(first, second, sizes, games, processes=None, seed=0, resultsPath=None, ifPrint=True, \
+        ifAlternate=True):
+    """
+    Play games between two agents on a pool of processes. The agents take turns to move first, unless
+    ifAlternate is False.
+    Each result is appended to the results file as a line of JSON as soon as its game ends.
+    :param first: a dictionary of the settings of the first agent, see parseAgent
+    :param second: a dictionary of the settings of the second agent
+    :param sizes: a list of tuples of the width and height of the boards
+    :param games: the number of games on each board size
+    :param processes: the number of worker processes, the number of CPUs if None, 1 to play in this process
+    :param seed: the seed of the first game, the following games use the following seeds
+    :param resultsPath: the path of the results file, None to keep no file
+    :param ifPrint: a boolean represents if the summary is printed
+    :param ifAlternate: a boolean represents whether the agents take turns to move first, else the first agent
+        always moves first
+    :return: a dictionary from board size to a tuple of games, wins of the first agent and its interval
+    """
+    tasks = []
+    for width, height in sizes:
+        for i in range(games):
+            tasks.append((len(tasks), first, second, width, height, i % 2 if ifAlternate else 0, seed + len(tasks)))
+
+    pool = None
+    if processes == 1:
+        results = (playGame(task) for task in tasks)
+    else:
+        pool = multiprocessing.Pool(processes)
+        results = pool.imap_unordered(playGame, tasks)
+
+    wins = dict(((width, height), [0, 0]) for width, height in sizes)
+    resultsFile = open(resultsPath, 'a') if resultsPath else None
+    try:
+        for result in results:
+            if resultsFile:
+                resultsFile.write(json.dumps(result) + '\n')
+                resultsFile.flush()
+            counts = wins[(result['width'], result['height'])]
+            counts[0] += 1
+            counts[1] += int(result['winner'] == 0)
+    finally:
+        if resultsFile:
+            resultsFile.close()
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    summary = {}
+    for size in sizes:
+        played, won = wins[size]
+        summary[size] = (played, won, wilsonInterval(won, played))
+        if ifPrint:
+            low, high = summary[size][2]
+            print '%dx%d: %s won %d of %d against %s, win rate %.3f (95%% interval %.3f-%.3f)' % \
+                (size[0], size[1], first['name'], won, played, second['name'], \
+                won * 1.00 / played if played else 0.0, low, high)
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play a tournament of Konane games between two agents.')
+    parser.add_argument('first', help="the first agent, e.g. 'random' or 'alphabeta:4+inplace+table'")
+    parser.add_argument('second', help='the second agent')
+    parser.add_argument('--games', type=int, default=100, help='number of games on each board size')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[6], help='sides of the square boards')
+    parser.add_argument('--processes', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game')
+    parser.add_argument('--results', default=None, help='file the results are appended to as JSON lines')
+    args = parser.parse_args()
+    runTournament(parseAgent(args.first), parseAgent(args.second), [(side, side) for side in args.sizes], \
+        args.games, args.processes, args.seed, args.results)
@@ -0,0 +1,263 @@
+from array import array
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# replacement policies of BoundedTranspositionTable
+DEPTH_PREFERRED = 'depth'
+ALWAYS_REPLACE = 'always'
+# the bytes of an entry of BoundedTranspositionTable: the check of the key, the packed data and the value
+ENTRY_BYTES = 12
+# the stored values of the infinite values
+INFINITY = 2 ** 31 - 1
+# the layout of the packed data: the move, the depth, the bound type, the generation and whether the slot is used
+MOVE_BITS = 20
+DEPTH_SHIFT = 20
+MAX_DEPTH = 63
+FLAG_SHIFT = 26
+AGE_SHIFT = 28
+AGES = 8
+OCCUPIED = 1 << 31
+
+class TranspositionTable:
+    """
+    A table of searched positions keyed by the Zobrist key of the board and the player to move.
+    Each entry is a tuple (depth, bound type, value, best move), where the bound type tells if
+    the value is exact, a lower bound or an upper bound of the minimax value.
+    """
+
+    def __init__(self):
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def probe(self, key):
+        """
+        :param key: the key of the position
+        :return: the entry of the position, None if the position has not been searched
+        """
+        return self.entries.get(key)
+
+    def store(self, key, depth, flag, value, move):
+        """
+        Store the result of a search. An entry searched deeper is never replaced by a shallower one.
+        :param key: the key of the position
+        :param depth: the depth searched below the position
+        :param flag: EXACT, LOWER or UPPER
+        :param value: the value found by the search
+        :param move: the best move found by the search
+        """
+        entry = self.entries.get(key)
+        if entry is None or entry[0] <= depth:
+            self.entries[key] = (depth, flag, value, move)
+
+    def newSearch(self):
+        """
+        Called before the search of every move. Entries are never aged out of this table.
+        """
+        pass
+
+    def statistics(self):
+        """
+        :return: a dictionary of the number of entries
+        """
+        return {'entries': len(self.entries)}
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        self.entries.clear()
+
+
+class BoundedTranspositionTable:
+    """
+    A transposition table of a fixed size, with the same interface as TranspositionTable. The entries
+    live in three flat arrays of machine integers, 12 bytes an entry, so 256MB hold 22 million positions
+    and the table never grows. The slots are grouped into buckets of bucketSize, and a position can only be
+    stored in the bucket chosen by the low 32 bits of its key. A slot keeps the high 32 bits of the key
+    to tell the positions of a bucket apart, and packs the move, the depth (at most MAX_DEPTH), the bound
+    type and the generation of the search which stored it into 32 bits; the value is a 32-bit integer,
+    with INFINITY for the infinite values.
+
+    When the bucket of a new position is full, the slot given up is one stored by an earlier search if
+    there is any, else the shallowest. With DEPTH_PREFERRED a new entry only replaces an entry of the
+    current search which is at most as deep, so the deep results survive the many shallow ones, and the
+    new entry is dropped otherwise. With ALWAYS_REPLACE the new entry is always stored. newSearch starts a
+    new generation, so the entries of the previous moves are the first to go.
+    """
+
+    def __init__(self, megabytes=64, bucketSize=4, policy=DEPTH_PREFERRED):
+        """
+        :param megabytes: the memory of the entries in megabytes
+        :param bucketSize: the number of slots of a bucket
+        :param policy: DEPTH_PREFERRED or ALWAYS_REPLACE
+        """
+        if policy not in (DEPTH_PREFERRED, ALWAYS_REPLACE):
+            raise Exception('The replacement policy is either ' + DEPTH_PREFERRED + ' or ' + ALWAYS_REPLACE + '.')
+        self.numberBuckets = int(megabytes * 2 ** 20) // (ENTRY_BYTES * bucketSize)
+        if self.numberBuckets < 1:
+            raise Exception('The transposition table needs room for at least one bucket.')
+        self.bucketSize = bucketSize
+        self.policy = policy
+        self.capacity = self.numberBuckets * bucketSize
+        self.checks = array('I', [0]) * self.capacity
+        self.data = array('I', [0]) * self.capacity
+        self.values = array('i', [0]) * self.capacity
+        self.age = 0
+        self.size = 0
+        self.numberProbes = 0
+        self.numberHits = 0
+        self.numberStores = 0
+        # stores which found the bucket full of other positions
+        self.numberCollisions = 0
+        # entries of other positions given up for new ones
+        self.numberOverwrites = 0
+        # new entries dropped by DEPTH_PREFERRED
+        self.numberRejections = 0
+
+    def __len__(self):
+        return self.size
+
+    def probe(self, key):
+        """
+        :param key: the key of the position
+        :return: the entry of the position, None if the position has not been searched or its entry was replaced
+        """
+        self.numberProbes += 1
+        check = key >> 32
+        start = (key & 0xFFFFFFFF) % self.numberBuckets * self.bucketSize
+        checks, data = self.checks, self.data
+        for slot in range(start, start + self.bucketSize):
+            if checks[slot] == check and data[slot] & OCCUPIED:
+                self.numberHits += 1
+                packed = data[slot]
+                value = self.values[slot]
+                if value == INFINITY:
+                    value = float('inf')
+                elif value == -INFINITY:
+                    value = float('-inf')
+                move = packed & ((1 << MOVE_BITS) - 1)
+                return ((packed >> DEPTH_SHIFT) & MAX_DEPTH, (packed >> FLAG_SHIFT) & 3, value, \
+                    (move & 511, ((move >> 9) & 63) - 32, move >> 15))
+        return None
+
+    def store(self, key, depth, flag, value, move):
+        """
+        Store the result of a search in the bucket of the position, as the replacement policy allows.
+        :param key: the key of the position
+        :param depth: the depth searched below the position
+        :param flag: EXACT, LOWER or UPPER
+        :param value: the value found by the search, an integer or infinite
+        :param move: the best move found by the search, a tuple (initial index, step, hops), which fits in an
+            entry on the boards for which fitsBoard is True
+        """
+        index, step, hops = move
+        if index > 511 or not -32 <= step < 32 or hops > 31:
+            raise Exception('The move does not fit in an entry of the transposition table.')
+        self.numberStores += 1
+        check = key >> 32
+        start = (key & 0xFFFFFFFF) % self.numberBuckets * self.bucketSize
+        checks, data = self.checks, self.data
+        depth = min(depth, MAX_DEPTH)
+        target = None
+        victim = None
+        for slot in range(start, start + self.bucketSize):
+            packed = data[slot]
+            if not packed & OCCUPIED:
+                if target is None:
+                    target = slot
+                continue
+            if checks[slot] == check:
+                if self.policy == DEPTH_PREFERRED and (packed >> AGE_SHIFT) & (AGES - 1) == self.age and \
+                        (packed >> DEPTH_SHIFT) & MAX_DEPTH > depth:
+                    return
+                target = slot
+                break
+            # an entry of an earlier search goes before any entry of this one, then the shallowest
+            rank = ((packed >> AGE_SHIFT) & (AGES - 1) == self.age, (packed >> DEPTH_SHIFT) & MAX_DEPTH)
+            if victim is None or rank < victimRank:
+                victim, victimRank = slot, rank
+        else:
+            if target is None:
+                self.numberCollisions += 1
+                if self.policy == DEPTH_PREFERRED and victimRank[0] and victimRank[1] > depth:
+                    self.numberRejections += 1
+                    return
+                self.numberOverwrites += 1
+                target = victim
+        if not data[target] & OCCUPIED:
+            self.size += 1
+        checks[target] = check
+        data[target] = OCCUPIED | self.age << AGE_SHIFT | flag << FLAG_SHIFT | depth << DEPTH_SHIFT | \
+            hops << 15 | (step + 32) << 9 | index
+        if value == float('inf'):
+            self.values[target] = INFINITY
+        elif value == float('-inf'):
+            self.values[target] = -INFINITY
+        else:
+            self.values[target] = int(value)
+
+    def newSearch(self):
+        """
+        Start a new generation, called before the search of every move.
+        """
+        self.age = (self.age + 1) % AGES
+
+    def statistics(self):
+        """
+        :return: a dictionary of the size, the occupancy and the counters of the table
+        """
+        return {'entries': self.size, 'capacity': self.capacity, 'occupancy': self.size * 1.0 / self.capacity, \
+            'megabytes': self.capacity * ENTRY_BYTES / 2.0 ** 20, 'policy': self.policy, \
+            'probes': self.numberProbes, 'hits': self.numberHits, 'stores': self.numberStores, \
+            'collisions': self.numberCollisions, 'overwrites': self.numberOverwrites, \
+            'rejections': self.numberRejections}
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        for values in (self.checks, self.data, self.values):
+            values[:] = array(values.typecode, [0]) * self.capacity
+        self.size = 0
+
+
+def fitsBoard(width, height):
+    """
+    :param width: width of the game board
+    :param height: height of the game board
+    :return: True if every move on a board of the size fits in an entry of BoundedTranspositionTable, whose
+        moves keep 9 bits for the initial bit index, 6 bits for the step and 5 bits for the hops
+    """
+    stride = height + 1
+    # a step of stride is a jump along a row, which needs three columns
+    return width * stride - 2 <= 511 and (width < 3 or stride < 32) and (max(width, height) - 1) // 2 <= 31
+
+def boundType(value, alpha, beta):
+    """
+    :param value: the value returned by a fail-soft alpha-beta search
+    :param alpha: alpha of the window the search started with
+    :param beta: beta of the window the search started with
+    :return: EXACT, LOWER or UPPER
+    """
+    if value <= alpha:
+        return UPPER
+    if value >= beta:
+        return LOWER
+    return EXACT
+
+def isUsable(entry, depth, alpha, beta):
+    """
+    :param entry: an entry of the transposition table
+    :param depth: the depth being searched
+    :param alpha: the min value of the max level
+    :param beta: the max value of the min level
+    :return: True if the entry decides the value of the position without searching it
+    """
+    if entry[0] < depth:
+        return False
+    flag, value = entry[1], entry[2]
+    return flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha)